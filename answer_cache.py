@@ -0,0 +1,144 @@
+"""Cache sémantique des réponses du RAGSystem.
+
+Une question est d'abord cherchée par son texte normalisé (correspondance
+exacte), puis par similarité cosinus de son embedding avec les questions déjà
+posées. Les entrées expirent après un TTL, sont évincées en LRU au-delà de la
+capacité, et le cache est vidé dès que la version de l'index change.
+"""
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+import numpy as np
+
+_PUNCT_RE = re.compile(r"[^\w\s]")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_question(question):
+    """Forme canonique d'une question: minuscules, sans ponctuation ni espaces superflus"""
+    text = unicodedata.normalize("NFC", question).lower()
+    text = _PUNCT_RE.sub(" ", text)
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+class _Entry:
+    __slots__ = ("result", "vector", "created")
+
+    def __init__(self, result, vector, created):
+        self.result = result
+        self.vector = vector
+        self.created = created
+
+
+class SemanticAnswerCache:
+    """Cache LRU + TTL des réponses, interrogeable par texte ou par embedding"""
+
+    def __init__(self, max_entries=256, ttl_seconds=3600, similarity_threshold=0.93, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._matrix = None
+        self._matrix_keys = []
+        self.index_version = None
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _expired(self, entry, now):
+        return self.ttl_seconds is not None and now - entry.created > self.ttl_seconds
+
+    def _drop(self, key):
+        self._entries.pop(key, None)
+        self._matrix = None
+
+    def get_exact(self, question):
+        """Réponse en cache pour une question identique (après normalisation)"""
+        key = normalize_question(question)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry, self._clock()):
+                self._drop(key)
+                entry = None
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            self.exact_hits += 1
+            return dict(entry.result, cached="exact")
+
+    def get_similar(self, vector):
+        """Réponse en cache pour la question la plus proche au-delà du seuil de similarité"""
+        query = self._unit(vector)
+        with self._lock:
+            now = self._clock()
+            for key in [k for k, e in self._entries.items() if self._expired(e, now)]:
+                self._drop(key)
+            if self._matrix is None:
+                self._matrix_keys = [k for k, e in self._entries.items() if e.vector is not None]
+                self._matrix = (np.stack([self._entries[k].vector for k in self._matrix_keys])
+                                if self._matrix_keys else np.empty((0, len(query)), dtype=np.float32))
+            if len(self._matrix_keys):
+                scores = self._matrix @ query
+                best = int(np.argmax(scores))
+                if scores[best] >= self.similarity_threshold:
+                    key = self._matrix_keys[best]
+                    self._entries.move_to_end(key)
+                    self.semantic_hits += 1
+                    return dict(self._entries[key].result, cached="semantic", similarity=float(scores[best]))
+            self.misses += 1
+            return None
+
+    def put(self, question, result, vector=None):
+        """Mémoriser la réponse ``result`` à ``question``"""
+        key = normalize_question(question)
+        entry = _Entry(dict(result), self._unit(vector) if vector is not None else None, self._clock())
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._matrix = None
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def set_index_version(self, version):
+        """Vider le cache si l'index interrogé a changé depuis le dernier appel"""
+        with self._lock:
+            changed = self.index_version is not None and version != self.index_version
+            self.index_version = version
+        if changed:
+            self.invalidate()
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+            self.invalidations += 1
+
+    @staticmethod
+    def _unit(vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def stats(self):
+        hits = self.exact_hits + self.semantic_hits
+        total = hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": hits / total if total else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
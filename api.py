@@ -0,0 +1,170 @@
+"""API HTTP asynchrone (aiohttp) du RAGSystem, sans passer par Streamlit.
+
+Un seul ``RAGSystem`` préchargé est partagé par toutes les requêtes via
+``AsyncQueryEngine`` (pool de threads borné, embeddings regroupés,
+backpressure). Lancer plusieurs processus dupliquerait les modèles en mémoire:
+on monte en charge avec ``ENGINE_MAX_WORKERS``.
+
+    POST /query          {"question": "..."}             → réponse JSON
+    POST /query/stream   {"question": "..."}             → Server-Sent Events (token, done)
+    POST /query/batch    {"questions": ["...", "..."]}   → réponses dans l'ordre
+    GET  /health                                          → état (503 pendant l'initialisation)
+    GET  /metrics                                         → métriques Prometheus
+
+    python api.py --port 8000
+"""
+import argparse
+import json
+import logging
+
+from aiohttp import web
+
+from config import Config
+from query_engine import AsyncQueryEngine
+
+logger = logging.getLogger(__name__)
+
+RAG_KEY = web.AppKey("rag", object)
+ENGINE_KEY = web.AppKey("engine", dict)
+
+
+def _status(result):
+    """Code HTTP d'une réponse de ``RAGSystem.query``"""
+    if "error" not in result:
+        return 200
+    if result.get("overloaded"):
+        return 429
+    if result["error"].startswith("Délai"):
+        return 504
+    return 500
+
+
+def _invalid(message):
+    return web.HTTPBadRequest(text=json.dumps({"error": message}, ensure_ascii=False), content_type="application/json")
+
+
+async def _question(request):
+    """Corps JSON de la requête (objet), avec ``timeout`` validé et plafonné à ``Config.API_MAX_TIMEOUT``"""
+    try:
+        body = await request.json()
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        raise _invalid("Corps JSON invalide")
+    if not isinstance(body, dict):
+        raise _invalid("Le corps JSON doit être un objet")
+    timeout = body.get("timeout")
+    if timeout is not None:
+        if isinstance(timeout, bool) or not isinstance(timeout, (int, float)) or not timeout > 0:
+            raise _invalid("Champ 'timeout' invalide (nombre de secondes positif)")
+        body["timeout"] = min(timeout, Config.API_MAX_TIMEOUT)
+    return body
+
+
+def _engine(request):
+    """Moteur de requêtes, créé une fois le RAGSystem initialisé (il en partage les embeddings)"""
+    rag = request.app[RAG_KEY]
+    if not rag.wait_until_ready(0):
+        raise web.HTTPServiceUnavailable(text=json.dumps({"error": "Système en cours d'initialisation"}),
+                                         content_type="application/json", headers={"Retry-After": "5"})
+    holder = request.app[ENGINE_KEY]
+    if holder.get("engine") is None:
+        holder["engine"] = AsyncQueryEngine(rag)
+    return holder["engine"]
+
+
+def _bad_request(message):
+    return web.json_response({"error": message}, status=400)
+
+
+async def handle_query(request):
+    engine = _engine(request)
+    body = await _question(request)
+    question = str(body.get("question", "")).strip()
+    if not question:
+        return _bad_request("Champ 'question' manquant")
+    result = await engine.query(question, body.get("timeout"))
+    return web.json_response(result, status=_status(result), dumps=lambda obj: json.dumps(obj, ensure_ascii=False))
+
+
+async def handle_stream(request):
+    engine = _engine(request)
+    body = await _question(request)
+    question = str(body.get("question", "")).strip()
+    if not question:
+        return _bad_request("Champ 'question' manquant")
+
+    response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+    await response.prepare(request)
+    async for kind, payload in engine.stream(question, body.get("timeout")):
+        data = {"text": payload} if kind == "token" else payload
+        await response.write(f"event: {kind}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8"))
+    await response.write_eof()
+    return response
+
+
+async def handle_batch(request):
+    engine = _engine(request)
+    body = await _question(request)
+    questions = body.get("questions")
+    if not isinstance(questions, list) or not questions:
+        return _bad_request("Champ 'questions' manquant (liste)")
+    if len(questions) > Config.API_MAX_BATCH:
+        return _bad_request(f"Au plus {Config.API_MAX_BATCH} questions par lot")
+    results = await engine.query_many([str(q).strip() for q in questions], body.get("timeout"))
+    return web.json_response({"results": results}, dumps=lambda obj: json.dumps(obj, ensure_ascii=False))
+
+
+async def handle_health(request):
+    rag = request.app[RAG_KEY]
+    ready = rag.wait_until_ready(0)
+    starting = rag._init_thread is not None and not rag.is_ready
+    health = {"status": "ok" if ready else ("starting" if starting else "error")}
+    engine = request.app[ENGINE_KEY].get("engine")
+    if engine is not None:
+        health["engine"] = engine.stats()
+    llm_client = getattr(rag, "llm_client", None)
+    if llm_client is not None:
+        health["llm"] = llm_client.stats()
+    return web.json_response(health, status=200 if ready else 503)
+
+
+async def handle_metrics(request):
+    from rag_bot import metrics
+    lines = [metrics.render_prometheus().rstrip("\n")]
+    engine = request.app[ENGINE_KEY].get("engine")
+    for name, value in (engine.stats() if engine is not None else {}).items():
+        lines.append(f"# TYPE rag_engine_{name} gauge")
+        lines.append(f"rag_engine_{name} {value}")
+    return web.Response(text="\n".join(lines) + "\n", content_type="text/plain")
+
+
+def create_app(rag_system=None, engine=None):
+    """Application aiohttp; sans ``rag_system``, un RAGSystem est initialisé en arrière-plan"""
+    if rag_system is None:
+        from rag_bot import RAGSystem
+        rag_system = RAGSystem()
+        rag_system.initialize_async()
+    app = web.Application(client_max_size=1024 ** 2)
+    app[RAG_KEY] = rag_system
+    app[ENGINE_KEY] = {"engine": engine}
+    app.router.add_post("/query", handle_query)
+    app.router.add_post("/query/stream", handle_stream)
+    app.router.add_post("/query/batch", handle_batch)
+    app.router.add_get("/health", handle_health)
+    app.router.add_get("/metrics", handle_metrics)
+
+    async def close_engine(app):
+        if app[ENGINE_KEY]["engine"] is not None:
+            app[ENGINE_KEY]["engine"].close()
+    app.on_cleanup.append(close_engine)
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="API HTTP de l'assistant sécurité minière")
+    parser.add_argument("--host", default=Config.API_HOST)
+    parser.add_argument("--port", type=int, default=Config.API_PORT)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    logger.info(f"🌐 API à l'écoute sur http://{args.host}:{args.port}")
+    web.run_app(create_app(), host=args.host, port=args.port, access_log=None)
@@ -1,6 +1,11 @@
 import streamlit as st
 from rag_bot import RAGSystem
+from monitoring import ChatbotMonitor
+from conversation import Conversation
+from config import Config
+from diagnostics import MemoryTracker, SessionTracker, health_report
 import os
+import uuid
 from dotenv import load_dotenv
 
 # Charger les variables d'environnement
@@ -89,29 +94,36 @@ with st.sidebar:
     """)
 
 # Initialisation du système RAG
+@st.cache_resource
+def get_monitor():
+    return ChatbotMonitor()
+
+@st.cache_resource
+def get_sessions():
+    return SessionTracker(max_messages=Config.SESSION_MAX_MESSAGES, idle_seconds=Config.SESSION_IDLE_SECONDS)
+
+@st.cache_resource
+def get_memory_tracker():
+    tracker = MemoryTracker(frames=Config.TRACEMALLOC_FRAMES)
+    if Config.TRACEMALLOC_AT_STARTUP:
+        tracker.start()
+    return tracker
+
 @st.cache_resource
 def init_rag_system():
-    try:
-        with st.spinner("🔄 Initialisation du système..."):
-            # Vérifier la clé API
-            api_key = os.getenv("GROQ_API_KEY")
-            if not api_key:
-                st.error("❌ GROQ_API_KEY manquante dans le fichier .env")
-                return None
-            
-            rag = RAGSystem()
-            if rag.initialize():
-                st.success("✅ Système initialisé avec succès")
-                return rag
-            else:
-                st.error("❌ Échec de l'initialisation du système RAG")
-                return None
-                
-    except Exception as e:
-        st.error(f"❌ Erreur lors de l'initialisation: {str(e)}")
+    # Vérifier la clé API
+    api_key = os.getenv("GROQ_API_KEY")
+    if not api_key:
+        st.error("❌ GROQ_API_KEY manquante dans le fichier .env")
         return None
+    
+    # Chargement du modèle et de la base en arrière-plan: la page s'affiche immédiatement
+    rag = RAGSystem()
+    rag.initialize_async()
+    return rag
 
 # Initialiser le système
+get_memory_tracker()
 rag_system = init_rag_system()
 
 if not rag_system:
@@ -119,9 +131,25 @@ if not rag_system:
     st.info("💡 Vérifiez que votre clé API GROQ est correcte dans le fichier .env")
     st.stop()
 
+with st.sidebar:
+    if rag_system.is_ready and rag_system.wait_until_ready(timeout=0):
+        st.caption("✅ Système prêt")
+    elif rag_system.is_ready:
+        st.caption("❌ Échec de l'initialisation")
+    else:
+        st.caption("⏳ Chargement du modèle en cours...")
+
 # Interface de chat
 st.header("💬 Chat Assistant")
 
+# Mémoire de la conversation (relances, historique compressé)
+if "conversation" not in st.session_state:
+    st.session_state.conversation = Conversation(
+        recent_turns=Config.CONVERSATION_RECENT_TURNS,
+        summary_tokens=Config.CONVERSATION_SUMMARY_TOKENS,
+        turn_tokens=Config.CONVERSATION_TURN_TOKENS
+    )
+
 # Initialisation des messages
 if "messages" not in st.session_state:
     st.session_state.messages = []
@@ -141,6 +169,12 @@ Je suis votre assistant spécialisé en **sécurité HSE pour l'industrie miniè
 Posez-moi votre question !"""
     })
 
+# Historique borné (Config.SESSION_MAX_MESSAGES) et suivi des sessions pour le diagnostic
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+get_sessions().trim(st.session_state.messages)
+get_sessions().touch(st.session_state.session_id, st.session_state.messages)
+
 # Affichage des messages
 for message in st.session_state.messages:
     with st.chat_message(message["role"]):
@@ -159,34 +193,54 @@ if prompt := st.chat_input("💬 Posez votre question sur la sécurité minière
     
     # Générer et afficher la réponse
     with st.chat_message("assistant"):
-        with st.spinner("🔍 Recherche dans la base de connaissances..."):
-            try:
-                # Interroger le système RAG
-                result = rag_system.query(prompt)
+        if not rag_system.is_ready:
+            with st.spinner("🔄 Initialisation du système..."):
+                rag_system.wait_until_ready()
+        if not rag_system.wait_until_ready(timeout=0):
+            st.error("❌ Échec de l'initialisation du système RAG")
+            st.stop()
+        
+        try:
+            # Interroger le système RAG en streaming
+            events = rag_system.stream_query(prompt, conversation=st.session_state.conversation)
+            placeholder = st.empty()
+            with st.spinner("🔍 Recherche dans la base de connaissances..."):
+                kind, payload = next(events)
+            
+            # Afficher les tokens au fil de leur génération
+            response = ""
+            while kind == "token":
+                response += payload
+                placeholder.markdown(response + "▌")
+                kind, payload = next(events)
+            result = payload
+            
+            if "error" in result:
+                placeholder.empty()
+                response = f"❌ Une erreur est survenue : {result['error']}"
+                st.error(response)
+            else:
+                response = result["answer"]
+                placeholder.markdown(response)
+                get_monitor().log_interaction(prompt, response, result.get("sources", []), result.get("timings"),
+                                              cached=result.get("cached"))
                 
-                if "error" in result:
-                    response = f"❌ Une erreur est survenue : {result['error']}"
-                    st.error(response)
-                else:
-                    response = result["answer"]
-                    st.markdown(response)
-                    
-                    # Afficher les sources consultées
-                    if result.get("sources") and len(result["sources"]) > 0:
-                        with st.expander("📚 Sources consultées", expanded=False):
-                            sources = list(set(result["sources"]))  # Supprimer les doublons
-                            for i, source in enumerate(sources, 1):
-                                if source != "Inconnu":
-                                    st.text(f"{i}. {source}")
-                    
-                    # Ajouter une note de sécurité
-                    if any(keyword in prompt.lower() for keyword in ['urgence', 'accident', 'danger', 'blessure']):
-                        st.warning("⚠️ **IMPORTANT :** En cas de situation d'urgence réelle, contactez immédiatement les secours (15, 18, ou 112) !")
+                # Afficher les sources consultées
+                if result.get("sources") and len(result["sources"]) > 0:
+                    with st.expander("📚 Sources consultées", expanded=False):
+                        sources = list(set(result["sources"]))  # Supprimer les doublons
+                        for i, source in enumerate(sources, 1):
+                            if source != "Inconnu":
+                                st.text(f"{i}. {source}")
                 
-            except Exception as e:
-                response = f"❌ Une erreur technique est survenue : {str(e)}"
-                st.error(response)
-                st.info("💡 Veuillez réessayer ou reformuler votre question.")
+                # Ajouter une note de sécurité
+                if any(keyword in prompt.lower() for keyword in ['urgence', 'accident', 'danger', 'blessure']):
+                    st.warning("⚠️ **IMPORTANT :** En cas de situation d'urgence réelle, contactez immédiatement les secours (15, 18, ou 112) !")
+            
+        except Exception as e:
+            response = f"❌ Une erreur technique est survenue : {str(e)}"
+            st.error(response)
+            st.info("💡 Veuillez réessayer ou reformuler votre question.")
     
     # Ajouter la réponse à l'historique
     st.session_state.messages.append({"role": "assistant", "content": response})
@@ -196,8 +250,35 @@ with st.sidebar:
     st.markdown("---")
     if st.button("🗑️ Effacer l'historique", type="secondary"):
         st.session_state.messages = []
+        st.session_state.conversation.clear()
         st.rerun()
 
+# Diagnostic: mémoire, index, caches, sessions et profil des requêtes
+with st.sidebar:
+    with st.expander("🩺 Diagnostic", expanded=False):
+        memory = get_memory_tracker()
+        col1, col2 = st.columns(2)
+        if col1.button("⏹️ Arrêter le suivi" if memory.tracing else "🔬 Suivre la mémoire"):
+            if memory.tracing:
+                memory.stop()
+            else:
+                memory.start()
+        if col2.button("🔥 Profiler la prochaine question"):
+            rag_system.profile_next_queries()
+        # Rapport calculé à la demande (parcours de l'index, instantané mémoire), pas à chaque exécution du script
+        if st.button("🔄 Rafraîchir"):
+            ready = rag_system.is_ready and rag_system.wait_until_ready(timeout=0)
+            st.session_state.health_report = health_report(rag_system if ready else None, get_sessions(), memory,
+                                                           baseline=st.session_state.session_id)
+        report = st.session_state.get("health_report")
+        if report is None:
+            st.caption("Cliquez sur « Rafraîchir » pour calculer le rapport.")
+        else:
+            process = report["process"]
+            st.caption(f"RSS {process.get('rss_mb', '?')} Mo (pic {process.get('peak_rss_mb', '?')} Mo), "
+                       f"{report['sessions']['active_sessions']} sessions")
+            st.json(report, expanded=False)
+
 # Footer
 st.markdown("---")
 st.markdown("""
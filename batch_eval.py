@@ -0,0 +1,266 @@
+"""Génération de réponses en masse pour une liste de questions (CSV ou JSONL).
+
+Au lieu d'appeler ``RAGSystem.query`` question par question:
+
+1. toutes les questions sont embeddées en un seul appel vectorisé;
+2. la recherche vectorielle est un produit matriciel questions × chunks,
+   par blocs, avec sélection des meilleurs candidats par ``argpartition``,
+   limitée aux collections choisies par ``rag.router`` (index partitionné);
+3. les réponses (fusion BM25, reclassement, génération) sont réparties sur
+   un pool de threads borné; les appels au LLM, et eux seuls (ni réponses
+   structurées ni cache), ont un débit limité (requêtes par minute) qui
+   ralentit quand le LLM renvoie des réponses de repli (429, pannes);
+4. chaque résultat est ajouté au fichier JSONL dès qu'il est prêt, avec ses
+   durées. Une exécution interrompue reprend là où elle s'était arrêtée: les
+   questions déjà répondues (sans erreur ni repli) sont ignorées.
+
+    python batch_eval.py questions.csv --output reponses.jsonl --concurrency 4 --rpm 30
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+
+from config import Config
+from document_matrix import DocumentMatrix
+from shards import DEFAULT_SHARD
+
+logger = logging.getLogger(__name__)
+
+
+def question_id(question):
+    """Identifiant stable d'une question sans identifiant (reprise après interruption)"""
+    return f"q-{zlib.crc32(' '.join(question.split()).lower().encode('utf-8')):08x}"
+
+
+def load_questions(path):
+    """Questions d'un fichier CSV (colonne ``question``, ``id`` facultative) ou JSONL"""
+    items = []
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        if path.lower().endswith(".csv"):
+            rows = csv.DictReader(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+        for row in rows:
+            question = (row.get("question") or "").strip()
+            if not question:
+                continue
+            items.append({"id": str(row.get("id") or question_id(question)), "question": question})
+    return items
+
+
+def completed_ids(output_path):
+    """Identifiants déjà répondus dans ``output_path`` (les erreurs, réponses de repli et réponses interrompues sont refaites)"""
+    status = {}
+    if not os.path.exists(output_path):
+        return set()
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # dernière ligne tronquée par une interruption
+            status[record.get("id")] = ("error" not in record and not record.get("fallback")
+                                        and not record.get("interrupted"))
+    return {item_id for item_id, ok in status.items() if ok}
+
+
+def _drop_partial_line(path):
+    """Retirer la dernière ligne incomplète d'un fichier JSONL interrompu en cours d'écriture"""
+    if not os.path.exists(path):
+        return
+    with open(path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+            logger.warning(f"⚠️ Dernière ligne incomplète retirée de {path}")
+
+
+class RateLimiter:
+    """Espacement minimal entre deux appels, doublé en cas de limitation et rétabli progressivement"""
+
+    def __init__(self, requests_per_minute, max_slowdown=8.0):
+        self.base_interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self.slowdown = 1.0
+        self.max_slowdown = max_slowdown
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Attendre son tour; renvoie le temps d'attente (s)"""
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.base_interval * self.slowdown
+        wait = start - now
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def throttled(self):
+        with self._lock:
+            self.slowdown = min(self.max_slowdown, self.slowdown * 2)
+        logger.warning(f"🐢 LLM saturé, débit réduit (intervalle x{self.slowdown:g})")
+
+    def succeeded(self):
+        with self._lock:
+            self.slowdown = max(1.0, self.slowdown * 0.9)
+
+
+class ThrottledLLMClient:
+    """Client LLM dont chaque appel attend son tour auprès de ``limiter``.
+
+    Le temps d'attente du dernier appel du thread courant est disponible dans
+    ``waited()`` (None si le thread n'a pas appelé le LLM).
+    """
+
+    def __init__(self, client, limiter):
+        self.client = client
+        self.limiter = limiter
+        self._local = threading.local()
+
+    def stream(self, prompt):
+        self._local.wait = self.limiter.acquire()
+        return self.client.stream(prompt)
+
+    def reset(self):
+        self._local.wait = None
+
+    def waited(self):
+        return getattr(self._local, "wait", None)
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+
+def _answer(rag, item, vector, docs, llm_client):
+    llm_client.reset()
+    start = time.perf_counter()
+    try:
+        result = rag.query(item["question"], vector, vector_docs=docs)
+    except Exception as e:
+        result = {"error": str(e)}
+    record = {"id": item["id"], "question": item["question"]}
+    record.update(result or {"error": "aucune réponse"})
+    queue_s = llm_client.waited()
+    record["queue_ms"] = round((queue_s or 0.0) * 1000, 1)
+    record["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    if queue_s is None:
+        return record  # réponse structurée ou en cache: le débit du LLM n'est pas en jeu
+    if record.get("fallback") or record.get("interrupted") or "error" in record:
+        llm_client.limiter.throttled()
+    else:
+        llm_client.limiter.succeeded()
+    return record
+
+
+def _search(rag, matrix, pending, vectors, k):
+    """Recherche matricielle, restreinte pour chaque question aux collections de ``rag.router``"""
+    shards = getattr(rag.retriever.vectorstore, "shards", None)
+    router = getattr(rag, "router", None)
+    if router is None or shards is None:
+        return matrix.search(vectors, k)
+    groups = {}
+    for i, item in enumerate(pending):
+        routed = router.route(item["question"], shards)
+        groups.setdefault(tuple(routed) if routed is not None else None, []).append(i)
+    hits = [None] * len(pending)
+    for routed, indices in groups.items():
+        rows = matrix.rows_in_shards(routed, DEFAULT_SHARD) if routed is not None else None
+        for i, item_hits in zip(indices, matrix.search(np.asarray(vectors)[indices], k, rows)):
+            hits[i] = item_hits
+    return hits
+
+
+def run_batch(rag, items, output_path, concurrency=None, requests_per_minute=None, resume=True):
+    """Répondre à ``items`` et ajouter les résultats à ``output_path``; renvoie un résumé"""
+    concurrency = concurrency or Config.BATCH_CONCURRENCY
+    requests_per_minute = requests_per_minute if requests_per_minute is not None else Config.BATCH_REQUESTS_PER_MINUTE
+    if resume:
+        _drop_partial_line(output_path)
+    done = completed_ids(output_path) if resume else set()
+    pending = [item for item in items if item["id"] not in done]
+    summary = {"total": len(items), "skipped": len(items) - len(pending), "answered": 0, "fallbacks": 0,
+               "interrupted": 0, "errors": 0}
+    if not pending:
+        logger.info("✅ Toutes les questions ont déjà une réponse")
+        return summary
+    logger.info(f"📋 {len(pending)} questions à traiter ({summary['skipped']} déjà répondues)")
+
+    start = time.perf_counter()
+    embed_many = getattr(rag.embeddings, "embed_queries", rag.embeddings.embed_documents)
+    vectors = embed_many([item["question"] for item in pending])
+    summary["embed_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+    start = time.perf_counter()
+    matrix = DocumentMatrix.from_vectorstore(rag.retriever.vectorstore)
+    k = rag.retriever.search_kwargs.get("k", 4)
+    fetch_k = max(k, Config.HYBRID_FETCH_K if rag.lexical_index is not None else k,
+                  Config.RERANK_CANDIDATES if rag.reranker is not None else k)
+    hits = _search(rag, matrix, pending, vectors, fetch_k)
+    summary["search_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    logger.info(f"🔎 {len(pending)} recherches sur {len(matrix)} chunks en {summary['search_ms']:.0f} ms")
+
+    # Débit limité au plus près de l'appel LLM (le client est restauré en fin de lot)
+    llm_client = ThrottledLLMClient(rag.llm_client, RateLimiter(requests_per_minute))
+    rag.llm_client = llm_client
+    latencies = []
+    mode = "a" if resume else "w"
+    start = time.perf_counter()
+    try:
+        with open(output_path, mode, encoding="utf-8") as out, \
+                ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch") as executor:
+            futures = [executor.submit(_answer, rag, item, vector, matrix.documents(item_hits), llm_client)
+                       for item, vector, item_hits in zip(pending, vectors, hits)]
+            for n, future in enumerate(as_completed(futures), 1):
+                record = future.result()
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                if "error" in record:
+                    summary["errors"] += 1
+                else:
+                    summary["answered"] += 1
+                    summary["fallbacks"] += bool(record.get("fallback"))
+                    summary["interrupted"] += bool(record.get("interrupted"))
+                    latencies.append(record["elapsed_ms"])
+                if n % 10 == 0 or n == len(futures):
+                    logger.info(f"⏳ {n}/{len(futures)} questions traitées")
+    finally:
+        rag.llm_client = llm_client.client
+    elapsed = time.perf_counter() - start
+    summary["answer_s"] = round(elapsed, 2)
+    summary["questions_per_s"] = round(len(pending) / elapsed, 3) if elapsed else None
+    if latencies:
+        summary["latency_p50_ms"] = round(float(np.percentile(latencies, 50)), 1)
+        summary["latency_p95_ms"] = round(float(np.percentile(latencies, 95)), 1)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Réponses en masse à une liste de questions HSE")
+    parser.add_argument("questions", help="fichier CSV (colonne 'question') ou JSONL")
+    parser.add_argument("--output", default="batch_answers.jsonl", help="fichier JSONL des réponses")
+    parser.add_argument("--concurrency", type=int, default=Config.BATCH_CONCURRENCY, help="appels LLM simultanés")
+    parser.add_argument("--rpm", type=float, default=Config.BATCH_REQUESTS_PER_MINUTE,
+                        help="requêtes LLM par minute (0 = sans limite)")
+    parser.add_argument("--restart", action="store_true", help="ignorer les réponses existantes et réécrire le fichier")
+    args = parser.parse_args()
+
+    from rag_bot import RAGSystem
+    items = load_questions(args.questions)
+    rag = RAGSystem()
+    if not rag.initialize():
+        raise SystemExit("❌ Initialisation du RAGSystem impossible")
+    summary = run_batch(rag, items, args.output, args.concurrency, args.rpm, resume=not args.restart)
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
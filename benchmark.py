@@ -0,0 +1,338 @@
+"""Benchmark hors ligne de la qualité de recherche et des performances du RAG.
+
+Indexe les documents dans un répertoire temporaire (caches froids), évalue la
+recherche sur un jeu de questions HSE annotées (``benchmarks/questions.json``)
+et mesure les latences de bout en bout contre un LLM factice local
+(``stub_llm.py``) à la place de Groq. Les résultats sont écrits en JSON et
+comparés à une référence pour détecter les régressions entre deux commits:
+
+    python benchmark.py --output benchmarks/results.json
+    python benchmark.py --baseline benchmarks/baseline.json   # code de sortie 1 si régression
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+from config import Config
+from lexical_index import strip_accents
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUESTIONS = os.path.join("benchmarks", "questions.json")
+DEFAULT_OUTPUT = os.path.join("benchmarks", "results.json")
+
+# Baisse absolue tolérée pour les métriques de qualité (recall, MRR)
+QUALITY_TOLERANCE = 0.02
+# Dégradation relative tolérée pour les débits, latences et mémoire
+PERFORMANCE_TOLERANCE = 0.25
+
+# (chemin dans les résultats, sens: +1 plus grand est meilleur, -1 plus petit est meilleur, type)
+TRACKED_METRICS = [
+    ("retrieval.recall_at_k", +1, "quality"),
+    ("retrieval.mrr", +1, "quality"),
+    ("ingestion.pages_per_s", +1, "performance"),
+    ("ingestion.chunks_per_s", +1, "performance"),
+    ("latency.embed_ms.p95", -1, "performance"),
+    ("latency.search_ms.p95", -1, "performance"),
+    ("latency.end_to_end_ms.p95", -1, "performance"),
+    ("memory.peak_rss_mb", -1, "performance"),
+]
+
+
+def load_questions(path=DEFAULT_QUESTIONS):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)["questions"]
+
+
+def _normalize(text):
+    return strip_accents(text).lower()
+
+
+def is_relevant(metadata, text, expected):
+    """Un document (métadonnées, texte) correspond-il à une annotation ``expected`` ?
+
+    La source et les autres métadonnées annotées doivent être identiques; si
+    ``contains`` est précisé, le texte doit contenir l'un de ces termes.
+    """
+    if os.path.normpath(metadata.get("source", "")) != os.path.normpath(expected["source"]):
+        return False
+    for key, value in expected.items():
+        if key not in ("source", "contains") and metadata.get(key) != value:
+            return False
+    contains = expected.get("contains")
+    if contains:
+        normalized = _normalize(text)
+        return any(_normalize(term) in normalized for term in contains)
+    return True
+
+
+def relevance_ranks(docs, expected):
+    """Rang (à partir de 1) du premier document pertinent pour chaque annotation, None si absent"""
+    ranks = []
+    for annotation in expected:
+        rank = next((i for i, doc in enumerate(docs, start=1)
+                     if is_relevant(doc.metadata, doc.page_content, annotation)), None)
+        ranks.append(rank)
+    return ranks
+
+
+def recall_at_k(ranks, k):
+    """Part des annotations retrouvées dans les ``k`` premiers documents"""
+    if not ranks:
+        return 0.0
+    return sum(1 for rank in ranks if rank is not None and rank <= k) / len(ranks)
+
+
+def reciprocal_rank(ranks):
+    """Inverse du rang du premier document pertinent (0 si aucun)"""
+    found = [rank for rank in ranks if rank is not None]
+    return 1.0 / min(found) if found else 0.0
+
+
+def percentiles(values):
+    """Résumé d'une série de durées (ms)"""
+    if not values:
+        return {"n": 0}
+    array = np.asarray(values, dtype=np.float64)
+    return {
+        "n": len(values),
+        "mean": round(float(array.mean()), 3),
+        "p50": round(float(np.percentile(array, 50)), 3),
+        "p95": round(float(np.percentile(array, 95)), 3),
+        "p99": round(float(np.percentile(array, 99)), 3),
+    }
+
+
+def peak_rss_mb():
+    """Pic de mémoire résidente du processus (Mo); None sous Windows (pas de module ``resource``)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux: kilo-octets; macOS: octets
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _lookup(results, path):
+    value = results
+    for key in path.split("."):
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return value
+
+
+def compare_to_baseline(results, baseline, quality_tolerance=QUALITY_TOLERANCE,
+                        performance_tolerance=PERFORMANCE_TOLERANCE):
+    """Liste des régressions de ``results`` par rapport à ``baseline`` (vide si aucune)"""
+    regressions = []
+    for path, direction, kind in TRACKED_METRICS:
+        current, reference = _lookup(results, path), _lookup(baseline, path)
+        if current is None or reference is None:
+            continue
+        if kind == "quality":
+            regressed = direction * (reference - current) > quality_tolerance
+        else:
+            limit = reference * (1 + performance_tolerance) if direction < 0 else reference * (1 - performance_tolerance)
+            regressed = current > limit if direction < 0 else current < limit
+        if regressed:
+            regressions.append(f"{path}: {reference} → {current}")
+    return regressions
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _use_workdir(workdir):
+    """Rediriger la base, l'index BM25 et le cache d'embeddings vers ``workdir``"""
+    Config.DB_DIR = os.path.join(workdir, "db")
+    Config.BM25_INDEX_PATH = os.path.join(workdir, "db", "bm25_index.json")
+    Config.EMBEDDING_CACHE_DIR = os.path.join(workdir, "db", "embedding_cache")
+    Config.METRICS_FILE = os.path.join(workdir, "metrics.prom")
+    Config.WATCH_DATA_DIR = False
+    # Chaque question n'est posée qu'une fois par passe: pas de cache de réponses
+    Config.ANSWER_CACHE_ENABLED = False
+
+
+def run_benchmark(questions, k=3, repeat=3, llm_url=None, with_llm=True):
+    """Indexer, évaluer la recherche et mesurer les latences; renvoie le dictionnaire de résultats"""
+    from lexical_index import BM25Index
+    from rag_bot import RAGSystem, get_embeddings, load_vectorstore
+
+    # Ingestion à froid (cache d'embeddings vide)
+    logger.info("📥 Ingestion des documents...")
+    ingestion = {}
+    embeddings = get_embeddings()
+    load_vectorstore(embeddings, incremental=False, lexical_index=BM25Index(), stats=ingestion)
+
+    if llm_url:
+        Config.GROQ_BASE_URL = llm_url
+    os.environ.setdefault("GROQ_API_KEY", "stub")
+    rag = RAGSystem()
+    if not rag.initialize():
+        raise RuntimeError("Initialisation du système RAG impossible")
+    rag.retriever.search_kwargs["k"] = k
+    model = getattr(rag.embeddings, "embeddings", rag.embeddings)
+
+    # Qualité de recherche et latences embedding / recherche
+    logger.info(f"🔎 Évaluation de la recherche sur {len(questions)} questions (k={k}, {repeat} passes)...")
+    embed_ms, search_ms, per_question = [], [], []
+    for run in range(repeat):
+        for item in questions:
+            start = time.perf_counter()
+            vector = model.embed_query(item["question"])
+            embed_ms.append((time.perf_counter() - start) * 1000)
+            start = time.perf_counter()
+            docs = rag._retrieve(item["question"], vector)
+            search_ms.append((time.perf_counter() - start) * 1000)
+            if run == 0:
+                ranks = relevance_ranks(docs, item["expected"])
+                per_question.append({"id": item["id"], "ranks": ranks, "recall": recall_at_k(ranks, k),
+                                     "reciprocal_rank": reciprocal_rank(ranks)})
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "questions": len(questions),
+            "repeat": repeat,
+        },
+        "config": {
+            "embedding_model": Config.EMBEDDING_MODEL,
+            "chunk_size": Config.CHUNK_SIZE,
+            "chunk_overlap": Config.CHUNK_OVERLAP,
+            "chunker": Config.CHUNKER,
+            "vector_store": Config.VECTOR_STORE,
+            "sharding": Config.SHARDING_ENABLED,
+            "hybrid_search": Config.HYBRID_SEARCH_ENABLED,
+        },
+        "ingestion": {key: round(value, 3) if isinstance(value, float) else value
+                      for key, value in ingestion.items()},
+        "retrieval": {
+            "k": k,
+            "recall_at_k": round(float(np.mean([q["recall"] for q in per_question])), 4),
+            "mrr": round(float(np.mean([q["reciprocal_rank"] for q in per_question])), 4),
+            "per_question": per_question,
+        },
+        "latency": {"embed_ms": percentiles(embed_ms), "search_ms": percentiles(search_ms)},
+    }
+
+    # Latence de bout en bout contre le LLM factice
+    if with_llm:
+        logger.info("🤖 Requêtes de bout en bout...")
+        end_to_end_ms, ttft_ms, errors = [], [], 0
+        for _ in range(repeat):
+            for item in questions:
+                result = rag.query(item["question"])
+                if "error" in result:
+                    errors += 1
+                    continue
+                end_to_end_ms.append(result["latency_ms"])
+                if "ttft_ms" in result:
+                    ttft_ms.append(result["ttft_ms"])
+        results["latency"]["end_to_end_ms"] = percentiles(end_to_end_ms)
+        results["latency"]["ttft_ms"] = percentiles(ttft_ms)
+        results["latency"]["errors"] = errors
+
+    results["memory"] = {"peak_rss_mb": peak_rss_mb()}
+    return results
+
+
+def print_summary(results):
+    retrieval, latency = results["retrieval"], results["latency"]
+    ingestion = results["ingestion"]
+    print(f"✂️ découpage: {results['config']['chunker']}, base vectorielle: {results['config']['vector_store']}")
+    print(f"📊 recall@{retrieval['k']}: {retrieval['recall_at_k']:.3f}  MRR: {retrieval['mrr']:.3f}")
+    print(f"📥 ingestion: {ingestion.get('pages', 0)} pages, {ingestion.get('added_chunks', 0)} chunks "
+          f"({ingestion.get('pages_per_s', 0):.1f} pages/s, {ingestion.get('chunks_per_s', 0):.1f} chunks/s)")
+    for name, summary in latency.items():
+        if isinstance(summary, dict) and summary.get("n"):
+            print(f"⏱️ {name}: p50={summary['p50']:.1f} p95={summary['p95']:.1f} p99={summary['p99']:.1f}")
+    print(f"🧠 pic RSS: {results['memory']['peak_rss_mb']} Mo")
+    missed = [q["id"] for q in retrieval["per_question"] if q["recall"] < 1.0]
+    if missed:
+        print(f"❔ Questions incomplètes: {', '.join(missed)}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark hors ligne du chatbot sécurité minière")
+    parser.add_argument("--questions", default=DEFAULT_QUESTIONS, help="jeu de questions annotées")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="fichier JSON des résultats")
+    parser.add_argument("--baseline", help="résultats de référence à comparer")
+    parser.add_argument("--k", type=int, default=3, help="nombre de documents retrouvés")
+    parser.add_argument("--repeat", type=int, default=3, help="passes de mesure des latences")
+    parser.add_argument("--workdir", help="répertoire de travail (temporaire par défaut)")
+    parser.add_argument("--llm-url", help="LLM compatible OpenAI à utiliser au lieu du LLM factice")
+    parser.add_argument("--stub-latency-ms", type=float, default=0, help="délai du LLM factice avant le premier token")
+    parser.add_argument("--stub-token-delay-ms", type=float, default=0, help="délai du LLM factice entre les tokens")
+    parser.add_argument("--chunker", choices=["structured", "character"], help="découpage des documents")
+    parser.add_argument("--vector-store", choices=["chroma", "quantized"], help="base vectorielle")
+    parser.add_argument("--no-sharding", action="store_true", help="une seule collection (sans routage)")
+    parser.add_argument("--no-llm", action="store_true", help="ne mesurer que l'ingestion et la recherche")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    questions = load_questions(args.questions)
+    workdir = args.workdir or tempfile.mkdtemp(prefix="rag-bench-")
+    _use_workdir(workdir)
+    if args.chunker:
+        Config.CHUNKER = args.chunker
+    if args.vector_store:
+        Config.VECTOR_STORE = args.vector_store
+    if args.no_sharding:
+        Config.SHARDING_ENABLED = False
+
+    stub = None
+    try:
+        llm_url = args.llm_url
+        if not args.no_llm and not llm_url:
+            from stub_llm import StubLLMServer
+            stub = StubLLMServer(latency_ms=args.stub_latency_ms, token_delay_ms=args.stub_token_delay_ms).start()
+            llm_url = stub.url
+        results = run_benchmark(questions, k=args.k, repeat=args.repeat, llm_url=llm_url, with_llm=not args.no_llm)
+    finally:
+        if stub is not None:
+            stub.stop()
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print_summary(results)
+    print(f"💾 Résultats écrits dans {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(results, baseline)
+        if regressions:
+            print("❌ Régressions par rapport à la référence:")
+            for regression in regressions:
+                print(f"   - {regression}")
+            return 1
+        print("✅ Aucune régression par rapport à la référence")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,269 @@
+"""Découpage des documents HSE selon leur structure (titres, clauses numérotées, phrases).
+
+``CharacterTextSplitter`` coupe le texte des PDF à n'importe quel saut de
+ligne: articles, procédures numérotées et tableaux se retrouvent coupés au
+milieu d'une phrase. ``StructuredSplitter`` découpe le flux de pages d'un
+fichier en une seule passe:
+
+- les titres (« 3.2 Équipements », « Article 12 », lignes en majuscules)
+  ouvrent une nouvelle section et ne sont jamais séparés de leur contenu;
+- les clauses numérotées, puces et lignes de tableau restent des unités entières;
+- la prose est recollée (césures, retours à la ligne) puis découpée en phrases;
+- les en-têtes et pieds de page répétés et les numéros de page sont ignorés.
+
+Les chunks regroupent des unités entières jusqu'à ``chunk_size`` caractères,
+avec un recouvrement d'une ou deux phrases, et portent en métadonnées la page,
+le chemin de section et le titre du document.
+"""
+import os
+import re
+
+_HEADING_WORDS_RE = re.compile(r"^(titre|chapitre|section|article|annexe|partie)\s+([\dIVXLC]+|premier|unique)\b", re.IGNORECASE)
+_NUMBERED_HEADING_RE = re.compile(r"^((\d+)(\.\d+)*)\.?\s+[A-ZÀ-Ý]")
+_ROMAN_HEADING_RE = re.compile(r"^[IVX]+[\.\-)]\s+\S")
+_LIST_ITEM_RE = re.compile(r"^(\d+[\.)]|[a-z][\.)]|[-•▪●◦–*])\s+")
+_TABLE_ROW_RE = re.compile(r"\S(\s{3,}|\t|\s\|\s)\S.*(\s{3,}|\t|\s\|\s)\S")
+_PAGE_NUMBER_RE = re.compile(r"^(page\s*)?\d+(\s*(/|sur|of)\s*\d+)?$", re.IGNORECASE)
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?…])\s+(?=[«\"(\[A-ZÀ-Ý0-9])")
+_DIGITS_RE = re.compile(r"\d+")
+
+# Abréviations suivies d'un point qui ne terminent pas une phrase
+ABBREVIATIONS = frozenset("""
+art al cf chap ch env etc ex fig hab m mm mme mlle n no nº p pp par réf ref resp s sect tab vol éd
+""".split())
+
+HEADING_LEVELS = {"titre": 1, "partie": 1, "chapitre": 1, "section": 2, "article": 3, "annexe": 1}
+
+
+def _is_caps_heading(line):
+    letters = [c for c in line if c.isalpha()]
+    return 4 <= len(letters) and len(line) <= 80 and all(c.isupper() for c in letters) and not line.endswith(".")
+
+
+def heading_level(line):
+    """Niveau de titre de ``line`` (1 = plus haut), ou None si ce n'est pas un titre"""
+    if len(line) > 100 or line.endswith((".", ";", ",")):
+        return None
+    match = _HEADING_WORDS_RE.match(line)
+    if match:
+        return HEADING_LEVELS[match.group(1).lower()]
+    match = _NUMBERED_HEADING_RE.match(line)
+    if match and len(line) <= 80:
+        # « 2024 Rapport » ou « 15 kg » ne sont pas des titres numérotés
+        if int(match.group(2)) > 50:
+            return None
+        return match.group(1).count(".") + 1
+    if _ROMAN_HEADING_RE.match(line):
+        return 1
+    if _is_caps_heading(line):
+        return 1
+    return None
+
+
+def split_sentences(text):
+    """Découper un paragraphe en phrases (abréviations françaises courantes respectées)"""
+    sentences = []
+    for piece in _SENTENCE_SPLIT_RE.split(text):
+        if sentences:
+            last_word = sentences[-1][-1].rsplit(None, 1)[-1].rstrip(".").lower()
+            if last_word in ABBREVIATIONS or len(last_word) == 1:
+                sentences[-1].append(piece)
+                continue
+        sentences.append([piece])
+    return [sentence for sentence in (" ".join(pieces).strip() for pieces in sentences) if sentence]
+
+
+def _hard_split(text, size):
+    """Couper un texte trop long aux espaces, en morceaux d'au plus ``size`` caractères"""
+    pieces = []
+    while len(text) > size:
+        cut = text.rfind(" ", 0, size)
+        cut = cut if cut > size // 2 else size
+        pieces.append(text[:cut].strip())
+        text = text[cut:].strip()
+    if text:
+        pieces.append(text)
+    return pieces
+
+
+def _document_title(source, first_page):
+    for line in first_page.splitlines():
+        line = line.strip()
+        if not line or _PAGE_NUMBER_RE.match(line):
+            continue
+        if len(line) <= 120 and not line.endswith("."):
+            return line
+        break
+    return os.path.splitext(os.path.basename(source))[0].replace("_", " ").replace("-", " ")
+
+
+class StructuredSplitter:
+    """Découpage structurel et par phrases, en flux, du contenu d'un fichier"""
+
+    def __init__(self, chunk_size=1000, chunk_overlap=200, min_chunk_size=200):
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.min_chunk_size = min_chunk_size
+
+    def split_documents(self, docs):
+        """Compatibilité avec l'interface des text splitters de langchain"""
+        return list(self.split_stream(iter(docs)))
+
+    def split_stream(self, pages):
+        """Produire les chunks d'un flux de pages (``Document``) d'un même fichier.
+
+        L'état (section courante, phrase coupée en fin de page) est conservé
+        d'une page à l'autre; les documents sans numéro de page (éléments de la
+        base JSON) sont découpés indépendamment.
+        """
+        state = None
+        document = None  # classe des documents produits: celle des pages reçues
+        for page in pages:
+            document = type(page)
+            if "page" not in page.metadata:
+                for text in self._split_plain(page.page_content):
+                    yield document(page_content=text, metadata=dict(page.metadata))
+                continue
+            if state is None:
+                state = _StreamState(self, page)
+            for text, metadata in state.feed(page):
+                yield document(page_content=text, metadata=metadata)
+        if state is not None:
+            for text, metadata in state.close():
+                yield document(page_content=text, metadata=metadata)
+
+    def _split_plain(self, text):
+        text = text.strip()
+        if len(text) <= self.chunk_size:
+            return [text] if text else []
+        chunks, current = [], ""
+        for sentence in split_sentences(" ".join(text.split())):
+            for piece in _hard_split(sentence, self.chunk_size):
+                if current and len(current) + 1 + len(piece) > self.chunk_size:
+                    chunks.append(current)
+                    current = ""
+                current = f"{current} {piece}".strip()
+        if current:
+            chunks.append(current)
+        return chunks
+
+
+class _StreamState:
+    """État du découpage d'un fichier: section, paragraphe en cours et chunk en construction"""
+
+    def __init__(self, splitter, first_page):
+        self.splitter = splitter
+        self.source = first_page.metadata.get("source", "")
+        self.base_metadata = {key: value for key, value in first_page.metadata.items() if key != "page"}
+        self.title = _document_title(self.source, first_page.page_content)
+        self.sections = []  # [(niveau, titre)]
+        self.paragraph = []
+        self.paragraph_size = 0
+        self.paragraph_page = None
+        self.units = []  # [(texte, page, est_un_titre)]
+        self.size = 0
+        self.chunk_sections = ""
+        self.edge_lines = set()
+
+    def _section_path(self):
+        return " > ".join(title for _, title in self.sections)
+
+    def _clean_lines(self, text):
+        lines = [line.strip() for line in text.splitlines()]
+        lines = [line for line in lines if line]
+        # En-têtes et pieds de page: lignes de bord déjà vues sur une page précédente
+        edges = {i for i in (0, 1, len(lines) - 2, len(lines) - 1) if 0 <= i < len(lines)}
+        cleaned = []
+        for i, line in enumerate(lines):
+            if _PAGE_NUMBER_RE.match(line):
+                continue
+            if i in edges:
+                key = _DIGITS_RE.sub("#", line.lower())
+                if key in self.edge_lines:
+                    continue
+                self.edge_lines.add(key)
+            cleaned.append(line)
+        return cleaned
+
+    def feed(self, page):
+        page_number = page.metadata.get("page")
+        for line in self._clean_lines(page.page_content):
+            level = heading_level(line)
+            if level is not None:
+                yield from self._flush_paragraph()
+                yield from self._start_section(level, line, page_number)
+            elif _LIST_ITEM_RE.match(line) or _TABLE_ROW_RE.search(line):
+                yield from self._flush_paragraph()
+                self.paragraph, self.paragraph_page, self.paragraph_size = [line], page_number, len(line)
+            else:
+                if not self.paragraph:
+                    self.paragraph_page = page_number
+                self.paragraph.append(line)
+                self.paragraph_size += len(line) + 1
+                # Fin de phrase, ou texte sans ponctuation (extraction dégradée) trop long
+                if line.endswith((".", "!", "?", ":", "…")) or self.paragraph_size > self.splitter.chunk_size:
+                    yield from self._flush_paragraph()
+        # Une phrase inachevée continue sur la page suivante
+
+    def close(self):
+        yield from self._flush_paragraph()
+        yield from self._emit()
+
+    def _flush_paragraph(self):
+        if not self.paragraph:
+            return
+        parts = []
+        for line in self.paragraph:
+            if parts and parts[-1].endswith("-") and line[:1].islower():
+                parts[-1] = parts[-1][:-1] + line  # césure
+            else:
+                parts.append(line)
+        text = " ".join(parts)
+        self.paragraph = []
+        self.paragraph_size = 0
+        sentences = [text] if _TABLE_ROW_RE.search(text) or _LIST_ITEM_RE.match(text) else split_sentences(text)
+        for sentence in sentences:
+            for piece in _hard_split(sentence, self.splitter.chunk_size):
+                yield from self._add_unit(piece, self.paragraph_page)
+
+    def _start_section(self, level, title, page_number):
+        # Un chunk ne chevauche pas deux sections, sauf s'il est encore trop court
+        if self.size >= self.splitter.min_chunk_size:
+            yield from self._emit()
+        while self.sections and self.sections[-1][0] >= level:
+            self.sections.pop()
+        self.sections.append((level, title))
+        yield from self._add_unit(title, page_number, heading=True)
+
+    def _add_unit(self, text, page_number, heading=False):
+        if self.units and self.size + 1 + len(text) > self.splitter.chunk_size:
+            yield from self._emit(keep_overlap=not heading)
+        if not heading and not any(not is_heading for _, _, is_heading in self.units):
+            # Chemin de section du chunk: celui de son premier contenu
+            self.chunk_sections = self._section_path()
+        self.units.append((text, page_number, heading))
+        self.size += len(text) + (1 if len(self.units) > 1 else 0)
+
+    def _emit(self, keep_overlap=False):
+        body = [unit for unit in self.units if not unit[2]]
+        if not body:
+            return  # uniquement des titres: ils seront rattachés au chunk suivant
+        pages = [page for _, page, _ in self.units if page is not None]
+        metadata = dict(self.base_metadata, title=self.title, section_path=self.chunk_sections,
+                        page=pages[0] if pages else 0)
+        if pages and pages[-1] != pages[0]:
+            metadata["page_end"] = pages[-1]
+        yield "\n".join(text for text, _, _ in self.units), metadata
+
+        # Recouvrement: dernières phrases du chunk, dans la limite de chunk_overlap
+        overlap = []
+        if keep_overlap:
+            size = 0
+            for unit in reversed(body):
+                if size + len(unit[0]) > self.splitter.chunk_overlap:
+                    break
+                overlap.insert(0, unit)
+                size += len(unit[0]) + 1
+        self.units = overlap
+        self.size = sum(len(text) + 1 for text, _, _ in overlap) - (1 if overlap else 0)
+        self.chunk_sections = self._section_path()
@@ -3,21 +3,171 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+# Fichier (dans la racine de la base) désignant la génération d'index active
+ACTIVE_INDEX_FILE = "ACTIVE_INDEX"
+
+def active_index_dir(root):
+    """Index actif: la dernière génération rechargée à chaud (cf. ``RAGSystem.reload_index``), sinon ``root``"""
+    try:
+        with open(os.path.join(root, ACTIVE_INDEX_FILE), "r", encoding="utf-8") as f:
+            path = f.read().strip()
+    except OSError:
+        return root
+    return path if path and os.path.isdir(path) else root
+
 class Config:
     # API Configuration
     GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-    GROQ_BASE_URL = "https://api.groq.com/openai/v1"
+    GROQ_BASE_URL = os.getenv("GROQ_BASE_URL", "https://api.groq.com/openai/v1")
     GROQ_MODEL = "llama-3.1-8b-instant"
     
     # Paths
-    DATA_DIR = "data"
-    DB_DIR = "db"
+    DATA_DIR = "data"  # tous les fichiers PDF et JSON y sont indexés
+    DB_ROOT = "db"  # cache d'embeddings, générations d'index
+    DB_DIR = active_index_dir(DB_ROOT)  # index actif
+    KNOWLEDGE_BASE_FILE = os.path.join(DATA_DIR, "mining_safety_database.json")
+    
+    # Réponses directes depuis la base structurée (sans LLM)
+    STRUCTURED_FAST_PATH = True
+    
+    # Embeddings
+    EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+    EMBEDDING_CACHE_DIR = os.path.join(DB_ROOT, "embedding_cache")
+    EMBEDDING_CACHE_MEMORY_ITEMS = 20000
+    # Backend: "torch" (sentence-transformers) ou "onnx" (graphe ONNX int8, cf. onnx_embeddings.py)
+    EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+    ONNX_MODEL_DIR = os.path.join("models", "all-MiniLM-L6-v2-onnx")
+    ONNX_QUANTIZED = True  # poids int8 (quantification dynamique)
+    ONNX_THREADS = None  # threads d'inférence (None = nombre de cœurs)
+    ONNX_MAX_LENGTH = 256  # tokens par texte, comme sentence-transformers
+    # Changement de backend: l'index existant est conservé si les classements le sont
+    EMBEDDING_PARITY_SAMPLE = 200  # chunks réencodés pour la vérification
+    EMBEDDING_PARITY_K = 10
+    EMBEDDING_PARITY_MIN_OVERLAP = 0.9  # recouvrement moyen des top-k, sinon réindexation complète
+    
+    # Base vectorielle: "chroma" ou "quantized" (int8 en memory-map, faible mémoire)
+    VECTOR_STORE = "chroma"
+    QUANTIZED_RESCORE = True  # réévaluer les meilleurs candidats en float32
+    QUANTIZED_RESCORE_CANDIDATES = 50
+    QUANTIZED_KEEP_FLOAT = True  # conserver les vecteurs float32 sur disque pour la réévaluation
     
     # RAG Parameters
     CHUNK_SIZE = 1000
     CHUNK_OVERLAP = 200
+    CHUNKER = "structured"  # "structured" (titres, clauses, phrases) ou "character"
+    MIN_CHUNK_SIZE = 200  # en dessous, un chunk se poursuit dans la section suivante
     RETRIEVER_K = 5
     
+    # Recherche hybride (BM25 + vecteurs, fusion par rang réciproque)
+    HYBRID_SEARCH_ENABLED = True
+    HYBRID_VECTOR_WEIGHT = 1.0
+    HYBRID_BM25_WEIGHT = 1.0
+    HYBRID_FETCH_K = 10  # candidats par méthode avant fusion
+    RRF_K = 60
+    BM25_INDEX_PATH = os.path.join(DB_DIR, "bm25_index.json")
+    
+    # Index partitionné: une collection par domaine, recherche limitée aux collections utiles
+    SHARDING_ENABLED = True
+    SHARD_KEYWORDS = {  # mots-clés des noms de fichiers et des questions, par collection
+        "regulation": ["reglementation", "reglement", "decret", "loi", "arrete", "norme", "iso", "dahir", "circulaire"],
+        "mining": ["mine", "minier", "miniere", "explosif", "tir", "galerie", "carriere", "forage", "convoyeur", "ocp"],
+        # Termes propres à la base JSON (annuaire): « urgence », « zone »... figurent aussi dans les PDF des sites
+        "structured": ["contact", "numero", "telephone", "appeler", "joindre", "annuaire"],
+    }
+    SHARD_ALWAYS_SEARCH = ["general"]  # collections interrogées pour toute question routée
+    SHARD_SEARCH_WORKERS = 4  # recherches simultanées dans les collections
+
+    # Reclassement des candidats par cross-encoder
+    RERANK_ENABLED = True
+    RERANK_MODEL = "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1"  # multilingue (français)
+    RERANK_CANDIDATES = 30  # candidats sur-sélectionnés avant reclassement
+    RERANK_BATCH_SIZE = 8
+    RERANK_BUDGET_MS = 250  # au-delà, les candidats restants gardent l'ordre de la recherche
+    RERANK_MAX_LENGTH = 256  # tokens par paire question/passage
+    
+    # Assemblage du contexte (fusion des chevauchements, doublons, budget de tokens)
+    CONTEXT_PACKING_ENABLED = True
+    CONTEXT_TOKEN_BUDGET = 1500  # tokens de contexte pour llama-3.1-8b-instant
+    CONTEXT_DEDUP_THRESHOLD = 0.8  # similarité de Jaccard des shingles
+    CONTEXT_MIN_OVERLAP = 20  # caractères communs minimum pour fusionner deux chunks
+    
+    # Réindexation à chaud des fichiers de DATA_DIR
+    WATCH_DATA_DIR = True
+    WATCH_INTERVAL = 30  # secondes entre deux scrutations
+    INDEX_GENERATIONS_DIR = os.path.join(DB_ROOT, "index-generations")
+
+    # Ingestion
+    INGEST_WORKERS = None  # processus d'extraction PDF (None = nombre de cœurs)
+    INGEST_PAGES_PER_TASK = 8
+    EMBED_BATCH_SIZE = 64  # chunks embeddés et écrits par lot
+    
+    # Mémoire de conversation
+    CONVERSATION_RECENT_TURNS = 2  # échanges conservés tels quels (tronqués)
+    CONVERSATION_SUMMARY_TOKENS = 200  # résumé des échanges plus anciens
+    CONVERSATION_TURN_TOKENS = 150  # longueur maximale d'une réponse rappelée
+    
+    # Cache des réponses
+    ANSWER_CACHE_ENABLED = True
+    ANSWER_CACHE_MAX_ENTRIES = 256
+    ANSWER_CACHE_TTL = 3600  # secondes
+    ANSWER_CACHE_SIMILARITY = 0.93  # similarité cosinus minimale
+    
+    # Moteur de requêtes asynchrone
+    ENGINE_MAX_WORKERS = 8
+    ENGINE_MAX_PENDING = 64  # requêtes simultanées avant refus
+    ENGINE_TIMEOUT = 90  # secondes par requête
+    ENGINE_BATCH_WINDOW_MS = 5  # fenêtre de regroupement des embeddings
+    ENGINE_MAX_BATCH = 32
+    
+    # API HTTP (api.py)
+    API_HOST = os.getenv("API_HOST", "127.0.0.1")
+    API_PORT = int(os.getenv("API_PORT", "8000"))
+    API_MAX_BATCH = 32  # questions par requête /query/batch
+    API_MAX_TIMEOUT = 120  # secondes: plafond du champ "timeout" des requêtes
+
+    # Réponses en masse (batch_eval.py)
+    BATCH_CONCURRENCY = 4  # appels LLM simultanés
+    BATCH_REQUESTS_PER_MINUTE = 30  # limite de débit Groq (0 = sans limite)
+
+    # Client LLM résilient (connexions persistantes, tentatives, hedging, disjoncteur)
+    LLM_MAX_CONNECTIONS = 10
+    LLM_CONNECT_TIMEOUT = 5  # secondes
+    LLM_READ_TIMEOUT = 30  # secondes sans donnée reçue
+    LLM_DEADLINE = 20  # secondes pour obtenir le premier token, tentatives comprises
+    LLM_MAX_RETRIES = 2  # sur 429, 5xx et erreurs réseau
+    LLM_BACKOFF_BASE = 0.5  # secondes, doublé à chaque tentative (avec aléa)
+    LLM_BACKOFF_MAX = 4
+    LLM_HEDGE_ENABLED = True  # requête dupliquée si le premier token tarde
+    LLM_HEDGE_AFTER_MS = 2000  # délai initial, remplacé par le p95 observé
+    LLM_HEDGE_QUANTILE = 0.95
+    LLM_BREAKER_THRESHOLD = 5  # échecs consécutifs avant ouverture du disjoncteur
+    LLM_BREAKER_RESET = 30  # secondes avant un appel d'essai
+    LLM_FALLBACK_ENABLED = True  # réponse extractive si le LLM est indisponible
+
+    # Journaux
+    LOG_FILE = os.getenv("LOG_FILE", "logs/chatbot.log")
+    LOG_MAX_BYTES = 10 * 1024 * 1024  # rotation du journal applicatif
+    LOG_BACKUP_COUNT = 5
+    INTERACTION_LOG_DIR = os.getenv("INTERACTION_LOG_DIR", "logs/interactions")
+    INTERACTION_LOG_QUEUE = 10000  # interactions en attente avant abandon
+    INTERACTION_LOG_BATCH = 256  # interactions écrites par lot
+    INTERACTION_LOG_FLUSH_SECONDS = 1.0
+    INTERACTION_LOG_SEGMENT_BYTES = 8 * 1024 * 1024  # taille d'un segment avant compression
+
+    # Diagnostic (diagnostics.py, panneau « Diagnostic » de l'interface)
+    SESSION_MAX_MESSAGES = 100  # messages affichés conservés par session (les plus anciens sont retirés)
+    SESSION_IDLE_SECONDS = 3600  # session retirée du suivi après cette inactivité
+    TRACEMALLOC_AT_STARTUP = False  # suivre les allocations Python dès le démarrage (ralentit le processus)
+    TRACEMALLOC_FRAMES = 1
+    PROFILE_DIR = os.path.join("logs", "profiles")
+    PROFILE_INTERVAL_MS = 5  # période d'échantillonnage des piles
+    PROFILE_SLOW_QUERY_MS = None  # profiler chaque requête et garder celles plus lentes (None = à la demande)
+    PROFILE_MAX_FILES = 20
+
+    # Métriques de latence
+    METRICS_WINDOW = 1000  # requêtes conservées pour les percentiles
+    METRICS_FILE = os.path.join("logs", "metrics.prom")
+    
     # Model Parameters
     TEMPERATURE = 0.1
     MAX_TOKENS = 1000
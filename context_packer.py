@@ -0,0 +1,170 @@
+"""Assemblage du contexte envoyé au LLM, sous budget de tokens.
+
+Les chunks retrouvés se chevauchent souvent (``chunk_overlap`` de 200
+caractères) et répètent les mêmes en-têtes de page des PDF. Avant la
+construction du prompt, ce module:
+
+1. fusionne les chunks adjacents ou chevauchants d'une même source;
+2. retire les lignes d'en-tête déjà présentes dans un passage précédent
+   (pas dans les chunks de la base JSON, dont les lignes courtes répétées
+   sont des intitulés de champs porteurs de sens);
+3. écarte les quasi-doublons (similarité de Jaccard sur les shingles de mots);
+4. remplit le contexte par ordre de pertinence jusqu'au budget de tokens,
+   le dernier passage étant coupé à une fin de phrase si nécessaire.
+"""
+import logging
+import re
+import zlib
+from dataclasses import dataclass, field
+from typing import List
+
+from monitoring import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"\w+")
+_SENTENCE_END_RE = re.compile(r"[.!?;:]\s")
+
+# Lignes courtes répétées d'un chunk à l'autre (en-têtes, pieds de page)
+BOILERPLATE_MAX_CHARS = 120
+
+
+@dataclass
+class Passage:
+    text: str
+    metadata: dict
+    rank: int
+
+
+@dataclass
+class PackedContext:
+    passages: List[Passage]
+    stats: dict = field(default_factory=dict)
+
+    @property
+    def text(self):
+        return "\n\n".join(passage.text for passage in self.passages)
+
+
+def _merge_key(metadata):
+    return metadata.get("source"), metadata.get("page")
+
+
+def overlap_length(a, b, min_overlap=20):
+    """Longueur du plus long suffixe de ``a`` qui est aussi un préfixe de ``b`` (0 si < ``min_overlap``)"""
+    probe = b[:min_overlap]
+    if len(probe) < min_overlap:
+        return 0
+    start = a.find(probe)
+    while start != -1:
+        if b.startswith(a[start:]):
+            return len(a) - start
+        start = a.find(probe, start + 1)
+    return 0
+
+
+def merge_texts(a, b, min_overlap=20):
+    """Texte fusionné de deux chunks contigus ou inclus l'un dans l'autre, sinon None"""
+    if b in a:
+        return a
+    if a in b:
+        return b
+    overlap = overlap_length(a, b, min_overlap)
+    if overlap:
+        return a + b[overlap:]
+    overlap = overlap_length(b, a, min_overlap)
+    if overlap:
+        return b + a[overlap:]
+    return None
+
+
+def shingles(text, size=5):
+    """Empreintes des séquences de ``size`` mots consécutifs"""
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < size:
+        return {zlib.crc32(" ".join(words).encode("utf-8"))} if words else set()
+    return {zlib.crc32(" ".join(words[i:i + size]).encode("utf-8")) for i in range(len(words) - size + 1)}
+
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _truncate(text, max_tokens):
+    """Couper ``text`` à la dernière fin de phrase tenant dans ``max_tokens``"""
+    limit = max_tokens * 4 - len(" […]")
+    if len(text) <= limit:
+        return text
+    head = text[:limit]
+    ends = [m.end() for m in _SENTENCE_END_RE.finditer(head)]
+    return (head[:ends[-1]] if ends else head).rstrip() + " […]"
+
+
+def pack_context(docs, token_budget=1500, similarity_threshold=0.8, min_overlap=20, min_tail_tokens=50):
+    """Assembler le contexte de ``docs`` (classés par pertinence) dans ``token_budget`` tokens"""
+    input_tokens = sum(estimate_tokens(doc.page_content) for doc in docs)
+    stats = {"input_chunks": len(docs), "input_tokens": input_tokens, "merged": 0,
+             "boilerplate_lines": 0, "duplicates": 0, "dropped": 0, "truncated": 0}
+
+    # 1. Fusion des chunks chevauchants d'une même source (et page)
+    passages = []
+    for rank, doc in enumerate(docs):
+        passage = Passage(doc.page_content.strip(), dict(doc.metadata), rank)
+        merged = True
+        while merged:
+            merged = False
+            for other in passages:
+                if _merge_key(other.metadata) != _merge_key(passage.metadata):
+                    continue
+                text = merge_texts(other.text, passage.text, min_overlap)
+                if text is not None:
+                    passages.remove(other)
+                    passage = Passage(text, other.metadata, min(other.rank, passage.rank))
+                    stats["merged"] += 1
+                    merged = True
+                    break
+        passages.append(passage)
+    passages.sort(key=lambda p: p.rank)
+
+    # 2. En-têtes et pieds de page répétés
+    seen_lines = set()
+    for passage in passages:
+        if passage.metadata.get("type") == "json":
+            continue
+        lines = []
+        for line in passage.text.splitlines():
+            key = line.strip().lower()
+            if key and len(key) <= BOILERPLATE_MAX_CHARS and key in seen_lines:
+                stats["boilerplate_lines"] += 1
+                continue
+            seen_lines.add(key)
+            lines.append(line)
+        passage.text = "\n".join(lines).strip()
+
+    # 3. Quasi-doublons et 4. remplissage du budget
+    kept, kept_shingles, used = [], [], 0
+    for passage in passages:
+        if not passage.text:
+            continue
+        signature = shingles(passage.text)
+        if any(jaccard(signature, other) >= similarity_threshold for other in kept_shingles):
+            stats["duplicates"] += 1
+            continue
+        tokens = estimate_tokens(passage.text)
+        remaining = token_budget - used
+        if tokens > remaining:
+            if remaining < min_tail_tokens:
+                stats["dropped"] += 1
+                continue
+            passage.text = _truncate(passage.text, remaining)
+            tokens = estimate_tokens(passage.text)
+            stats["truncated"] += 1
+        kept.append(passage)
+        kept_shingles.append(signature)
+        used += tokens
+
+    stats["output_tokens"] = used
+    stats["saved_tokens"] = input_tokens - used
+    return PackedContext(kept, stats)
@@ -0,0 +1,124 @@
+"""Mémoire de conversation: question autonome, historique compressé et réutilisation de la recherche.
+
+Une relance comme « et pour les explosifs ? » n'a pas de sens seule: elle est
+réécrite en question autonome en la rattachant à la dernière question de fond
+de l'échange, sans appel au LLM. Les derniers échanges sont conservés tels
+quels (tronqués) et les plus anciens sont résumés de façon extractive
+(question et première phrase de la réponse) dans un résumé borné en tokens.
+Quand une relance n'introduit aucun terme nouveau (« peux-tu détailler ? »),
+les documents du tour précédent sont réutilisés sans embedding ni recherche.
+"""
+import re
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional
+
+from lexical_index import strip_accents, tokenize
+from monitoring import estimate_tokens
+
+_WORD_RE = re.compile(r"[\w-]+")
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s")
+
+# Débuts de phrase qui marquent une relance (texte en minuscules, sans accents)
+FOLLOW_UP_STARTS = ("et ", "mais ", "aussi", "pour ", "dans ce cas", "alors", "ensuite", "puis ",
+                    "sinon", "egalement", "idem", "meme chose")
+# Pronoms renvoyant à l'échange précédent
+ANAPHORA = frozenset({"ca", "cela", "ceci", "celui-ci", "celle-ci", "ceux-ci", "celles-ci", "il", "elle",
+                      "ils", "elles", "dernier", "derniere", "precedent", "precedente"})
+# Termes de relance qui ne changent pas le sujet (forme produite par ``tokenize``)
+CLARIFICATION_WORDS = frozenset({"detail", "detaille", "detailler", "explique", "expliquer", "precise",
+                                 "preciser", "plu", "pourquoi", "exemple", "resume", "resumer", "developpe",
+                                 "developper", "encore", "etape", "ensuite", "aussi", "autre", "peu", "peut",
+                                 "pourrai", "clairement", "simplement", "merci", "ok", "d'accord"})
+
+
+def first_sentence(text, max_chars=200):
+    text = " ".join(text.split())
+    sentence = _SENTENCE_END_RE.split(text, 1)[0]
+    return sentence if len(sentence) <= max_chars else sentence[:max_chars].rsplit(" ", 1)[0] + "…"
+
+
+def _truncate_tokens(text, max_tokens):
+    limit = max_tokens * 4
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit].rsplit(" ", 1)[0] + "…"
+
+
+@dataclass
+class Turn:
+    """Question préparée pour un tour de conversation"""
+    question: str
+    query: str
+    follow_up: bool = False
+    reuse_docs: Optional[list] = None
+
+
+class Conversation:
+    """État d'une conversation: derniers échanges, résumé borné et dernière recherche"""
+
+    def __init__(self, recent_turns=2, summary_tokens=200, turn_tokens=150):
+        self.recent = deque()
+        self.recent_turns = recent_turns
+        self.summary = deque()
+        self.summary_tokens = summary_tokens
+        self.turn_tokens = turn_tokens
+        self.anchor = None  # dernière question de fond (non relance)
+        self.last_query = None
+        self.last_docs = None
+
+    def __len__(self):
+        return len(self.recent) + len(self.summary)
+
+    def is_follow_up(self, question):
+        if self.anchor is None:
+            return False
+        normalized = strip_accents(question).lower().strip()
+        if normalized.startswith(FOLLOW_UP_STARTS):
+            return True
+        if ANAPHORA.intersection(_WORD_RE.findall(normalized)):
+            return True
+        # Question courte: relance seulement si elle demande une précision ou reprend le sujet
+        # (« plus de détails ? », « le front de taille ? »), pas « qu'est-ce que le grisou ? »
+        terms = set(tokenize(question))
+        if len(terms) > 2:
+            return False
+        anchor_terms = set(tokenize(self.last_query or self.anchor))
+        return not terms or bool(terms & (CLARIFICATION_WORDS | anchor_terms))
+
+    def prepare(self, question):
+        """Question autonome pour la recherche, et documents réutilisables si le sujet n'a pas changé"""
+        if not self.is_follow_up(question):
+            return Turn(question, question)
+        query = f"{self.anchor} {question}"
+        new_terms = set(tokenize(question)) - CLARIFICATION_WORDS
+        known_terms = set(tokenize(self.last_query or self.anchor))
+        reuse = self.last_docs if self.last_docs and new_terms <= known_terms else None
+        return Turn(question, query, follow_up=True, reuse_docs=reuse)
+
+    def record(self, turn, answer, docs):
+        """Enregistrer le tour terminé (réponse et documents utilisés)"""
+        if not turn.follow_up:
+            self.anchor = turn.question
+        self.last_query = turn.query
+        self.last_docs = list(docs) if docs else None
+        self.recent.append((turn.question, answer))
+        while len(self.recent) > self.recent_turns:
+            old_question, old_answer = self.recent.popleft()
+            self.summary.append(f"- {_truncate_tokens(old_question, 40)} → {first_sentence(old_answer)}")
+        while self.summary and sum(estimate_tokens(line) for line in self.summary) > self.summary_tokens:
+            self.summary.popleft()
+
+    def history_text(self):
+        """Historique compressé à joindre au prompt (vide au premier tour)"""
+        parts = []
+        if self.summary:
+            parts.append("Résumé des échanges précédents:\n" + "\n".join(self.summary))
+        for question, answer in self.recent:
+            parts.append(f"Utilisateur: {_truncate_tokens(question, 60)}\n"
+                         f"Assistant: {_truncate_tokens(answer, self.turn_tokens)}")
+        return "\n\n".join(parts)
+
+    def clear(self):
+        self.recent.clear()
+        self.summary.clear()
+        self.anchor = self.last_query = self.last_docs = None
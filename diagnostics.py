@@ -0,0 +1,327 @@
+"""Diagnostic d'un processus de longue durée: mémoire, index, caches, sessions, profils.
+
+``health_report`` rassemble en un dictionnaire ce qui explique la mémoire
+résidente d'un déploiement Streamlit qui tourne depuis des semaines:
+
+- mémoire du processus (RSS courant et pic) et, si ``tracemalloc`` est actif,
+  les allocations Python attribuées par composant (torch, Chroma, LangChain,
+  Streamlit, application...) et leur croissance depuis l'instantané précédent.
+  Les tenseurs alloués en C++ n'y figurent pas: la taille des modèles est
+  donc calculée à part (paramètres torch ou fichier ONNX);
+- taille de l'index (disque, chunks, collections, BM25) et occupation des caches;
+- nombre de sessions et taille de leur historique (``SessionTracker``, qui
+  borne aussi l'historique affiché de chaque session);
+- profils des requêtes lentes: ``SamplingProfiler`` échantillonne la pile du
+  thread qui exécute une requête et l'écrit au format « folded » (flame graph).
+"""
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+
+from resources import registry
+
+logger = logging.getLogger(__name__)
+
+_PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Paquets dont les allocations sont regroupées (premier trouvé dans le chemin)
+COMPONENTS = (
+    ("sentence_transformers", "sentence-transformers"),
+    ("transformers", "transformers"),
+    ("torch", "torch"),
+    ("onnxruntime", "onnxruntime"),
+    ("tokenizers", "tokenizers"),
+    ("chromadb", "chroma"),
+    ("langchain_community", "langchain"),
+    ("langchain_core", "langchain"),
+    ("langchain", "langchain"),
+    ("streamlit", "streamlit"),
+    ("numpy", "numpy"),
+    ("pypdf", "pypdf"),
+)
+
+
+def _mb(n_bytes):
+    return round(n_bytes / (1024 * 1024), 1) if n_bytes is not None else None
+
+
+def component_of(filename):
+    """Composant auquel attribuer les allocations faites dans ``filename``"""
+    parts = filename.replace("\\", "/").split("/")
+    for package, component in COMPONENTS:
+        if package in parts:
+            return component
+    if os.path.abspath(filename).startswith(_PROJECT_DIR + os.sep):
+        return "application"
+    return "autres"
+
+
+def process_memory():
+    """RSS courant et pic du processus (Mo); RSS courant lu dans /proc sous Linux, pic absent sous Windows"""
+    memory = {}
+    try:
+        import resource
+    except ImportError:  # Windows
+        pass
+    else:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        memory["peak_rss_mb"] = round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    try:
+        with open("/proc/self/status", "r", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    memory["rss_mb"] = round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    memory["threads"] = threading.active_count()
+    return memory
+
+
+class MemoryTracker:
+    """Instantanés ``tracemalloc`` regroupés par composant, avec la croissance entre deux instantanés.
+
+    La croissance est calculée par rapport au précédent instantané du même
+    ``baseline`` (ex: une session Streamlit): les instantanés d'un appelant
+    ne déplacent pas la référence des autres.
+    """
+
+    def __init__(self, frames=1):
+        self.frames = frames
+        self._previous = {}
+
+    @property
+    def tracing(self):
+        return tracemalloc.is_tracing()
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            logger.info("🔬 Suivi des allocations Python activé (tracemalloc)")
+
+    def stop(self):
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self._previous = {}
+
+    def snapshot(self, top=10, baseline=None):
+        if not tracemalloc.is_tracing():
+            return {"tracing": False}
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ])
+        stats = snapshot.statistics("filename")
+        components = Counter()
+        for stat in stats:
+            components[component_of(stat.traceback[0].filename)] += stat.size
+        current, peak = tracemalloc.get_traced_memory()
+        report = {
+            "tracing": True,
+            "traced_mb": _mb(current),
+            "traced_peak_mb": _mb(peak),
+            "components_mb": {name: _mb(size) for name, size in components.most_common()},
+            "top_files": [{"file": stat.traceback[0].filename, "mb": _mb(stat.size), "blocks": stat.count}
+                          for stat in stats[:top]],
+        }
+        previous = self._previous.get(baseline)
+        if previous is not None:
+            report["growth_mb"] = {name: _mb(components[name] - previous.get(name, 0))
+                                   for name in set(components) | set(previous)
+                                   if components[name] != previous.get(name, 0)}
+        self._previous[baseline] = components
+        return report
+
+
+def model_bytes(model):
+    """Taille en mémoire d'un modèle: paramètres torch, ou fichier du graphe ONNX"""
+    for candidate in (model, getattr(model, "client", None), getattr(model, "model", None)):
+        if candidate is None:
+            continue
+        if hasattr(candidate, "parameters"):
+            tensors = list(candidate.parameters()) + list(getattr(candidate, "buffers", lambda: [])())
+            return sum(t.numel() * t.element_size() for t in tensors)
+        path = getattr(candidate, "model_path", None)
+        if path and os.path.exists(path):
+            return os.path.getsize(path)
+    return None
+
+
+def directory_bytes(path, exclude=()):
+    total = 0
+    for root, dirs, files in os.walk(path):
+        dirs[:] = [d for d in dirs if d not in exclude]
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+class SessionTracker:
+    """Sessions actives et taille de leur historique; borne l'historique affiché de chaque session.
+
+    Ne conserve que des compteurs (pas de référence aux messages): le suivi
+    ne retient pas la mémoire des sessions fermées.
+    """
+
+    def __init__(self, max_messages=100, idle_seconds=3600, clock=time.monotonic):
+        self.max_messages = max_messages
+        self.idle_seconds = idle_seconds
+        self._clock = clock
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self.trimmed_messages = 0
+
+    def trim(self, messages):
+        """Retirer les messages les plus anciens au-delà de ``max_messages`` (le message d'accueil est gardé)"""
+        excess = len(messages) - self.max_messages
+        if not self.max_messages or excess <= 0:
+            return 0
+        start = 1 if messages and messages[0].get("role") == "assistant" else 0
+        del messages[start:start + excess]
+        with self._lock:
+            self.trimmed_messages += excess
+        return excess
+
+    def touch(self, session_id, messages):
+        """Enregistrer l'état d'une session (à chaque exécution du script)"""
+        now = self._clock()
+        size = sum(len(message.get("content", "")) for message in messages)
+        with self._lock:
+            self._sessions[session_id] = {"messages": len(messages), "chars": size, "seen": now}
+            expired = [sid for sid, info in self._sessions.items() if now - info["seen"] > self.idle_seconds]
+            for sid in expired:
+                del self._sessions[sid]
+
+    def stats(self):
+        with self._lock:
+            sessions = list(self._sessions.values())
+        return {
+            "active_sessions": len(sessions),
+            "messages": sum(s["messages"] for s in sessions),
+            "history_kb": round(sum(s["chars"] for s in sessions) / 1024, 1),
+            "largest_session_messages": max((s["messages"] for s in sessions), default=0),
+            "max_messages": self.max_messages,
+            "trimmed_messages": self.trimmed_messages,
+        }
+
+
+class SamplingProfiler:
+    """Échantillonnage périodique de la pile d'un thread (piles agrégées au format « folded »)"""
+
+    def __init__(self, thread_id=None, interval=0.005):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        frame = sys._current_frames().get(self.thread_id)
+        if frame is None:
+            return
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+            frame = frame.f_back
+        self.stacks[";".join(reversed(names))] += 1
+        self.samples += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1)
+        return self
+
+    def hotspots(self, top=10):
+        """Fonctions les plus souvent en haut de pile ``(fonction, part des échantillons)``"""
+        leaves = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        return [(name, round(count / self.samples, 3)) for name, count in leaves.most_common(top)] if self.samples else []
+
+    def folded(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def dump(self, directory, label="query", max_files=20):
+        """Écrire les piles dans ``directory`` (les plus anciens profils au-delà de ``max_files`` sont supprimés)"""
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{label}-{datetime.now():%Y%m%d-%H%M%S-%f}.folded")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.folded())
+        profiles = sorted(name for name in os.listdir(directory) if name.endswith(".folded"))
+        for name in profiles[:-max_files] if max_files else []:
+            os.remove(os.path.join(directory, name))
+        return path
+
+
+def index_report(vectordb=None, lexical_index=None):
+    """Taille de l'index actif: disque, chunks, collections, BM25"""
+    from config import Config
+    from rag_bot import _document_count
+    report = {
+        "dir": Config.DB_DIR,
+        "disk_mb": _mb(directory_bytes(Config.DB_DIR, exclude={
+            os.path.basename(Config.EMBEDDING_CACHE_DIR), os.path.basename(Config.INDEX_GENERATIONS_DIR)})),
+        "vector_store": Config.VECTOR_STORE,
+    }
+    if vectordb is not None:
+        report["chunks"] = _document_count(vectordb)
+        if hasattr(vectordb, "shards"):
+            report["shards"] = vectordb.shards
+        if hasattr(vectordb, "index") and hasattr(vectordb.index, "resident_bytes"):
+            report["resident_mb"] = _mb(vectordb.index.resident_bytes())
+    if lexical_index is not None:
+        report["bm25_chunks"] = len(lexical_index)
+    return report
+
+
+def health_report(rag=None, sessions=None, memory=None, baseline=None):
+    """Rapport de santé du processus (cf. docstring du module); ``rag`` est un ``RAGSystem`` initialisé.
+
+    ``baseline`` désigne la référence de croissance mémoire (cf. ``MemoryTracker``).
+    Le rapport parcourt le répertoire de l'index: à calculer à la demande.
+    """
+    report = {"process": process_memory(), "resources_loaded_s": {
+        name: round(seconds, 2) for name, seconds in registry.load_times.items()}}
+    if memory is not None:
+        report["memory"] = memory.snapshot(baseline=baseline)
+    if rag is not None and rag.retriever is not None:
+        embeddings = rag.embeddings
+        report["models_mb"] = {"embeddings": _mb(model_bytes(getattr(embeddings, "embeddings", embeddings)))}
+        if rag.reranker is not None and rag.reranker._model is not None:
+            report["models_mb"]["reranker"] = _mb(model_bytes(rag.reranker._model))
+        report["index"] = index_report(rag.retriever.vectorstore, rag.lexical_index)
+        caches = {}
+        if hasattr(embeddings, "stats"):
+            caches["embeddings"] = embeddings.stats()
+        if rag.answer_cache is not None:
+            caches["answers"] = rag.answer_cache.stats()
+        report["caches"] = caches
+        if rag.llm_client is not None:
+            report["llm"] = rag.llm_client.stats()
+        if rag.watcher is not None:
+            report["watcher"] = rag.watcher.stats()
+        report["profiles"] = {"pending": rag.profile_requests, "last": rag.last_profile}
+    if sessions is not None:
+        report["sessions"] = sessions.stats()
+    return report
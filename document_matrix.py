@@ -0,0 +1,69 @@
+"""Recherche matricielle exacte dans les vecteurs de tous les chunks de l'index.
+
+``DocumentMatrix`` charge les vecteurs de la base (normalisés) en une matrice
+et recherche de nombreuses questions à la fois par produit matriciel, par
+blocs, avec sélection des meilleurs candidats par ``argpartition``. Utilisée
+par les réponses en masse (``batch_eval``) et par la vérification de parité
+des backends d'embeddings (``onnx_embeddings.check_parity``).
+"""
+import numpy as np
+
+# Questions traitées par bloc lors du produit matriciel
+SEARCH_BLOCK_QUESTIONS = 256
+
+
+def _document_class():
+    try:
+        from langchain.schema import Document
+    except ImportError:
+        from langchain_core.documents import Document
+    return Document
+
+
+class DocumentMatrix:
+    """Vecteurs normalisés de tous les chunks, pour la recherche de nombreuses questions à la fois"""
+
+    def __init__(self, vectors, texts, metadatas):
+        vectors = np.asarray(vectors, dtype=np.float32) if len(texts) else np.zeros((0, 1), dtype=np.float32)
+        self.vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        self.texts = texts
+        self.metadatas = metadatas
+
+    @classmethod
+    def from_vectorstore(cls, vectordb):
+        data = vectordb.get(include=["embeddings", "documents", "metadatas"])
+        return cls(data["embeddings"], data["documents"], data["metadatas"])
+
+    def __len__(self):
+        return len(self.texts)
+
+    def rows_in_shards(self, shards, default_shard):
+        """Indices des chunks des collections ``shards`` (``default_shard`` pour les chunks sans ``shard``)"""
+        shards = set(shards)
+        return np.array([i for i, metadata in enumerate(self.metadatas)
+                         if (metadata or {}).get("shard", default_shard) in shards], dtype=np.int64)
+
+    def search(self, query_vectors, k, rows=None):
+        """Pour chaque question, les ``k`` meilleurs ``(indice, similarité)`` par ordre décroissant.
+
+        ``rows`` restreint la recherche à ces indices de chunks (collections routées).
+        """
+        queries = np.asarray(query_vectors, dtype=np.float32)
+        queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+        vectors = self.vectors if rows is None else self.vectors[rows]
+        k = min(k, len(vectors))
+        results = []
+        if k == 0:
+            return [[] for _ in range(len(queries))]
+        for start in range(0, len(queries), SEARCH_BLOCK_QUESTIONS):
+            scores = queries[start:start + SEARCH_BLOCK_QUESTIONS] @ vectors.T
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            for row, candidates in zip(scores, top):
+                order = candidates[np.argsort(-row[candidates])]
+                index = order if rows is None else rows[order]
+                results.append([(int(i), float(row[j])) for i, j in zip(index, order)])
+        return results
+
+    def documents(self, hits):
+        Document = _document_class()
+        return [Document(page_content=self.texts[i], metadata=dict(self.metadatas[i] or {})) for i, _ in hits]
@@ -0,0 +1,224 @@
+"""Cache persistant des embeddings.
+
+Les vecteurs sont stockés en float32 dans un fichier binaire en ajout seul
+(``vectors.f32``), lu par memory-map, avec un fichier d'index des clés
+(``keys.txt``, une clé hexadécimale par ligne). La clé d'un vecteur est le hash
+du nom du modèle, du type de texte (document ou requête) et du texte normalisé.
+Un LRU borné en mémoire évite les accès disque pour les textes fréquents.
+
+Le cache suppose un seul processus écrivain par répertoire.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_text(text):
+    """Normaliser un texte avant hachage (Unicode NFC, espaces compactés)"""
+    return _WHITESPACE_RE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+def embedding_key(model_name, kind, text):
+    """Clé de cache d'un texte déjà normalisé"""
+    return hashlib.sha256(f"{model_name}\0{kind}\0{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """Stockage disque des vecteurs float32, en ajout seul et lu par memory-map"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.vectors_path = os.path.join(directory, "vectors.f32")
+        self.keys_path = os.path.join(directory, "keys.txt")
+        self.meta_path = os.path.join(directory, "meta.json")
+        self.dim = None
+        self._rows = {}
+        self._n_vectors = 0  # lignes de vectors.f32 (numéros des prochains vecteurs)
+        self._mmap = None
+        self._mapped_rows = 0
+        self._lock = threading.Lock()
+        self._open()
+
+    def _open(self):
+        os.makedirs(self.directory, exist_ok=True)
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                self.dim = json.load(f)["dim"]
+        if self.dim is None:
+            return
+        # Une écriture interrompue peut laisser plus de clés que de vecteurs (ou l'inverse):
+        # les deux fichiers sont ramenés au nombre de lignes complètes communes
+        row_bytes = self.dim * 4
+        n_vectors = os.path.getsize(self.vectors_path) // row_bytes if os.path.exists(self.vectors_path) else 0
+        keys, keys_bytes = [], 0
+        with open(self.keys_path, "a+b") as f:
+            f.seek(0)
+            for line in f:
+                if len(keys) >= n_vectors or not line.endswith(b"\n"):
+                    break
+                keys.append(line.decode("ascii").strip())
+                keys_bytes += len(line)
+        self._n_vectors = len(keys)
+        for row, key in enumerate(keys):
+            self._rows[key] = row
+        vectors_bytes = os.path.getsize(self.vectors_path) if os.path.exists(self.vectors_path) else 0
+        if os.path.getsize(self.keys_path) != keys_bytes or vectors_bytes != self._n_vectors * row_bytes:
+            logger.warning(f"⚠️ Cache d'embeddings: écriture interrompue réparée ({self._n_vectors} vecteurs conservés)")
+            os.truncate(self.keys_path, keys_bytes)
+            if vectors_bytes:
+                os.truncate(self.vectors_path, self._n_vectors * row_bytes)
+        logger.info(f"💽 Cache d'embeddings: {len(self._rows)} vecteurs sur disque ({self.directory})")
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, key):
+        return key in self._rows
+
+    @property
+    def size_bytes(self):
+        return len(self._rows) * (self.dim or 0) * 4
+
+    def _remap(self):
+        n_rows = self._n_vectors
+        if n_rows and n_rows != self._mapped_rows:
+            self._mmap = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(n_rows, self.dim))
+            self._mapped_rows = n_rows
+
+    def get(self, key):
+        """Vecteur associé à ``key`` (copie float32) ou None"""
+        with self._lock:
+            row = self._rows.get(key)
+            if row is None:
+                return None
+            if row >= self._mapped_rows:
+                self._remap()
+            return np.array(self._mmap[row])
+
+    def put_many(self, keys, vectors):
+        """Ajouter des vecteurs (tableau 2D) pour les clés absentes du cache"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        with self._lock:
+            if self.dim is None:
+                self.dim = int(vectors.shape[1])
+                with open(self.meta_path, "w", encoding="utf-8") as f:
+                    json.dump({"dim": self.dim}, f)
+            fresh = [i for i, key in enumerate(keys) if key not in self._rows]
+            # Dédoublonner les clés répétées dans le même lot
+            unique, seen = [], set()
+            for i in fresh:
+                if keys[i] not in seen:
+                    seen.add(keys[i])
+                    unique.append(i)
+            if not unique:
+                return
+            # Vecteurs d'abord, clés ensuite: une clé n'est jamais visible sans son vecteur
+            with open(self.vectors_path, "ab") as f:
+                f.write(np.ascontiguousarray(vectors[unique]).tobytes())
+            with open(self.keys_path, "a", encoding="ascii") as f:
+                f.write("".join(f"{keys[i]}\n" for i in unique))
+            for row, i in enumerate(unique, start=self._n_vectors):
+                self._rows[keys[i]] = row
+            self._n_vectors += len(unique)
+
+
+class CachedEmbeddings:
+    """Enveloppe de cache autour d'un modèle d'embeddings LangChain.
+
+    Expose la même interface (``embed_documents`` / ``embed_query``) et ne
+    délègue au modèle que les textes absents du LRU et du stockage disque.
+    """
+
+    def __init__(self, embeddings, model_name, cache_dir, max_memory_items=20000):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.store = EmbeddingStore(os.path.join(cache_dir, hashlib.sha256(model_name.encode("utf-8")).hexdigest()[:16]))
+        self.max_memory_items = max_memory_items
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _lru_get(self, key):
+        with self._lock:
+            vector = self._lru.get(key)
+            if vector is not None:
+                self._lru.move_to_end(key)
+            return vector
+
+    def _lru_put(self, key, vector):
+        with self._lock:
+            self._lru[key] = vector
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.max_memory_items:
+                self._lru.popitem(last=False)
+
+    def _embed(self, texts, kind):
+        texts = [normalize_text(text) for text in texts]
+        keys = [embedding_key(self.model_name, kind, text) for text in texts]
+        results = [None] * len(texts)
+        missing = {}
+        for i, key in enumerate(keys):
+            vector = self._lru_get(key)
+            if vector is None:
+                vector = self.store.get(key)
+                if vector is not None:
+                    self._lru_put(key, vector)
+            if vector is None:
+                missing.setdefault(key, []).append(i)
+            else:
+                results[i] = vector
+
+        self.hits += len(texts) - sum(len(idx) for idx in missing.values())
+        self.misses += len(missing)
+        if missing:
+            missing_keys = list(missing)
+            missing_texts = [texts[missing[key][0]] for key in missing_keys]
+            if kind == "query" and len(missing_texts) == 1:
+                computed = [self.embeddings.embed_query(missing_texts[0])]
+            else:
+                computed = self.embeddings.embed_documents(missing_texts)
+            computed = np.asarray(computed, dtype=np.float32)
+            self.store.put_many(missing_keys, computed)
+            for key, vector in zip(missing_keys, computed):
+                self._lru_put(key, vector)
+                for i in missing[key]:
+                    results[i] = vector
+        return results
+
+    def embed_documents(self, texts):
+        return [vector.tolist() for vector in self._embed(texts, "document")]
+
+    def embed_query(self, text):
+        return self._embed([text], "query")[0].tolist()
+
+    def embed_queries(self, texts):
+        """Embeddings de plusieurs requêtes en un seul passage du modèle.
+
+        Les requêtes manquantes sont encodées par ``embed_documents``, ce qui
+        suppose un modèle symétrique (cas de all-MiniLM-L6-v2).
+        """
+        return [vector.tolist() for vector in self._embed(texts, "query")]
+
+    def stats(self):
+        """Occupation et taux de succès du cache"""
+        total = self.hits + self.misses
+        return {
+            "memory_items": len(self._lru),
+            "disk_items": len(self.store),
+            "disk_bytes": self.store.size_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,409 @@
+"""Indexation incrémentale de la base vectorielle.
+
+Un manifeste JSON stocké à côté de ``chroma.sqlite3`` mémorise, pour chaque
+fichier source, son empreinte SHA-256 et la liste des identifiants de chunks
+(eux-mêmes dérivés du hash de leur contenu). À chaque démarrage seuls les
+fichiers nouveaux, modifiés ou supprimés sont re-découpés, et seuls les
+chunks réellement nouveaux sont ré-embeddés.
+"""
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILENAME = "index_manifest.json"
+MANIFEST_VERSION = 1
+
+# Extensions indexées (chargeurs de ``rag_bot._load_file``)
+SUPPORTED_EXTENSIONS = (".pdf", ".json")
+
+
+def discover_sources(data_dir):
+    """Fichiers indexables de ``data_dir`` et de ses sous-répertoires, triés"""
+    sources = []
+    for root, dirs, files in os.walk(data_dir):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        for name in sorted(files):
+            # Fichiers cachés et fichiers temporaires de bureautique (~$...)
+            if name.startswith((".", "~$")) or not name.lower().endswith(SUPPORTED_EXTENSIONS):
+                continue
+            sources.append(os.path.join(root, name))
+    return sources
+
+
+def source_snapshot(sources):
+    """État peu coûteux (date de modification, taille) des fichiers, pour détecter un changement"""
+    snapshot = {}
+    for path in sources:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+    return snapshot
+
+
+def file_sha256(path, block_size=1 << 20):
+    """Calculer l'empreinte SHA-256 d'un fichier par blocs"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_id(source, text):
+    """Identifiant stable d'un chunk: hash de sa source et de son contenu"""
+    return hashlib.sha256(f"{source}\0{text}".encode("utf-8")).hexdigest()
+
+
+class IndexPlan:
+    """Différence entre les fichiers présents sur disque et le manifeste"""
+
+    def __init__(self):
+        self.added = []
+        self.changed = []
+        self.removed = []
+        self.unchanged = []
+        # Empreintes calculées pendant la planification (réutilisées à l'enregistrement)
+        self.fingerprints = {}
+
+    @property
+    def is_empty(self):
+        return not (self.added or self.changed or self.removed)
+
+    def __repr__(self):
+        return (f"IndexPlan(added={len(self.added)}, changed={len(self.changed)}, "
+                f"removed={len(self.removed)}, unchanged={len(self.unchanged)})")
+
+
+class IndexManifest:
+    """Manifeste des fichiers et chunks indexés dans la base vectorielle"""
+
+    def __init__(self, path, settings=None):
+        self.path = path
+        self.settings = settings or {}
+        self.files = {}
+        self.exists = False
+        self.previous_settings = None  # paramètres de l'index existant s'ils diffèrent de ``settings``
+
+    @classmethod
+    def load(cls, db_dir, settings=None):
+        """Charger le manifeste de ``db_dir`` (vide s'il n'existe pas)"""
+        manifest = cls(os.path.join(db_dir, MANIFEST_FILENAME), settings)
+        if os.path.exists(manifest.path):
+            try:
+                with open(manifest.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") == MANIFEST_VERSION:
+                    manifest.files = data.get("files", {})
+                    manifest.exists = True
+                    stored_settings = data.get("settings", {})
+                    if settings is not None and stored_settings != settings:
+                        logger.warning("⚠️ Paramètres d'indexation modifiés, reconstruction complète nécessaire")
+                        manifest.previous_settings = stored_settings
+                        manifest.files = {}
+                        manifest.exists = False
+                else:
+                    logger.warning(f"⚠️ Version de manifeste inconnue: {data.get('version')}")
+            except (OSError, ValueError) as e:
+                logger.warning(f"⚠️ Manifeste illisible, reconstruction complète: {e}")
+        return manifest
+
+    def save(self):
+        """Écrire le manifeste de façon atomique"""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "version": MANIFEST_VERSION,
+                "settings": self.settings,
+                "files": self.files,
+            }, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+        self.exists = True
+
+    def chunk_ids(self, source):
+        return list(self.files.get(source, {}).get("chunks", []))
+
+    def all_chunk_ids(self):
+        return [cid for entry in self.files.values() for cid in entry.get("chunks", [])]
+
+    def plan(self, sources):
+        """Comparer les fichiers ``sources`` au manifeste.
+
+        Un fichier dont la taille et la date de modification n'ont pas bougé
+        est considéré inchangé sans être relu; sinon son hash est recalculé.
+        """
+        plan = IndexPlan()
+        seen = set()
+        for source in sources:
+            seen.add(source)
+            stat = os.stat(source)
+            entry = self.files.get(source)
+            if entry and entry.get("size") == stat.st_size and entry.get("mtime") == stat.st_mtime:
+                plan.unchanged.append(source)
+                continue
+            sha = file_sha256(source)
+            plan.fingerprints[source] = {"sha256": sha, "size": stat.st_size, "mtime": stat.st_mtime}
+            if entry is None:
+                plan.added.append(source)
+            elif entry.get("sha256") == sha:
+                # Fichier simplement « touché »: on rafraîchit les métadonnées
+                plan.unchanged.append(source)
+                entry.update(size=stat.st_size, mtime=stat.st_mtime)
+            else:
+                plan.changed.append(source)
+        plan.removed = [source for source in self.files if source not in seen]
+        return plan
+
+    def record(self, source, fingerprint, chunk_ids):
+        entry = dict(fingerprint)
+        entry["chunks"] = list(chunk_ids)
+        self.files[source] = entry
+
+    def forget(self, source):
+        self.files.pop(source, None)
+
+
+def extract_pdf_pages(path, start, stop):
+    """Extraire le texte des pages ``[start, stop)`` d'un PDF (exécuté dans un processus du pool)"""
+    from pypdf import PdfReader
+    reader = PdfReader(path)
+    return [(reader.pages[i].extract_text() or "", {"source": path, "page": i})
+            for i in range(start, stop)]
+
+
+class _FileTasks:
+    """Tranches de pages d'un PDF: restant à soumettre au pool, puis en cours d'extraction"""
+
+    def __init__(self, source, ranges):
+        self.source = source
+        self.ranges = deque(ranges)
+        self.futures = deque()
+
+
+class PageExtractor:
+    """Extraction parallèle des pages PDF dans un pool de processus.
+
+    Les PDF sont découpés en tranches de ``pages_per_task`` pages, soumises
+    au pool dans l'ordre du fichier courant puis des ``prefetch_files``
+    fichiers suivants: les fichiers suivants sont extraits pendant que le
+    fichier courant est découpé et embeddé. Au plus ``max_in_flight``
+    tranches (par défaut ``2 * workers``) sont soumises et non encore lues,
+    si bien que les pages extraites ne s'accumulent pas en mémoire. Avec
+    ``workers <= 1`` (ou pour les fichiers non PDF), ``load_file`` est
+    appelé directement.
+    """
+
+    def __init__(self, load_file, workers=1, pages_per_task=8, prefetch_files=1, max_in_flight=None):
+        self.load_file = load_file
+        self.workers = workers or os.cpu_count() or 1
+        self.pages_per_task = pages_per_task
+        self.prefetch_files = prefetch_files
+        self.max_in_flight = max_in_flight or 2 * self.workers
+        self.pool = None
+        self._files = deque()  # fichier courant puis fichiers préchargés
+        self._in_flight = 0
+
+    def __enter__(self):
+        if self.workers > 1:
+            # "spawn": l'appelant a déjà des threads (watcher, serveur), qu'un fork copierait dans un état incohérent
+            self.pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self
+
+    def __exit__(self, *exc):
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
+        self._files.clear()
+        self._in_flight = 0
+
+    def _submit(self, source):
+        if self.pool is None or not source.lower().endswith(".pdf"):
+            return None
+        from pypdf import PdfReader
+        n_pages = len(PdfReader(source).pages)
+        tasks = _FileTasks(source, ((i, min(i + self.pages_per_task, n_pages))
+                                    for i in range(0, n_pages, self.pages_per_task)))
+        self._files.append(tasks)
+        self._fill()
+        return tasks
+
+    def _fill(self):
+        """Soumettre les tranches suivantes, fichier courant d'abord, dans la limite de ``max_in_flight``"""
+        for tasks in self._files:
+            while tasks.ranges and self._in_flight < self.max_in_flight:
+                first, last = tasks.ranges.popleft()
+                tasks.futures.append(self.pool.submit(extract_pdf_pages, tasks.source, first, last))
+                self._in_flight += 1
+
+    def _release(self, tasks):
+        """Oublier un fichier terminé (ou abandonné) et rendre ses places au pool"""
+        if tasks in self._files:
+            self._files.remove(tasks)
+        for future in tasks.futures:
+            future.cancel()
+        self._in_flight -= len(tasks.futures)
+        tasks.futures.clear()
+        tasks.ranges.clear()
+        self._fill()
+
+    def _iter_pages(self, tasks):
+        try:
+            from langchain.schema import Document
+        except ImportError:  # langchain >= 0.1
+            from langchain_core.documents import Document
+        try:
+            while tasks.futures or tasks.ranges:
+                if not tasks.futures:
+                    self._fill()
+                # Tranche retirée de la file dès sa lecture: ses pages ne restent pas référencées
+                pages = tasks.futures.popleft().result()
+                self._in_flight -= 1
+                self._fill()
+                for text, metadata in pages:
+                    yield Document(page_content=text, metadata=metadata)
+        finally:
+            self._release(tasks)
+
+    def iter_files(self, sources):
+        """Produire ``(source, itérateur de pages)`` dans l'ordre de ``sources``"""
+        sources = iter(sources)
+        pending = deque()
+
+        def prefetch(n_files):
+            while len(pending) < n_files:
+                source = next(sources, None)
+                if source is None:
+                    return
+                pending.append((source, self._submit(source)))
+
+        prefetch(1)
+        while pending:
+            source, tasks = pending.popleft()
+            prefetch(self.prefetch_files)
+            if tasks is None:
+                yield source, iter(self.load_file(source))
+            else:
+                yield source, self._iter_pages(tasks)
+                self._release(tasks)
+
+
+def _count_pages(pages, stats):
+    for page in pages:
+        stats["pages"] += 1
+        yield page
+
+
+def _split_pages(splitter, pages):
+    """Chunks d'un flux de pages: en une passe si le splitter le permet (``split_stream``), sinon page par page"""
+    if hasattr(splitter, "split_stream"):
+        return splitter.split_stream(pages)
+    return (doc for page in pages for doc in splitter.split_documents([page]))
+
+
+def sync_vectorstore(vectordb, manifest, sources, load_file, splitter,
+                     batch_size=64, workers=1, pages_per_task=8, lexical_index=None, assign_shard=None):
+    """Synchroniser ``vectordb`` avec les fichiers ``sources``.
+
+    ``load_file(path)`` renvoie les documents d'un fichier et ``splitter`` les
+    découpe en chunks. Seuls les chunks absents de la base sont ajoutés, par
+    lots de ``batch_size`` au fil de l'extraction des pages, et les chunks
+    disparus sont supprimés. ``lexical_index`` (optionnel, cf.
+    ``lexical_index.BM25Index``) reçoit les mêmes ajouts et suppressions.
+    ``assign_shard(metadata)`` (optionnel) désigne la collection de chaque
+    chunk, enregistrée dans ``metadata["shard"]`` (cf. ``shards``).
+    Renvoie un dictionnaire de statistiques.
+    """
+    start = time.perf_counter()
+    plan = manifest.plan(sources)
+    stats = {"added_files": len(plan.added), "changed_files": len(plan.changed),
+             "removed_files": len(plan.removed), "unchanged_files": len(plan.unchanged),
+             "pages": 0, "added_chunks": 0, "removed_chunks": 0, "kept_chunks": 0}
+
+    if plan.is_empty:
+        if plan.fingerprints or not manifest.exists:
+            manifest.save()
+        stats["seconds"] = time.perf_counter() - start
+        logger.info(f"✅ Index à jour ({len(plan.unchanged)} fichiers inchangés, {stats['seconds']:.3f}s)")
+        return stats
+
+    logger.info(f"🔄 Mise à jour incrémentale: {plan}")
+
+    def delete(ids):
+        if ids:
+            vectordb.delete(ids=ids)
+            if lexical_index is not None:
+                for cid in ids:
+                    lexical_index.remove(cid)
+
+    for source in plan.removed:
+        old_ids = manifest.chunk_ids(source)
+        delete(old_ids)
+        stats["removed_chunks"] += len(old_ids)
+        manifest.forget(source)
+        logger.info(f"🗑️ {source} retiré de l'index ({len(old_ids)} chunks)")
+
+    batch_ids, batch_docs = [], []
+
+    def flush():
+        if batch_docs:
+            # Chunks absents du manifeste: ils ont pu être écrits avant une interruption en cours de
+            # fichier (le manifeste n'est enregistré qu'en fin de fichier); les retirer évite les doublons
+            delete(list(batch_ids))
+            vectordb.add_documents(list(batch_docs), ids=list(batch_ids))
+            if lexical_index is not None:
+                for cid, doc in zip(batch_ids, batch_docs):
+                    lexical_index.add(cid, doc.page_content, doc.metadata)
+            batch_ids.clear()
+            batch_docs.clear()
+
+    with PageExtractor(load_file, workers, pages_per_task) as extractor:
+        for source, pages in extractor.iter_files(plan.added + plan.changed):
+            old_ids = set(manifest.chunk_ids(source))
+            new_ids, seen_ids = [], set()
+            added = 0
+            for doc in _split_pages(splitter, _count_pages(pages, stats)):
+                cid = chunk_id(source, doc.page_content)
+                if cid in seen_ids:
+                    continue  # chunk identique répété dans le même fichier
+                seen_ids.add(cid)
+                new_ids.append(cid)
+                if cid not in old_ids:
+                    if assign_shard is not None:
+                        doc.metadata["shard"] = assign_shard(doc.metadata)
+                    batch_ids.append(cid)
+                    batch_docs.append(doc)
+                    added += 1
+                    if len(batch_docs) >= batch_size:
+                        flush()
+            # Le fichier n'est enregistré dans le manifeste qu'une fois tous ses chunks écrits
+            flush()
+
+            stale_ids = [cid for cid in old_ids if cid not in seen_ids]
+            delete(stale_ids)
+
+            manifest.record(source, plan.fingerprints[source], new_ids)
+            # Sauvegarde après chaque fichier: une interruption ne perd que le fichier en cours
+            manifest.save()
+            stats["added_chunks"] += added
+            stats["removed_chunks"] += len(stale_ids)
+            stats["kept_chunks"] += len(new_ids) - added
+            logger.info(f"✅ {source}: +{added} / -{len(stale_ids)} chunks "
+                        f"({len(new_ids) - added} réutilisés)")
+
+    manifest.save()
+    stats["seconds"] = time.perf_counter() - start
+    stats["pages_per_s"] = stats["pages"] / stats["seconds"] if stats["seconds"] else 0.0
+    stats["chunks_per_s"] = stats["added_chunks"] / stats["seconds"] if stats["seconds"] else 0.0
+    logger.info(f"✅ Index synchronisé en {stats['seconds']:.2f}s: "
+                f"+{stats['added_chunks']} / -{stats['removed_chunks']} chunks "
+                f"({stats['pages_per_s']:.1f} pages/s, {stats['chunks_per_s']:.1f} chunks/s)")
+    return stats
@@ -0,0 +1,268 @@
+"""Journal des interactions: écriture non bloquante et lecture agrégée.
+
+``InteractionLog.log`` ne fait qu'ajouter l'interaction dans une file bornée;
+un thread d'arrière-plan la sérialise et l'écrit par lots dans un segment
+JSONL. Au-delà de ``segment_bytes``, le segment est compressé en
+``interactions-AAAAMMJJ-HHMMSS-N.jsonl.gz``. Quand la file est pleine
+(surcharge, disque lent), les interactions sont abandonnées et comptées
+plutôt que de ralentir les réponses.
+
+``read_interactions`` parcourt les segments (compressés ou non) d'une
+période, et ``aggregate`` en tire les questions les plus fréquentes et les
+candidates au préchargement du cache de réponses:
+
+    python interaction_log.py --since 2026-10-01 --top 20
+"""
+import argparse
+import atexit
+import glob
+import gzip
+import json
+import logging
+import os
+import queue
+import re
+import shutil
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+
+import numpy as np
+
+from lexical_index import strip_accents
+
+logger = logging.getLogger(__name__)
+
+CURRENT_SEGMENT = "current.jsonl"
+SEGMENT_GLOB = "interactions-*.jsonl.gz"
+_SEGMENT_RE = re.compile(r"interactions-(\d{8}-\d{6})-(\d+)\.jsonl\.gz$")
+_PUNCTUATION_RE = re.compile(r"[^\w\s]")
+
+_STOP = object()
+
+
+class InteractionLog:
+    """File bornée et thread d'écriture par lots vers des segments JSONL compressés"""
+
+    def __init__(self, directory="logs/interactions", max_queue=10000, batch_size=256,
+                 flush_interval=1.0, segment_bytes=8 * 1024 * 1024):
+        self.directory = directory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.segment_bytes = segment_bytes
+        self.counters = {"logged": 0, "written": 0, "dropped": 0, "batches": 0, "segments": 0, "write_errors": 0}
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._sequence = 0
+        os.makedirs(directory, exist_ok=True)
+        # Segment laissé par un arrêt précédent
+        if os.path.exists(self._current_path()):
+            self._rotate()
+        self._thread = threading.Thread(target=self._run, name="interaction-log", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _current_path(self):
+        return os.path.join(self.directory, CURRENT_SEGMENT)
+
+    def log(self, record):
+        """Ajouter une interaction sans attendre l'écriture; False si elle a été abandonnée"""
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.counters["dropped"] += 1
+            if self.counters["dropped"] % 1000 == 1:
+                logger.warning(f"⚠️ Journal des interactions saturé, {self.counters['dropped']} interactions abandonnées")
+            return False
+        self.counters["logged"] += 1
+        return True
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            records = [record for record in batch if record is not _STOP]
+            stopping = len(records) < len(batch)
+            if records:
+                self._write(records)
+            for _ in batch:
+                self._queue.task_done()
+
+    def _write(self, batch):
+        lines = []
+        for record in batch:
+            try:
+                lines.append(json.dumps(record, ensure_ascii=False, default=str))
+            except (TypeError, ValueError):
+                self.counters["write_errors"] += 1
+        try:
+            path = self._current_path()
+            with open(path, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+                size = f.tell()
+            self.counters["written"] += len(lines)
+            self.counters["batches"] += 1
+            if size >= self.segment_bytes:
+                self._rotate()
+        except OSError as e:
+            self.counters["write_errors"] += len(lines)
+            logger.error(f"❌ Écriture du journal des interactions impossible: {e}")
+
+    def _rotate(self):
+        """Compresser le segment courant en un segment horodaté"""
+        source = self._current_path()
+        started = datetime.fromtimestamp(os.stat(source).st_mtime)
+        with open(source, "rb") as f:
+            first = f.readline()
+        try:
+            started = datetime.fromisoformat(json.loads(first)["timestamp"])
+        except (ValueError, KeyError, TypeError):
+            pass
+        while True:
+            self._sequence += 1
+            target = os.path.join(self.directory,
+                                  f"interactions-{started:%Y%m%d-%H%M%S}-{self._sequence}.jsonl.gz")
+            if not os.path.exists(target):
+                break
+        tmp_path = target + ".tmp"
+        with open(source, "rb") as src, gzip.open(tmp_path, "wb", compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst)
+        os.replace(tmp_path, target)
+        os.remove(source)
+        self.counters["segments"] += 1
+
+    def flush(self, timeout=5.0):
+        """Attendre que les interactions en file soient écrites"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout=10)
+
+    def stats(self):
+        return dict(self.counters, queued=self._queue.qsize())
+
+
+def _segment_start(path):
+    match = _SEGMENT_RE.search(os.path.basename(path))
+    return datetime.strptime(match.group(1), "%Y%m%d-%H%M%S") if match else None
+
+
+def segments(directory, since=None, until=None):
+    """Fichiers du journal pouvant contenir des interactions entre ``since`` (inclus) et ``until`` (exclu)"""
+    paths = sorted(glob.glob(os.path.join(directory, SEGMENT_GLOB)),
+                   key=lambda p: (_segment_start(p) or datetime.min, int(_SEGMENT_RE.search(p).group(2))))
+    starts = [_segment_start(path) for path in paths]
+    selected = []
+    for i, (path, start) in enumerate(zip(paths, starts)):
+        # Un segment couvre de son début jusqu'au début du suivant
+        next_start = starts[i + 1] if i + 1 < len(starts) else None
+        if until is not None and start is not None and start >= until:
+            continue
+        if since is not None and next_start is not None and next_start <= since:
+            continue
+        selected.append(path)
+    current = os.path.join(directory, CURRENT_SEGMENT)
+    if os.path.exists(current):
+        selected.append(current)
+    return selected
+
+
+def read_interactions(directory, since=None, until=None):
+    """Interactions enregistrées entre ``since`` (inclus) et ``until`` (exclu), dans l'ordre d'écriture"""
+    since_text = since.isoformat() if since else None
+    until_text = until.isoformat() if until else None
+    for path in segments(directory, since, until):
+        opener = gzip.open if path.endswith(".gz") else open
+        try:
+            with opener(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # ligne en cours d'écriture
+                    timestamp = record.get("timestamp", "")
+                    if since_text and timestamp < since_text:
+                        continue
+                    if until_text and timestamp >= until_text:
+                        continue
+                    yield record
+        except (OSError, EOFError) as e:
+            logger.warning(f"⚠️ Segment illisible {path}: {e}")
+
+
+def normalize_question(question):
+    text = _PUNCTUATION_RE.sub(" ", strip_accents(question).lower())
+    return " ".join(text.split())
+
+
+def aggregate(records, top_n=20, min_cache_count=3):
+    """Statistiques d'usage: volume par jour, latences, questions fréquentes, candidates au cache"""
+    counts = Counter()
+    examples = {}
+    cache_hits = Counter()
+    per_day = Counter()
+    latencies = []
+    latency_by_question = defaultdict(list)
+    total = 0
+    for record in records:
+        total += 1
+        key = normalize_question(record.get("question", ""))
+        counts[key] += 1
+        examples.setdefault(key, record.get("question", ""))
+        per_day[record.get("timestamp", "")[:10]] += 1
+        if record.get("cached"):
+            cache_hits[key] += 1
+        latency = (record.get("timings") or {}).get("total_ms")
+        if latency is not None:
+            latencies.append(latency)
+            latency_by_question[key].append(latency)
+
+    def question_stats(key):
+        values = latency_by_question.get(key)
+        return {"question": examples[key], "count": counts[key], "cache_hits": cache_hits[key],
+                "mean_latency_ms": round(float(np.mean(values)), 1) if values else None}
+
+    summary = {
+        "interactions": total,
+        "distinct_questions": len(counts),
+        "per_day": dict(sorted(per_day.items())),
+        "cache_hit_rate": round(sum(cache_hits.values()) / total, 3) if total else 0.0,
+        "top_questions": [question_stats(key) for key, _ in counts.most_common(top_n)],
+    }
+    if latencies:
+        summary["latency_ms"] = {f"p{q}": round(float(np.percentile(latencies, q)), 1) for q in (50, 95, 99)}
+    # Questions fréquentes rarement servies par le cache: à précharger
+    candidates = [key for key, count in counts.most_common()
+                  if count >= min_cache_count and cache_hits[key] < count - 1]
+    summary["cache_candidates"] = [question_stats(key) for key in candidates[:top_n]]
+    return summary
+
+
+def main():
+    from config import Config
+    parser = argparse.ArgumentParser(description="Agrégation du journal des interactions")
+    parser.add_argument("--dir", default=Config.INTERACTION_LOG_DIR)
+    parser.add_argument("--since", type=datetime.fromisoformat, help="date de début (AAAA-MM-JJ)")
+    parser.add_argument("--until", type=datetime.fromisoformat, help="date de fin, exclue (AAAA-MM-JJ)")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--min-count", type=int, default=3, help="répétitions minimales d'une candidate au cache")
+    args = parser.parse_args()
+
+    summary = aggregate(read_interactions(args.dir, args.since, args.until), args.top, args.min_count)
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
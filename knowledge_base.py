@@ -0,0 +1,252 @@
+"""Base de connaissances structurée issue de ``mining_safety_database.json``.
+
+Le JSON est un dictionnaire de catégories (``incidents``, ``zones``,
+``consignes_generales``, ``reponses_incidents``, ``contacts_urgence``). Ce
+module le charge dans des tables typées avec un index par mot-clé et par
+préfixe, ce qui permet de répondre directement, sans LLM, aux questions de
+type « liste des zones » ou « quels incidents impliquent des explosifs ».
+Une question filtrée n'est servie que si ses mots-clés désignent des éléments
+par leur nom (incident, zone, rôle d'un contact); les autres relèvent du RAG.
+Chaque élément est aussi exposé comme un chunk indexable individuellement.
+"""
+import bisect
+import json
+import logging
+import re
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from lexical_index import strip_accents, tokenize
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Incident:
+    name: str
+    description: str = ""
+    signes_visibles: Tuple[str, ...] = ()
+    consignes: Tuple[str, ...] = ()
+
+    def to_text(self):
+        lines = [f"Incident: {self.name}"]
+        if self.description:
+            lines.append(f"Description: {self.description}")
+        if self.signes_visibles:
+            lines.append("Signes visibles: " + "; ".join(self.signes_visibles))
+        if self.consignes:
+            lines.append("Consignes en cas d'incident:")
+            lines.extend(f"- {consigne}" for consigne in self.consignes)
+        return "\n".join(lines)
+
+
+@dataclass(frozen=True)
+class Zone:
+    name: str
+
+    def to_text(self):
+        return f"Zone du site minier: {self.name}"
+
+
+@dataclass(frozen=True)
+class Consigne:
+    text: str
+
+    def to_text(self):
+        return f"Consigne générale de sécurité: {self.text}"
+
+
+@dataclass(frozen=True)
+class Contact:
+    role: str
+    number: str
+
+    def to_text(self):
+        return f"Contact d'urgence - {self.role}: {self.number}"
+
+
+# Catégories et mots qui les désignent dans une question
+CATEGORY_WORDS = {
+    "incidents": {"incident", "accident"},
+    "zones": {"zone", "secteur"},
+    "consignes": {"consigne", "regle", "interdiction"},
+    "contacts": {"contact", "numero", "telephone", "appeler", "joindre"},
+}
+# Demande de consignes: associée à une autre catégorie (« consignes pour l'incident X »),
+# la question relève du RAG, la liste des éléments n'y répondant pas
+INSTRUCTION_WORDS = {"consigne", "procedure", "mesure", "precaution", "instruction", "conduite", "regle"}
+CATEGORY_TITLES = {
+    "incidents": "Incidents répertoriés",
+    "zones": "Zones du site",
+    "consignes": "Consignes générales de sécurité",
+    "contacts": "Contacts d'urgence",
+}
+# Formulations d'une demande de liste (texte en minuscules, sans accents)
+LIST_RE = re.compile(r"\b(liste[rz]?|enumere[rz]?|quel(le)?s|tou(te)?s|combien|affiche[rz]?|donne[rz]?|montre[rz]?|cite[rz]?)\b")
+# Mots sans valeur de filtre dans une question de liste
+GENERIC_WORDS = {"liste", "lister", "enumere", "enumerer", "tou", "toute", "combien", "affiche", "donne",
+                 "montre", "cite", "existe", "existent", "exist", "securite", "site", "mine", "minier", "miniere",
+                 "hse", "ocp", "principal", "principale", "disponible", "implique", "impliquent",
+                 "impliquant", "concernant", "concerne", "urgence", "avec", "sans", "cas", "il", "ya",
+                 "ont", "peut", "peuvent", "moi", "lie", "liee", "relatif", "relative", "different",
+                 "differente", "type", "existant", "repertorie", "possible", "plu", "general",
+                 "generale"}
+# Synonymes métier pour élargir les filtres
+SYNONYMS = {
+    "explosif": ("explos", "dynamit", "tir"),
+    "dynamite": ("explos", "dynamit", "tir"),
+    "feu": ("incendi", "brulure", "combustion"),
+    "electrique": ("electr",),
+    "chimique": ("chimi",),
+    "vehicule": ("engin", "camion", "vehicule", "transport"),
+    "camion": ("engin", "camion", "vehicule", "transport"),
+}
+
+_NUMBER_RE = re.compile(r"\d")
+
+
+def _prefix(term):
+    """Préfixe de recherche d'un terme (racinisation grossière par troncature)"""
+    return term if len(term) <= 5 else term[:max(5, len(term) - 2)]
+
+
+class MiningSafetyKnowledge:
+    """Tables typées et index par mot-clé de la base de données sécurité"""
+
+    def __init__(self, source="data/mining_safety_database.json"):
+        self.source = source
+        self.tables = {"incidents": [], "zones": [], "consignes": [], "contacts": []}
+        self._postings = defaultdict(set)
+        self._vocabulary = []
+        self._name_postings = defaultdict(set)  # termes des noms seuls (incident, zone, rôle)
+        self._name_vocabulary = []
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        kb = cls.from_dict(data, source=path)
+        logger.info(f"🗂️ Base structurée chargée: " +
+                    ", ".join(f"{len(items)} {name}" for name, items in kb.tables.items()))
+        return kb
+
+    @classmethod
+    def from_dict(cls, data, source="data/mining_safety_database.json"):
+        kb = cls(source)
+        responses = data.get("reponses_incidents", {})
+        names = list(data.get("incidents", []))
+        names += [name for name in responses if name not in names]
+        for name in names:
+            details = responses.get(name, {})
+            kb.tables["incidents"].append(Incident(
+                name=name,
+                description=details.get("description", ""),
+                signes_visibles=tuple(details.get("signes_visibles", [])),
+                consignes=tuple(details.get("consignes", [])),
+            ))
+        kb.tables["zones"] = [Zone(name) for name in data.get("zones", [])]
+        kb.tables["consignes"] = [Consigne(text) for text in data.get("consignes_generales", [])]
+        kb.tables["contacts"] = [Contact(role, str(number)) for role, number in data.get("contacts_urgence", {}).items()]
+        kb._build_index()
+        return kb
+
+    def _build_index(self):
+        for category, items in self.tables.items():
+            for position, item in enumerate(items):
+                if isinstance(item, Incident):
+                    text = f"{item.name} {item.description}"
+                elif isinstance(item, Contact):
+                    text = item.role
+                else:
+                    text = item.to_text().split(":", 1)[1]
+                for term in tokenize(text):
+                    self._postings[term].add((category, position))
+                name = getattr(item, "name", None) or getattr(item, "role", None)
+                for term in tokenize(name or ""):
+                    self._name_postings[term].add((category, position))
+        self._vocabulary = sorted(self._postings)
+        self._name_vocabulary = sorted(self._name_postings)
+
+    def _prefix_lookup(self, prefix, names_only=False):
+        """Positions ``(catégorie, indice)`` des éléments contenant un terme commençant par ``prefix``"""
+        postings, vocabulary = ((self._name_postings, self._name_vocabulary) if names_only
+                                else (self._postings, self._vocabulary))
+        found = set()
+        i = bisect.bisect_left(vocabulary, prefix)
+        while i < len(vocabulary) and vocabulary[i].startswith(prefix):
+            found |= postings[vocabulary[i]]
+            i += 1
+        return found
+
+    def search(self, query, category=None, names_only=False):
+        """Éléments correspondant à tous les mots-clés de ``query`` (préfixes et synonymes).
+
+        Avec ``names_only``, seuls les noms sont consultés (incident, zone, rôle
+        d'un contact), pas les descriptions ni le texte des consignes.
+        """
+        matches = None
+        for term in tokenize(query):
+            positions = set()
+            for prefix in SYNONYMS.get(term, ()) + (_prefix(term),):
+                positions |= self._prefix_lookup(prefix, names_only)
+            matches = positions if matches is None else matches & positions
+        if not matches:
+            return []
+        return [self.tables[cat][pos] for cat, pos in sorted(matches)
+                if category is None or cat == category]
+
+    def _detect_category(self, terms):
+        for category in ("contacts", "incidents", "zones", "consignes"):
+            if terms & CATEGORY_WORDS[category]:
+                return category
+        return None
+
+    def answer(self, question) -> Optional[dict]:
+        """Réponse directe à une question de liste ou de contact, ou None si elle relève du RAG.
+
+        Sans mot-clé, la question doit demander la liste d'une catégorie
+        (« liste les zones »). Avec des mots-clés, ils doivent désigner des
+        éléments par leur nom (« numéro de l'infirmerie »): une question
+        thématique (« règles pour les explosifs ») part au RAG.
+        """
+        terms = tokenize(question)
+        category = self._detect_category(set(terms))
+        if category is None:
+            return None
+        ignored = GENERIC_WORDS.union(*CATEGORY_WORDS.values())
+        filters = [term for term in terms if term not in ignored and not _NUMBER_RE.match(term)]
+        if filters:
+            # Les consignes générales n'ont pas de nom: une consigne filtrée est une question thématique
+            if category == "consignes" or INSTRUCTION_WORDS & set(terms):
+                return None
+            items = self.search(" ".join(filters), category, names_only=True)
+            if not items:
+                return None
+        elif LIST_RE.search(strip_accents(question).lower()):
+            items = self.tables[category]
+        else:
+            return None
+
+        title = CATEGORY_TITLES[category]
+        if filters:
+            title += f" ({' '.join(filters)})"
+        lines = [f"**{title}** :", ""]
+        for item in items:
+            if isinstance(item, Contact):
+                lines.append(f"- 📞 {item.role} : **{item.number}**")
+            elif isinstance(item, Incident):
+                lines.append(f"- {item.name}" + (f" — {item.description}" if item.description else ""))
+            else:
+                lines.append(f"- {item.name if isinstance(item, Zone) else item.text}")
+        return {"answer": "\n".join(lines), "sources": [self.source], "structured": category}
+
+    def to_documents(self) -> List[Tuple[str, dict]]:
+        """Un chunk ``(texte, métadonnées)`` par élément de chaque catégorie"""
+        chunks = []
+        for category, items in self.tables.items():
+            for item in items:
+                name = getattr(item, "name", None) or getattr(item, "role", None) or item.text
+                chunks.append((item.to_text(), {"source": self.source, "type": "json",
+                                                "category": category, "item": name}))
+        return chunks
@@ -0,0 +1,153 @@
+"""Index lexical BM25 en mémoire et fusion par rang réciproque.
+
+Complète la recherche vectorielle pour les termes exacts (articles de
+réglementation, codes d'équipement, noms de zones) que les embeddings MiniLM
+capturent mal. L'index est construit pendant l'ingestion, avec les mêmes
+identifiants de chunks que Chroma, et persisté en JSON à côté de ``db/``.
+"""
+import json
+import logging
+import math
+import os
+import re
+import unicodedata
+from collections import Counter, defaultdict
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"\w+")
+
+FRENCH_STOPWORDS = frozenset("""
+a au aux avec ce ces cet cette dans de des du elle en et est etre il ils je la le les leur
+leurs lui ma mais me meme mes moi mon ne nos notre nous on ou par pas pour qu que qui sa se
+ses son sont sur ta te tes toi ton tu un une vos votre vous y d l j m n s t c
+quel quelle quels quelles comment quoi dont ou faut doit
+""".split())
+
+
+def strip_accents(text):
+    """Retirer les accents (décomposition Unicode NFKD)"""
+    return "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+
+
+def tokenize(text):
+    """Découper un texte français en termes normalisés (minuscules, sans accents ni mots vides)"""
+    tokens = []
+    for token in _TOKEN_RE.findall(strip_accents(text).lower()):
+        if token in FRENCH_STOPWORDS:
+            continue
+        # Racinisation minimale: pluriels réguliers
+        if len(token) > 3 and token[-1] in "sx" and not token.isdigit():
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+class BM25Index:
+    """Index inversé avec score BM25, mis à jour chunk par chunk"""
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.docs = {}
+        self.postings = defaultdict(dict)
+        self.total_length = 0
+
+    def __len__(self):
+        return len(self.docs)
+
+    def __contains__(self, doc_id):
+        return doc_id in self.docs
+
+    def add(self, doc_id, text, metadata=None):
+        if doc_id in self.docs:
+            self.remove(doc_id)
+        counts = Counter(tokenize(text))
+        length = sum(counts.values())
+        self.docs[doc_id] = {"text": text, "metadata": metadata or {}, "length": length}
+        self.total_length += length
+        for term, tf in counts.items():
+            self.postings[term][doc_id] = tf
+
+    def remove(self, doc_id):
+        doc = self.docs.pop(doc_id, None)
+        if doc is None:
+            return
+        self.total_length -= doc["length"]
+        for term in set(tokenize(doc["text"])):
+            postings = self.postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self.postings[term]
+
+    def clear(self):
+        self.docs.clear()
+        self.postings.clear()
+        self.total_length = 0
+
+    def get(self, doc_id):
+        """``(texte, métadonnées)`` d'un chunk indexé"""
+        doc = self.docs[doc_id]
+        return doc["text"], doc["metadata"]
+
+    def search(self, query, k=10, where=None):
+        """Les ``k`` meilleurs ``(doc_id, score)`` pour ``query`` (parmi les chunks dont les métadonnées vérifient ``where``)"""
+        n_docs = len(self.docs)
+        if not n_docs:
+            return []
+        avg_length = self.total_length / n_docs or 1.0
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, tf in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self.docs[doc_id]["length"] / avg_length)
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+        if where is not None:
+            scores = {doc_id: score for doc_id, score in scores.items() if where(self.docs[doc_id]["metadata"])}
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def save(self, path):
+        """Écrire l'index de façon atomique (seuls les documents sont stockés)"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"k1": self.k1, "b": self.b, "docs": {
+                doc_id: {"text": doc["text"], "metadata": doc["metadata"]}
+                for doc_id, doc in self.docs.items()
+            }}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Charger l'index de ``path`` (vide s'il n'existe pas ou est illisible)"""
+        if not os.path.exists(path):
+            return cls()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Index BM25 illisible, il sera reconstruit: {e}")
+            return cls()
+        index = cls(k1=data.get("k1", 1.5), b=data.get("b", 0.75))
+        for doc_id, doc in data.get("docs", {}).items():
+            index.add(doc_id, doc["text"], doc["metadata"])
+        logger.info(f"🔤 Index BM25 chargé: {len(index)} chunks, {len(index.postings)} termes")
+        return index
+
+
+def reciprocal_rank_fusion(rankings, weights=None, k=60):
+    """Fusionner des listes d'identifiants classés (RRF pondéré).
+
+    Chaque identifiant reçoit ``somme(poids / (k + rang))`` sur les listes où il
+    apparaît; renvoie les ``(identifiant, score)`` par score décroissant.
+    """
+    weights = weights or [1.0] * len(rankings)
+    scores = defaultdict(float)
+    for ranking, weight in zip(rankings, weights):
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] += weight / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
@@ -0,0 +1,305 @@
+"""Client LLM résilient pour l'API compatible OpenAI de Groq.
+
+- connexions HTTP persistantes mutualisées (``httpx.Client``);
+- nouvelle tentative avec attente exponentielle aléatoire (« full jitter ») sur
+  429, 5xx et erreurs réseau, en respectant ``Retry-After``;
+- requête dupliquée (« hedging ») si le premier token tarde au-delà du p95
+  observé: la première réponse qui arrive est gardée, l'autre abandonnée;
+- disjoncteur: après plusieurs échecs consécutifs, les appels échouent
+  immédiatement pendant ``reset_timeout`` secondes;
+- ``extractive_answer`` construit une réponse de repli à partir des passages
+  retrouvés quand le LLM est indisponible.
+
+Le serveur factice ``stub_llm.py`` permet de tester tous ces cas hors ligne.
+"""
+import json
+import logging
+import queue
+import random
+import threading
+import time
+from collections import deque
+
+import httpx
+
+from chunker import split_sentences
+from lexical_index import tokenize
+
+logger = logging.getLogger(__name__)
+
+
+class LLMError(Exception):
+    pass
+
+
+class LLMHTTPError(LLMError):
+    def __init__(self, status, retry_after=None, body=""):
+        super().__init__(f"HTTP {status}: {body[:200]}")
+        self.status = status
+        self.retry_after = retry_after
+
+
+class LLMUnavailableError(LLMError):
+    """Le LLM n'a pas répondu (tentatives épuisées, délai dépassé ou disjoncteur ouvert)"""
+
+
+class CircuitOpenError(LLMUnavailableError):
+    pass
+
+
+class LLMInterruptedError(LLMError):
+    """Le flux s'est interrompu après le premier token: la réponse déjà produite est incomplète"""
+
+
+def _retryable(error):
+    if isinstance(error, LLMHTTPError):
+        return error.status == 429 or error.status >= 500
+    return isinstance(error, (httpx.TransportError, ValueError))
+
+
+class CircuitBreaker:
+    """Disjoncteur à trois états: fermé, ouvert, semi-ouvert (un appel d'essai)"""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if self.clock() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial = False
+            if self.failures >= self.failure_threshold or self.opened_at is not None:
+                if self.opened_at is None:
+                    logger.warning(f"🔌 Disjoncteur LLM ouvert après {self.failures} échecs consécutifs")
+                self.opened_at = self.clock()
+
+
+class ResilientLLMClient:
+    """Génération en streaming avec tentatives, hedging et disjoncteur"""
+
+    def __init__(self, base_url, api_key, model, temperature=0.1, max_tokens=1000,
+                 connect_timeout=5.0, read_timeout=30.0, deadline=20.0, max_connections=10,
+                 max_retries=2, backoff_base=0.5, backoff_max=4.0,
+                 hedge=True, hedge_after_ms=2000.0, hedge_quantile=0.95, hedge_min_samples=20,
+                 breaker=None, transport=None):
+        self.url = base_url.rstrip("/") + "/chat/completions"
+        self.model = model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.deadline = deadline
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+        self.hedge_after_ms = hedge_after_ms
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self.breaker = breaker or CircuitBreaker()
+        self._client = httpx.Client(
+            headers={"Authorization": f"Bearer {api_key}"},
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            transport=transport,
+        )
+        self._ttft = deque(maxlen=500)
+        self.counters = {"requests": 0, "attempts": 0, "retries": 0, "hedges": 0, "hedge_wins": 0,
+                         "failures": 0, "rejected": 0}
+
+    def hedge_delay(self):
+        """Délai avant la requête dupliquée: p95 du temps au premier token (ou valeur initiale)"""
+        if len(self._ttft) < self.hedge_min_samples:
+            return self.hedge_after_ms / 1000
+        samples = sorted(self._ttft)
+        return samples[min(len(samples) - 1, int(self.hedge_quantile * len(samples)))]
+
+    def _backoff(self, retry, error):
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (retry - 1)))
+        if isinstance(error, LLMHTTPError) and error.retry_after is not None:
+            delay = max(delay, min(error.retry_after, self.backoff_max))
+        return delay
+
+    def _attempt(self, attempt_id, payload, events, cancel):
+        """Une requête en streaming; les événements sont publiés dans ``events``"""
+        try:
+            with self._client.stream("POST", self.url, json=payload) as response:
+                if response.status_code >= 400:
+                    body = response.read().decode("utf-8", "replace")
+                    retry_after = response.headers.get("Retry-After")
+                    events.put(("error", attempt_id, LLMHTTPError(
+                        response.status_code, float(retry_after) if retry_after else None, body)))
+                    return
+                for line in response.iter_lines():
+                    if cancel.is_set():
+                        return
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        break
+                    choices = json.loads(data).get("choices") or [{}]
+                    content = choices[0].get("delta", {}).get("content")
+                    if content:
+                        events.put(("token", attempt_id, content))
+            events.put(("done", attempt_id, None))
+        except Exception as e:
+            events.put(("error", attempt_id, e))
+
+    def stream(self, prompt):
+        """Produire le texte de la réponse au fil de l'eau.
+
+        Lève ``LLMUnavailableError`` si aucun token n'a pu être obtenu, et
+        ``LLMInterruptedError`` si le flux s'interrompt ensuite.
+        """
+        self.counters["requests"] += 1
+        if not self.breaker.allow():
+            self.counters["rejected"] += 1
+            raise CircuitOpenError("disjoncteur ouvert")
+
+        payload = {"model": self.model, "messages": [{"role": "user", "content": prompt}],
+                   "temperature": self.temperature, "max_tokens": self.max_tokens, "stream": True}
+        events = queue.Queue()
+        cancels, live, hedged = {}, set(), set()
+
+        def launch():
+            attempt_id = len(cancels)
+            cancels[attempt_id] = threading.Event()
+            live.add(attempt_id)
+            self.counters["attempts"] += 1
+            threading.Thread(target=self._attempt, args=(attempt_id, payload, events, cancels[attempt_id]),
+                             name=f"llm-attempt-{attempt_id}", daemon=True).start()
+
+        start = time.monotonic()
+        deadline = start + self.deadline
+        hedge_at = start + self.hedge_delay() if self.hedge else None
+        retry_at, retries, last_error, winner, first = None, 0, None, None, None
+        launch()
+        try:
+            # Attendre le premier token de l'une des requêtes en cours
+            while winner is None:
+                now = time.monotonic()
+                if now >= deadline:
+                    raise LLMUnavailableError(f"pas de réponse après {self.deadline:.0f}s ({last_error})")
+                wake = min(t for t in (deadline, hedge_at, retry_at) if t is not None)
+                try:
+                    kind, attempt_id, value = events.get(timeout=max(0.0, wake - now))
+                except queue.Empty:
+                    now = time.monotonic()
+                    if retry_at is not None and now >= retry_at:
+                        retry_at = None
+                        launch()
+                        hedge_at = now + self.hedge_delay() if self.hedge else None
+                    elif hedge_at is not None and now >= hedge_at and len(live) == 1:
+                        hedge_at = None
+                        self.counters["hedges"] += 1
+                        logger.info(f"🐢 Premier token en retard ({(now - start) * 1000:.0f} ms), requête dupliquée")
+                        hedged.add(len(cancels))
+                        launch()
+                    continue
+                if attempt_id not in live:
+                    continue
+                if kind in ("token", "done"):
+                    winner, first = attempt_id, value
+                    if attempt_id in hedged:
+                        self.counters["hedge_wins"] += 1
+                    break
+                live.discard(attempt_id)
+                last_error = value
+                logger.warning(f"⚠️ Échec de la requête LLM: {value}")
+                if not _retryable(value):
+                    raise LLMUnavailableError(str(value)) from value
+                if live or retry_at is not None:
+                    continue
+                if retries >= self.max_retries:
+                    raise LLMUnavailableError(f"{retries + 1} tentatives échouées ({value})") from value
+                retries += 1
+                self.counters["retries"] += 1
+                retry_at = time.monotonic() + self._backoff(retries, value)
+                hedge_at = None
+        except LLMUnavailableError:
+            self.counters["failures"] += 1
+            self.breaker.record_failure()
+            for cancel in cancels.values():
+                cancel.set()
+            raise
+
+        for attempt_id, cancel in cancels.items():
+            if attempt_id != winner:
+                cancel.set()
+        self._ttft.append(time.monotonic() - start)
+        self.breaker.record_success()
+        try:
+            if first is not None:
+                yield first
+            while kind != "done":
+                kind, attempt_id, value = events.get(timeout=self.read_timeout)
+                if attempt_id != winner:
+                    continue
+                if kind == "token":
+                    yield value
+                elif kind == "error":
+                    logger.warning(f"⚠️ Réponse LLM interrompue: {value}")
+                    self.breaker.record_failure()
+                    raise LLMInterruptedError(str(value)) from value
+        except queue.Empty:
+            self.breaker.record_failure()
+            raise LLMInterruptedError(f"aucune donnée reçue depuis {self.read_timeout:.0f}s") from None
+        finally:
+            cancels[winner].set()
+
+    def complete(self, prompt):
+        return "".join(self.stream(prompt))
+
+    def stats(self):
+        return dict(self.counters, breaker=self.breaker.state, hedge_delay_ms=round(self.hedge_delay() * 1000, 1))
+
+    def close(self):
+        self._client.close()
+
+
+def extractive_answer(question, passages, max_sentences=4):
+    """Réponse de repli sans LLM: phrases des passages qui partagent le plus de termes avec la question"""
+    terms = set(tokenize(question))
+    candidates = []
+    for rank, passage in enumerate(passages):
+        text = getattr(passage, "text", None) or getattr(passage, "page_content", "")
+        source = passage.metadata.get("source", "Inconnu")
+        for position, sentence in enumerate(split_sentences(" ".join(text.split()))):
+            overlap = len(terms & set(tokenize(sentence)))
+            candidates.append((overlap, -rank, -position, sentence, source))
+    if not candidates:
+        return "⚠️ Le service de génération est momentanément indisponible et aucun document pertinent n'a été trouvé."
+    best = sorted(candidates, reverse=True)[:max_sentences]
+    lines = ["⚠️ Le service de génération est momentanément indisponible. "
+             "Voici les extraits les plus pertinents des documents :", ""]
+    lines += [f"- {sentence} _(source : {source})_" for _, _, _, sentence, source in best]
+    return "\n".join(lines)
@@ -1,24 +1,189 @@
 import logging
+import logging.handlers
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
 from datetime import datetime
-import json
+
+from config import Config
+from interaction_log import InteractionLog
 
 class ChatbotMonitor:
-    def __init__(self, log_file="logs/chatbot.log"):
-        self.log_file = log_file
+    """Journal applicatif (fichier à rotation) et journal non bloquant des interactions"""
+
+    def __init__(self, log_file=None, interactions_dir=None):
+        self.log_file = log_file or Config.LOG_FILE
         self.setup_logging()
-    
+        self.interactions = InteractionLog(
+            interactions_dir or Config.INTERACTION_LOG_DIR,
+            max_queue=Config.INTERACTION_LOG_QUEUE,
+            batch_size=Config.INTERACTION_LOG_BATCH,
+            flush_interval=Config.INTERACTION_LOG_FLUSH_SECONDS,
+            segment_bytes=Config.INTERACTION_LOG_SEGMENT_BYTES
+        )
+
     def setup_logging(self):
-        logging.basicConfig(
-            filename=self.log_file,
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s'
+        os.makedirs(os.path.dirname(self.log_file) or ".", exist_ok=True)
+        root = logging.getLogger()
+        path = os.path.abspath(self.log_file)
+        if any(getattr(handler, "baseFilename", None) == path for handler in root.handlers):
+            return
+        handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=Config.LOG_MAX_BYTES, backupCount=Config.LOG_BACKUP_COUNT, encoding="utf-8"
         )
-    
-    def log_interaction(self, question: str, answer: str, sources: list):
+        handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+        handler.setLevel(logging.INFO)
+        root.addHandler(handler)
+        if root.level > logging.INFO or root.level == logging.NOTSET:
+            root.setLevel(logging.INFO)
+
+    def log_interaction(self, question: str, answer: str, sources: list, timings: dict = None, cached=None):
+        """Enregistrer une interaction sans bloquer la requête (False si le journal est saturé)"""
         interaction = {
             "timestamp": datetime.now().isoformat(),
             "question": question,
             "answer": answer,
             "sources": sources
         }
-        logging.info(f"Interaction: {json.dumps(interaction)}")
\ No newline at end of file
+        if timings:
+            interaction["timings"] = timings
+        if cached:
+            interaction["cached"] = cached
+        return self.interactions.log(interaction)
+
+    def stats(self):
+        return self.interactions.stats()
+
+    def close(self):
+        self.interactions.close()
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimation du nombre de tokens (≈ 4 caractères par token pour le français)"""
+    return max(1, len(text) // 4) if text else 0
+
+
+class Trace:
+    """Durées par étape (en ms) et compteurs d'une requête"""
+
+    def __init__(self):
+        self.spans = {}
+        self.counters = {}
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def span(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, (time.perf_counter() - start) * 1000)
+
+    def add(self, stage: str, duration_ms: float):
+        self.spans[stage] = self.spans.get(stage, 0.0) + duration_ms
+
+    def mark(self, stage: str):
+        """Enregistrer le temps écoulé depuis le début de la requête (ex: premier token)"""
+        self.spans[stage] = (time.perf_counter() - self._start) * 1000
+
+    def count(self, name: str, value: int):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def finish(self):
+        self.spans["total"] = (time.perf_counter() - self._start) * 1000
+        return self
+
+    def as_dict(self):
+        return {**{f"{stage}_ms": round(ms, 2) for stage, ms in self.spans.items()}, **self.counters}
+
+
+class LatencyTracker:
+    """Fenêtres glissantes des durées par étape, exportables au format Prometheus.
+
+    L'enregistrement se limite à un ajout dans une ``deque`` bornée; les
+    percentiles ne sont calculés qu'à la lecture.
+    """
+
+    QUANTILES = (0.5, 0.95, 0.99)
+
+    def __init__(self, window: int = 1000, export_path: str = None, export_interval: float = 15.0):
+        self.window = window
+        self.export_path = export_path
+        self.export_interval = export_interval
+        self._samples = defaultdict(lambda: deque(maxlen=self.window))
+        self._counts = defaultdict(int)
+        self._sums = defaultdict(float)
+        self._counters = defaultdict(int)
+        self._lock = threading.Lock()
+        self._last_export = 0.0
+
+    def record(self, stage: str, duration_ms: float):
+        with self._lock:
+            self._samples[stage].append(duration_ms)
+            self._counts[stage] += 1
+            self._sums[stage] += duration_ms
+
+    def record_trace(self, trace: Trace):
+        with self._lock:
+            for stage, duration_ms in trace.spans.items():
+                self._samples[stage].append(duration_ms)
+                self._counts[stage] += 1
+                self._sums[stage] += duration_ms
+            for name, value in trace.counters.items():
+                self._counters[name] += value
+        if self.export_path and time.monotonic() - self._last_export > self.export_interval:
+            self.export()
+
+    @staticmethod
+    def _percentile(sorted_values, q):
+        if not sorted_values:
+            return 0.0
+        index = min(len(sorted_values) - 1, max(0, int(round(q * (len(sorted_values) - 1)))))
+        return sorted_values[index]
+
+    def summary(self):
+        """Percentiles p50/p95/p99 (ms) par étape sur la fenêtre glissante"""
+        with self._lock:
+            samples = {stage: sorted(values) for stage, values in self._samples.items()}
+            counts = dict(self._counts)
+            counters = dict(self._counters)
+        stages = {
+            stage: {"count": counts[stage],
+                    **{f"p{int(q * 100)}": round(self._percentile(values, q), 2) for q in self.QUANTILES}}
+            for stage, values in samples.items()
+        }
+        return {"stages": stages, "counters": counters}
+
+    def render_prometheus(self):
+        """Métriques au format texte d'exposition Prometheus"""
+        with self._lock:
+            samples = {stage: sorted(values) for stage, values in self._samples.items()}
+            counts = dict(self._counts)
+            sums = dict(self._sums)
+            counters = dict(self._counters)
+        lines = [
+            "# HELP chatbot_stage_latency_ms Durée des étapes d'une requête RAG (fenêtre glissante)",
+            "# TYPE chatbot_stage_latency_ms summary",
+        ]
+        for stage in sorted(samples):
+            for q in self.QUANTILES:
+                lines.append(f'chatbot_stage_latency_ms{{stage="{stage}",quantile="{q}"}} '
+                             f"{self._percentile(samples[stage], q):.3f}")
+            lines.append(f'chatbot_stage_latency_ms_sum{{stage="{stage}"}} {sums[stage]:.3f}')
+            lines.append(f'chatbot_stage_latency_ms_count{{stage="{stage}"}} {counts[stage]}')
+        for name in sorted(counters):
+            lines.append(f"# TYPE chatbot_{name}_total counter")
+            lines.append(f"chatbot_{name}_total {counters[name]}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, path: str = None):
+        """Écrire les métriques dans un fichier (lu par le textfile collector de node_exporter)"""
+        path = path or self.export_path
+        self._last_export = time.monotonic()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, path)
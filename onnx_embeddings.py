@@ -0,0 +1,226 @@
+"""Embeddings par ONNX Runtime: le modèle exporté en ONNX et quantifié en int8, sans PyTorch.
+
+``OnnxEmbeddings`` remplace ``HuggingFaceEmbeddings`` quand
+``Config.EMBEDDING_BACKEND = "onnx"``: tokenisation par ``tokenizers``
+(Rust), passage du graphe ONNX (poids int8, quantification dynamique) sur un
+nombre de threads fixé, puis moyenne des tokens et normalisation, comme
+sentence-transformers. Seuls ``onnxruntime`` et ``tokenizers`` sont chargés
+pour les embeddings. Le cross-encoder de reclassement (``Config.RERANK_ENABLED``,
+activé par défaut) charge cependant sentence-transformers et torch à
+l'initialisation: le processus n'est sans torch, et sa mémoire résidente
+réduite d'autant, qu'avec ``RERANK_ENABLED = False``. ``check`` mesure les deux.
+
+L'export est fait une fois, sur un poste où torch et transformers sont
+installés; ``check`` vérifie ensuite que les classements de l'index
+existant (vecteurs calculés avec torch) sont conservés:
+
+    python onnx_embeddings.py export
+    python onnx_embeddings.py check
+"""
+import argparse
+import json
+import logging
+import os
+import time
+
+import numpy as np
+
+from document_matrix import DocumentMatrix
+
+logger = logging.getLogger(__name__)
+
+MODEL_FILE = "model.onnx"
+QUANTIZED_MODEL_FILE = "model_int8.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+INPUT_NAMES = ["input_ids", "attention_mask", "token_type_ids"]
+
+
+def backend_name(quantized=True):
+    """Nom du backend, enregistré dans les paramètres de l'index et les clés du cache d'embeddings"""
+    return "onnx-int8" if quantized else "onnx"
+
+
+def _normalize(vectors):
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+class OnnxEmbeddings:
+    """Embeddings de phrases (moyenne des tokens, normalisés) par un graphe ONNX"""
+
+    def __init__(self, model_dir, quantized=True, threads=None, max_length=256, batch_size=32,
+                 session=None, tokenizer=None):
+        self.model_dir = model_dir
+        self.model_path = os.path.join(model_dir, QUANTIZED_MODEL_FILE if quantized else MODEL_FILE)
+        self.batch_size = batch_size
+        self.session = session or self._create_session(threads)
+        self.tokenizer = tokenizer or self._load_tokenizer(max_length)
+        self.input_names = [i.name for i in self.session.get_inputs()]
+
+    def _create_session(self, threads):
+        import onnxruntime as ort
+        if not os.path.exists(self.model_path):
+            raise FileNotFoundError(f"Modèle ONNX introuvable: {self.model_path} (python onnx_embeddings.py export)")
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads or os.cpu_count() or 1
+        options.inter_op_num_threads = 1
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        logger.info(f"⚙️ Modèle ONNX: {self.model_path} ({options.intra_op_num_threads} threads)")
+        return ort.InferenceSession(self.model_path, options, providers=["CPUExecutionProvider"])
+
+    def _load_tokenizer(self, max_length):
+        from tokenizers import Tokenizer
+        tokenizer = Tokenizer.from_file(os.path.join(self.model_dir, TOKENIZER_FILE))
+        tokenizer.enable_truncation(max_length)
+        pad_id = tokenizer.token_to_id("[PAD]")
+        tokenizer.enable_padding(pad_id=pad_id if pad_id is not None else 0, pad_token="[PAD]")
+        return tokenizer
+
+    def _encode(self, texts):
+        encodings = self.tokenizer.encode_batch(list(texts))
+        inputs = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        hidden = self.session.run(None, {name: inputs[name] for name in self.input_names})[0]
+        mask = inputs["attention_mask"][:, :, None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        return _normalize(pooled.astype(np.float32))
+
+    def embed_documents(self, texts):
+        texts = list(texts)
+        if not texts:
+            return []
+        # Lots de longueurs voisines: moins de tokens de remplissage
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        vectors = [None] * len(texts)
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            for i, vector in zip(batch, self._encode([texts[i] for i in batch])):
+                vectors[i] = vector.tolist()
+        return vectors
+
+    def embed_query(self, text):
+        return self._encode([text])[0].tolist()
+
+
+def check_parity(embeddings, vectordb, sample=200, k=10, min_overlap=0.9, seed=0):
+    """Les vecteurs de ``embeddings`` conservent-ils les classements de l'index ``vectordb`` ?
+
+    Pour un échantillon de chunks, le texte est réencodé par ``embeddings`` et
+    recherché dans les vecteurs stockés; ses ``k`` premiers résultats sont
+    comparés à ceux du vecteur stocké du même chunk. Renvoie le recouvrement
+    moyen des top-k, la similarité cosinus avec les vecteurs stockés et
+    ``ok`` si le recouvrement atteint ``min_overlap``.
+    """
+    matrix = DocumentMatrix.from_vectorstore(vectordb)
+    if not len(matrix):
+        return {"chunks": 0, "sample": 0, "ok": True}
+    rows = np.random.default_rng(seed).choice(len(matrix), size=min(sample, len(matrix)), replace=False)
+    rows.sort()
+    candidate = _normalize(np.asarray(embeddings.embed_documents([matrix.texts[i] for i in rows]), dtype=np.float32))
+    reference = matrix.vectors[rows]
+
+    k = min(k, len(matrix))
+    reference_hits = matrix.search(reference, k)
+    candidate_hits = matrix.search(candidate, k)
+    overlaps = [len({i for i, _ in ref} & {i for i, _ in cand}) / k
+                for ref, cand in zip(reference_hits, candidate_hits)]
+    cosines = (reference * candidate).sum(axis=1)
+    report = {
+        "chunks": len(matrix),
+        "sample": len(rows),
+        "k": k,
+        "overlap_at_k": round(float(np.mean(overlaps)), 4),
+        "top1_agreement": round(float(np.mean([ref[0][0] == cand[0][0]
+                                               for ref, cand in zip(reference_hits, candidate_hits)])), 4),
+        "cosine_mean": round(float(cosines.mean()), 4),
+        "cosine_min": round(float(cosines.min()), 4),
+    }
+    report["ok"] = report["overlap_at_k"] >= min_overlap
+    return report
+
+
+def export_model(model_name, output_dir, quantize=True, opset=14):
+    """Exporter ``model_name`` (transformers) en ONNX, puis le quantifier en int8 (nécessite torch)"""
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    class Encoder(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            return self.model(input_ids=input_ids, attention_mask=attention_mask,
+                              token_type_ids=token_type_ids).last_hidden_state
+
+    os.makedirs(output_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    tokenizer.save_pretrained(output_dir)  # écrit tokenizer.json
+    model = AutoModel.from_pretrained(model_name).eval()
+    sample = tokenizer(["Port du casque obligatoire"], return_tensors="pt")
+    path = os.path.join(output_dir, MODEL_FILE)
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in INPUT_NAMES + ["last_hidden_state"]}
+    with torch.no_grad():
+        torch.onnx.export(Encoder(model), tuple(sample[name] for name in INPUT_NAMES), path,
+                          input_names=INPUT_NAMES, output_names=["last_hidden_state"],
+                          dynamic_axes=dynamic_axes, opset_version=opset)
+    logger.info(f"✅ Modèle exporté: {path} ({os.path.getsize(path) / 1e6:.1f} Mo)")
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantized_path = os.path.join(output_dir, QUANTIZED_MODEL_FILE)
+        quantize_dynamic(path, quantized_path, weight_type=QuantType.QInt8)
+        logger.info(f"✅ Modèle quantifié int8: {quantized_path} ({os.path.getsize(quantized_path) / 1e6:.1f} Mo)")
+    return path
+
+
+def main():
+    from config import Config
+    parser = argparse.ArgumentParser(description="Backend d'embeddings ONNX (export, parité, latence)")
+    parser.add_argument("command", choices=["export", "check"])
+    parser.add_argument("--model-dir", default=Config.ONNX_MODEL_DIR)
+    parser.add_argument("--no-quantize", action="store_true", help="graphe float32 (sans quantification int8)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.command == "export":
+        export_model(Config.EMBEDDING_MODEL, args.model_dir, quantize=not args.no_quantize)
+        return
+
+    from benchmark import peak_rss_mb
+    from rag_bot import _open_vectorstore
+    embeddings = OnnxEmbeddings(args.model_dir, quantized=not args.no_quantize,
+                                threads=Config.ONNX_THREADS, max_length=Config.ONNX_MAX_LENGTH)
+    questions = ["Quels sont les équipements de protection individuelle ?",
+                 "Procédure en cas d'incendie dans la galerie", "Stockage des explosifs"]
+    latencies = []
+    for _ in range(10):
+        for question in questions:
+            start = time.perf_counter()
+            embeddings.embed_query(question)
+            latencies.append((time.perf_counter() - start) * 1000)
+    vectordb = _open_vectorstore(embeddings)
+    report = {
+        "query_ms": {"p50": round(float(np.percentile(latencies, 50)), 2),
+                     "p95": round(float(np.percentile(latencies, 95)), 2)},
+        "parity": check_parity(embeddings, vectordb, Config.EMBEDDING_PARITY_SAMPLE,
+                               Config.EMBEDDING_PARITY_K, Config.EMBEDDING_PARITY_MIN_OVERLAP),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    if Config.RERANK_ENABLED:
+        # Mémoire du processus complet: le cross-encoder charge torch
+        from rag_bot import create_reranker
+        try:
+            candidates = vectordb.similarity_search_by_vector(embeddings.embed_query(questions[0]),
+                                                             k=Config.RERANK_CANDIDATES)
+            create_reranker().rerank(questions[0], candidates, Config.RETRIEVER_K)
+            report["peak_rss_with_rerank_mb"] = peak_rss_mb()
+        except Exception as e:
+            report["rerank_error"] = str(e)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
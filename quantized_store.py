@@ -0,0 +1,368 @@
+"""Base vectorielle compacte (int8, memory-map) pour les postes à faible mémoire.
+
+Alternative à Chroma derrière la même interface (``VectorStore`` de langchain,
+donc ``as_retriever``). Chaque vecteur normalisé est quantifié en int8 avec un
+facteur d'échelle float32 (384 + 4 octets au lieu de 1536). La recherche est
+un produit scalaire exhaustif vectorisé NumPy, par blocs pour borner la
+mémoire temporaire; les meilleurs candidats peuvent être réévalués avec les
+vecteurs float32, lus ligne à ligne depuis un fichier memory-map qui ne
+réside donc pas en mémoire.
+
+Organisation du répertoire: ``meta.json`` désigne la génération courante
+``gen-N/`` qui contient les fichiers en ajout seul (``ids.txt``,
+``vectors.i8``, ``scales.f32``, ``vectors.f32``, ``docs.jsonl``) et les
+lignes supprimées (``deleted.txt``). Le compactage écrit une nouvelle génération
+puis bascule ``meta.json`` de façon atomique.
+"""
+import json
+import logging
+import os
+import shutil
+import threading
+import uuid
+
+import numpy as np
+
+try:
+    from langchain.schema import Document
+    from langchain.vectorstores.base import VectorStore
+except ImportError:  # langchain >= 0.1
+    from langchain_core.documents import Document
+    from langchain_core.vectorstores import VectorStore
+
+logger = logging.getLogger(__name__)
+
+# Lignes traitées par bloc lors de la recherche (borne la conversion int8 -> float32)
+SEARCH_BLOCK_ROWS = 16384
+
+
+def quantize(vectors):
+    """Normaliser puis quantifier en int8 (échelle symétrique par vecteur)"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    scales = np.maximum(np.abs(vectors).max(axis=1), 1e-12) / 127.0
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32), vectors
+
+
+class Int8VectorIndex:
+    """Vecteurs int8 et documents associés, sur disque et lus par memory-map"""
+
+    def __init__(self, directory, keep_float=True):
+        self.directory = directory
+        self.keep_float = keep_float
+        self.dim = None
+        self.generation = 0
+        self.ids = []
+        self._rows = {}
+        self._offsets = []
+        self._deleted = set()
+        self._codes = self._scales = self._floats = None
+        self._mapped_rows = 0
+        self._lock = threading.RLock()
+        self._open()
+
+    # --- Fichiers -----------------------------------------------------------
+
+    @property
+    def _gen_dir(self):
+        return os.path.join(self.directory, f"gen-{self.generation}")
+
+    def _path(self, name, gen_dir=None):
+        return os.path.join(gen_dir or self._gen_dir, name)
+
+    def _open(self):
+        meta_path = os.path.join(self.directory, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            self.dim, self.generation = meta.get("dim"), meta.get("generation", 0)
+            self.keep_float = meta.get("keep_float", self.keep_float)
+        os.makedirs(self._gen_dir, exist_ok=True)
+        if self.dim is None or not os.path.exists(self._path("ids.txt")):
+            return
+
+        # Une écriture interrompue peut laisser des fichiers de longueurs différentes
+        n_rows = min(
+            os.path.getsize(self._path("vectors.i8")) // self.dim,
+            os.path.getsize(self._path("scales.f32")) // 4,
+            os.path.getsize(self._path("vectors.f32")) // (4 * self.dim) if self.keep_float else float("inf"),
+        )
+        offset = 0
+        with open(self._path("docs.jsonl"), "rb") as f:
+            for line in f:
+                self._offsets.append(offset)
+                offset += len(line)
+        with open(self._path("ids.txt"), "r", encoding="utf-8") as f:
+            all_ids = [line.rstrip("\n") for line in f]
+        self.ids = all_ids[:min(n_rows, len(self._offsets))]
+        self._truncate(len(all_ids), offset)
+        self._offsets = self._offsets[:len(self.ids)]
+        self._rows = {doc_id: row for row, doc_id in enumerate(self.ids)}
+        if os.path.exists(self._path("deleted.txt")):
+            with open(self._path("deleted.txt"), "r", encoding="ascii") as f:
+                self._deleted = {int(line) for line in f if line.strip() and int(line) < len(self.ids)}
+        logger.info(f"🗜️ Index int8: {len(self)} vecteurs ({self.directory})")
+
+    def _truncate(self, n_ids, docs_size):
+        """Ramener tous les fichiers à ``len(self.ids)`` lignes (après une écriture interrompue)"""
+        n_rows = len(self.ids)
+        sizes = {"vectors.i8": n_rows * self.dim, "scales.f32": n_rows * 4,
+                 "docs.jsonl": self._offsets[n_rows] if n_rows < len(self._offsets) else docs_size}
+        if self.keep_float:
+            sizes["vectors.f32"] = n_rows * self.dim * 4
+        for name, size in sizes.items():
+            if os.path.getsize(self._path(name)) > size:
+                logger.warning(f"⚠️ Index int8: {name} tronqué après une écriture interrompue")
+                with open(self._path(name), "r+b") as f:
+                    f.truncate(size)
+        if n_ids > n_rows:
+            with open(self._path("ids.txt"), "w", encoding="utf-8") as f:
+                f.write("".join(f"{doc_id}\n" for doc_id in self.ids))
+
+    def _write_meta(self):
+        tmp_path = os.path.join(self.directory, "meta.json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"dim": self.dim, "generation": self.generation, "keep_float": self.keep_float}, f)
+        os.replace(tmp_path, os.path.join(self.directory, "meta.json"))
+
+    def _remap(self):
+        n_rows = len(self.ids)
+        if n_rows == self._mapped_rows:
+            return
+        self._codes = np.memmap(self._path("vectors.i8"), dtype=np.int8, mode="r", shape=(n_rows, self.dim))
+        self._scales = np.memmap(self._path("scales.f32"), dtype=np.float32, mode="r", shape=(n_rows,))
+        if self.keep_float:
+            self._floats = np.memmap(self._path("vectors.f32"), dtype=np.float32, mode="r", shape=(n_rows, self.dim))
+        self._mapped_rows = n_rows
+
+    # --- Écriture -------------------------------------------------------------
+
+    def __len__(self):
+        return len(self.ids) - len(self._deleted)
+
+    def __contains__(self, doc_id):
+        row = self._rows.get(doc_id)
+        return row is not None and row not in self._deleted
+
+    def add(self, ids, vectors, texts, metadatas):
+        """Ajouter (ou remplacer) des documents et leurs vecteurs"""
+        codes, scales, normalized = quantize(vectors)
+        with self._lock:
+            if self.dim is None:
+                self.dim = int(codes.shape[1])
+                self._write_meta()
+            self.delete([doc_id for doc_id in ids if doc_id in self])
+            lines = [(json.dumps({"id": doc_id, "text": text, "metadata": metadata or {}}, ensure_ascii=False) + "\n")
+                     .encode("utf-8") for doc_id, text, metadata in zip(ids, texts, metadatas)]
+            # Données d'abord, identifiants ensuite: un identifiant n'est jamais visible sans ses données
+            with open(self._path("vectors.i8"), "ab") as f:
+                f.write(codes.tobytes())
+            with open(self._path("scales.f32"), "ab") as f:
+                f.write(scales.tobytes())
+            if self.keep_float:
+                with open(self._path("vectors.f32"), "ab") as f:
+                    f.write(normalized.tobytes())
+            offset = os.path.getsize(self._path("docs.jsonl")) if os.path.exists(self._path("docs.jsonl")) else 0
+            with open(self._path("docs.jsonl"), "ab") as f:
+                for line in lines:
+                    f.write(line)
+                    self._offsets.append(offset)
+                    offset += len(line)
+            with open(self._path("ids.txt"), "a", encoding="utf-8") as f:
+                f.write("".join(f"{doc_id}\n" for doc_id in ids))
+            for doc_id in ids:
+                self._rows[doc_id] = len(self.ids)
+                self.ids.append(doc_id)
+
+    def delete(self, ids):
+        with self._lock:
+            rows = [(doc_id, self._rows[doc_id]) for doc_id in ids
+                    if doc_id in self._rows and self._rows[doc_id] not in self._deleted]
+            if not rows:
+                return
+            # Suppressions enregistrées par numéro de ligne: un identifiant remplacé reste valide
+            with open(self._path("deleted.txt"), "a", encoding="ascii") as f:
+                f.write("".join(f"{row}\n" for _, row in rows))
+            self._deleted.update(row for _, row in rows)
+
+    def compact(self):
+        """Réécrire l'index sans les lignes supprimées, dans une nouvelle génération"""
+        with self._lock:
+            if not self._deleted:
+                return
+            self._remap()
+            keep = np.array([row for row in range(len(self.ids)) if row not in self._deleted], dtype=np.int64)
+            new_dir = os.path.join(self.directory, f"gen-{self.generation + 1}")
+            shutil.rmtree(new_dir, ignore_errors=True)
+            os.makedirs(new_dir)
+            with open(self._path("vectors.i8", new_dir), "wb") as f:
+                f.write(np.ascontiguousarray(self._codes[keep]).tobytes())
+            with open(self._path("scales.f32", new_dir), "wb") as f:
+                f.write(np.ascontiguousarray(self._scales[keep]).tobytes())
+            if self.keep_float:
+                with open(self._path("vectors.f32", new_dir), "wb") as f:
+                    f.write(np.ascontiguousarray(self._floats[keep]).tobytes())
+            offsets, offset = [], 0
+            with open(self._path("docs.jsonl"), "rb") as src, open(self._path("docs.jsonl", new_dir), "wb") as dst:
+                for row in keep:
+                    src.seek(self._offsets[row])
+                    line = src.readline()
+                    dst.write(line)
+                    offsets.append(offset)
+                    offset += len(line)
+            ids = [self.ids[row] for row in keep]
+            with open(self._path("ids.txt", new_dir), "w", encoding="utf-8") as f:
+                f.write("".join(f"{doc_id}\n" for doc_id in ids))
+
+            old_dir = self._gen_dir
+            self.generation += 1
+            self._write_meta()
+            self._codes = self._scales = self._floats = None
+            self._mapped_rows = 0
+            shutil.rmtree(old_dir, ignore_errors=True)
+            self.ids, self._offsets, self._deleted = ids, offsets, set()
+            self._rows = {doc_id: row for row, doc_id in enumerate(ids)}
+            logger.info(f"🗜️ Index int8 compacté: {len(ids)} vecteurs")
+
+    def clear(self):
+        with self._lock:
+            self._codes = self._scales = self._floats = None
+            self._mapped_rows = 0
+            shutil.rmtree(self.directory, ignore_errors=True)
+            self.dim, self.generation = None, 0
+            self.ids, self._rows, self._offsets, self._deleted = [], {}, [], set()
+            os.makedirs(self._gen_dir, exist_ok=True)
+
+    # --- Lecture --------------------------------------------------------------
+
+    def document(self, row):
+        """``(identifiant, texte, métadonnées)`` de la ligne ``row``"""
+        with open(self._path("docs.jsonl"), "rb") as f:
+            f.seek(self._offsets[row])
+            doc = json.loads(f.readline())
+        return doc["id"], doc["text"], doc["metadata"]
+
+    def rows(self):
+        return [row for row in range(len(self.ids)) if row not in self._deleted]
+
+    def vectors(self, rows):
+        """Vecteurs normalisés des lignes ``rows`` (float32, ou int8 déquantifiés)"""
+        with self._lock:
+            if not rows:
+                return np.zeros((0, self.dim or 0), dtype=np.float32)
+            self._remap()
+            if self.keep_float:
+                return np.asarray(self._floats[rows], dtype=np.float32)
+            return self._codes[rows].astype(np.float32) * self._scales[rows][:, None]
+
+    def search(self, vector, k=4, rescore_candidates=0):
+        """Les ``k`` meilleures lignes ``(ligne, similarité cosinus)`` pour ``vector``"""
+        with self._lock:
+            n_rows = len(self.ids)
+            if not n_rows or not len(self):
+                return []
+            self._remap()
+            query = np.asarray(vector, dtype=np.float32)
+            query = query / max(float(np.linalg.norm(query)), 1e-12)
+            scores = np.empty(n_rows, dtype=np.float32)
+            for start in range(0, n_rows, SEARCH_BLOCK_ROWS):
+                stop = min(start + SEARCH_BLOCK_ROWS, n_rows)
+                scores[start:stop] = (self._codes[start:stop].astype(np.float32) @ query) * self._scales[start:stop]
+            if self._deleted:
+                scores[list(self._deleted)] = -np.inf
+
+            n_candidates = min(len(self), max(k, rescore_candidates if self.keep_float else 0))
+            candidates = np.argpartition(-scores, n_candidates - 1)[:n_candidates]
+            if self.keep_float and rescore_candidates:
+                # Réévaluation exacte: seules les lignes candidates sont lues depuis le disque
+                ordered = np.sort(candidates)
+                scores_f32 = np.asarray(self._floats[ordered]) @ query
+                order = np.argsort(-scores_f32)[:k]
+                return [(int(ordered[i]), float(scores_f32[i])) for i in order]
+            order = candidates[np.argsort(-scores[candidates])][:k]
+            return [(int(row), float(scores[row])) for row in order]
+
+    def resident_bytes(self):
+        """Mémoire utile de l'index hors vecteurs float32 (int8, échelles, positions)"""
+        return len(self.ids) * ((self.dim or 0) + 4 + 8)
+
+
+class QuantizedVectorStore(VectorStore):
+    """Base vectorielle int8 compatible langchain (``as_retriever``, recherche par vecteur)"""
+
+    def __init__(self, persist_directory, embedding_function, rescore=True, rescore_candidates=50, keep_float=True):
+        self.persist_directory = persist_directory
+        self._embedding_function = embedding_function
+        self.rescore_candidates = rescore_candidates if rescore else 0
+        self.index = Int8VectorIndex(persist_directory, keep_float=keep_float)
+
+    @property
+    def embeddings(self):
+        return self._embedding_function
+
+    def __len__(self):
+        return len(self.index)
+
+    def count(self):
+        return len(self.index)
+
+    def add_texts(self, texts, metadatas=None, ids=None, **kwargs):
+        texts = list(texts)
+        if not texts:
+            return []
+        ids = list(ids) if ids is not None else [str(uuid.uuid4()) for _ in texts]
+        metadatas = list(metadatas) if metadatas is not None else [{} for _ in texts]
+        vectors = self._embedding_function.embed_documents(texts)
+        self.index.add(ids, vectors, texts, metadatas)
+        return ids
+
+    def delete(self, ids=None, **kwargs):
+        if ids:
+            self.index.delete(ids)
+        return True
+
+    def delete_collection(self):
+        self.index.clear()
+
+    def persist(self):
+        """Compacter les suppressions (les ajouts sont écrits immédiatement)"""
+        self.index.compact()
+
+    def get(self, include=None):
+        """Contenu de la base, au format de ``Chroma.get``"""
+        result = {"ids": [], "documents": [], "metadatas": []}
+        rows = self.index.rows()
+        for row in rows:
+            doc_id, text, metadata = self.index.document(row)
+            result["ids"].append(doc_id)
+            result["documents"].append(text)
+            result["metadatas"].append(metadata)
+        if include and "embeddings" in include:
+            result["embeddings"] = self.index.vectors(rows)
+        return result
+
+    def similarity_search_by_vector_with_score(self, embedding, k=4):
+        results = []
+        for row, score in self.index.search(embedding, k, self.rescore_candidates):
+            _, text, metadata = self.index.document(row)
+            results.append((Document(page_content=text, metadata=metadata), score))
+        return results
+
+    def similarity_search_by_vector(self, embedding, k=4, **kwargs):
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k)]
+
+    def similarity_search_with_score(self, query, k=4, **kwargs):
+        return self.similarity_search_by_vector_with_score(self._embedding_function.embed_query(query), k)
+
+    def similarity_search(self, query, k=4, **kwargs):
+        return self.similarity_search_by_vector(self._embedding_function.embed_query(query), k)
+
+    def _select_relevance_score_fn(self):
+        return lambda score: (score + 1.0) / 2.0
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, ids=None, persist_directory="db/quantized", **kwargs):
+        store = cls(persist_directory, embedding, **kwargs)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
@@ -0,0 +1,185 @@
+"""Moteur de requêtes asynchrone partagé entre utilisateurs.
+
+Les embeddings des questions arrivant en même temps sont regroupés
+(micro-batching) en un seul appel au modèle, puis la recherche et l'appel au
+LLM s'exécutent dans un pool de threads borné. Chaque requête a un délai
+maximal, et les requêtes au-delà de la file d'attente autorisée sont refusées
+immédiatement plutôt que d'allonger la latence de tous (backpressure).
+"""
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingBatcher:
+    """Regroupe les embeddings de requêtes concurrentes en un seul appel au modèle"""
+
+    def __init__(self, embeddings, executor, max_batch=32, window_ms=5):
+        self.embeddings = embeddings
+        self.executor = executor
+        self.max_batch = max_batch
+        self.window = window_ms / 1000
+        self._pending = []
+        self._timer = None
+        self.batches = 0
+        self.batched_queries = 0
+
+    async def embed(self, text):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            asyncio.ensure_future(self._run(batch))
+
+    async def _run(self, batch):
+        texts = [text for text, _ in batch]
+        embed_many = getattr(self.embeddings, "embed_queries", self.embeddings.embed_documents)
+        loop = asyncio.get_running_loop()
+        try:
+            vectors = await loop.run_in_executor(self.executor, embed_many, texts)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        self.batches += 1
+        self.batched_queries += len(batch)
+        for (_, future), vector in zip(batch, vectors):
+            if not future.done():
+                future.set_result(vector)
+
+
+class AsyncQueryEngine:
+    """Exécute les requêtes d'un RAGSystem initialisé avec concurrence bornée"""
+
+    def __init__(self, rag_system, max_workers=None, max_pending=None, timeout=None,
+                 batch_window_ms=None, max_batch=None):
+        self.rag_system = rag_system
+        self.max_pending = max_pending or Config.ENGINE_MAX_PENDING
+        self.timeout = timeout or Config.ENGINE_TIMEOUT
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers or Config.ENGINE_MAX_WORKERS,
+            thread_name_prefix="rag-worker"
+        )
+        self.batcher = EmbeddingBatcher(
+            rag_system.embeddings,
+            self.executor,
+            max_batch=max_batch or Config.ENGINE_MAX_BATCH,
+            window_ms=batch_window_ms if batch_window_ms is not None else Config.ENGINE_BATCH_WINDOW_MS
+        )
+        self.in_flight = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self._loop = None
+        self._thread = None
+
+    async def query(self, question, timeout=None):
+        """Répondre à ``question``; renvoie le même dictionnaire que ``RAGSystem.query``"""
+        if self.in_flight >= self.max_pending:
+            self.rejected += 1
+            logger.warning(f"⚠️ Moteur saturé ({self.in_flight} requêtes en cours), requête refusée")
+            return {"error": "Serveur saturé, veuillez réessayer dans un instant", "overloaded": True}
+
+        self.in_flight += 1
+        start = time.perf_counter()
+        timeout = timeout or self.timeout
+        try:
+            return await asyncio.wait_for(self._run(question), timeout)
+        except asyncio.TimeoutError:
+            # Le thread de travail termine en arrière-plan, sa réponse alimentera le cache
+            self.timeouts += 1
+            logger.warning(f"⏱️ Délai dépassé ({timeout}s) pour: {question[:80]}")
+            return {"error": f"Délai de réponse dépassé ({timeout}s)"}
+        finally:
+            self.in_flight -= 1
+            logger.debug(f"Requête traitée en {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    async def _run(self, question):
+        query_vector = await self.batcher.embed(question)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.rag_system.query, question, query_vector)
+
+    async def stream(self, question, timeout=None):
+        """Événements ``("token", texte)`` puis ``("done", résultat)`` de ``RAGSystem.stream_query``"""
+        if self.in_flight >= self.max_pending:
+            self.rejected += 1
+            logger.warning(f"⚠️ Moteur saturé ({self.in_flight} requêtes en cours), requête refusée")
+            yield ("done", {"error": "Serveur saturé, veuillez réessayer dans un instant", "overloaded": True})
+            return
+
+        self.in_flight += 1
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (timeout or self.timeout)
+        events = asyncio.Queue()
+        try:
+            query_vector = await self.batcher.embed(question)
+
+            def produce():
+                for event in self.rag_system.stream_query(question, query_vector=query_vector):
+                    loop.call_soon_threadsafe(events.put_nowait, event)
+
+            worker = loop.run_in_executor(self.executor, produce)
+            while True:
+                try:
+                    kind, payload = await asyncio.wait_for(events.get(), max(0.0, deadline - loop.time()))
+                except asyncio.TimeoutError:
+                    self.timeouts += 1
+                    logger.warning(f"⏱️ Délai dépassé ({timeout or self.timeout}s) pour: {question[:80]}")
+                    yield ("done", {"error": f"Délai de réponse dépassé ({timeout or self.timeout}s)"})
+                    return
+                yield (kind, payload)
+                if kind == "done":
+                    await worker
+                    return
+        finally:
+            self.in_flight -= 1
+
+    async def query_many(self, questions, timeout=None):
+        """Répondre à plusieurs questions en parallèle (embeddings regroupés)"""
+        return await asyncio.gather(*(self.query(question, timeout) for question in questions))
+
+    def start(self):
+        """Démarrer une boucle asyncio dédiée dans un thread, pour les appelants synchrones"""
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._loop.run_forever, name="rag-engine", daemon=True)
+            self._thread.start()
+        return self
+
+    def submit(self, question, timeout=None):
+        """Soumettre une question depuis du code synchrone; renvoie un ``concurrent.futures.Future``"""
+        self.start()
+        return asyncio.run_coroutine_threadsafe(self.query(question, timeout), self._loop)
+
+    def stats(self):
+        return {
+            "in_flight": self.in_flight,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "embedding_batches": self.batcher.batches,
+            "batched_queries": self.batcher.batched_queries,
+        }
+
+    def close(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+            self._loop = None
+        self.executor.shutdown(wait=False)
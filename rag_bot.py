@@ -1,13 +1,27 @@
-from langchain.vectorstores import Chroma
-from langchain.embeddings import HuggingFaceEmbeddings
-from langchain.text_splitter import CharacterTextSplitter
-from langchain.document_loaders import PyPDFLoader, JSONLoader
-from langchain.chains import RetrievalQA
-from langchain.chat_models import ChatOpenAI
-from langchain.prompts import PromptTemplate
+# Les modules LangChain sont importés dans les fonctions qui les utilisent:
+# importer rag_bot reste rapide et l'interface peut s'afficher avant leur chargement
 from dotenv import load_dotenv
+from config import ACTIVE_INDEX_FILE, Config
+from resources import registry
+from answer_cache import SemanticAnswerCache
+from embedding_cache import CachedEmbeddings
+from indexing import MANIFEST_FILENAME, IndexManifest, chunk_id, discover_sources, sync_vectorstore
+from onnx_embeddings import OnnxEmbeddings, backend_name, check_parity
+from knowledge_base import MiningSafetyKnowledge
+from lexical_index import BM25Index, reciprocal_rank_fusion
+from monitoring import LatencyTracker, Trace, estimate_tokens
+from reranker import CrossEncoderReranker
+from context_packer import pack_context
+from chunker import StructuredSplitter
+from diagnostics import SamplingProfiler, health_report, index_report
+from llm_client import (CircuitBreaker, LLMInterruptedError, LLMUnavailableError, ResilientLLMClient,
+                        extractive_answer)
+from shards import DEFAULT_SHARD, QueryRouter, assign_shard
 import os
 import logging
+import shutil
+import threading
+import time
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO)
@@ -16,88 +30,400 @@ logger = logging.getLogger(__name__)
 # Charger les variables d'environnement
 load_dotenv()
 
-def load_vectorstore():
-    """Charger et indexer les documents"""
+# Durées par étape des requêtes (percentiles glissants, export Prometheus)
+metrics = LatencyTracker(window=Config.METRICS_WINDOW, export_path=Config.METRICS_FILE)
+
+def _load_pdf(pdf_file):
+    """Charger les pages d'un PDF"""
+    from langchain.document_loaders import PyPDFLoader
+    logger.info(f"📄 Chargement de {pdf_file}...")
+    docs = PyPDFLoader(pdf_file).load()
+    logger.info(f"✅ PDF chargé: {pdf_file} ({len(docs)} pages)")
+    return docs
+
+def _load_json(json_file):
+    """Charger la base JSON: un document par élément de chaque catégorie"""
+    documents = []
     try:
-        logger.info("📂 Chargement des documents...")
-        documents = []
-        
-        # Charger les PDF
-        pdf_files = ["data/HSE_AAOURIDA.pdf", "data/STEULER-HSE-Management.pdf"]
-        for pdf_file in pdf_files:
-            if os.path.exists(pdf_file):
-                logger.info(f"📄 Chargement de {pdf_file}...")
-                loader = PyPDFLoader(pdf_file)
-                docs = loader.load()
-                documents.extend(docs)
-                logger.info(f"✅ PDF chargé: {pdf_file} ({len(docs)} pages)")
-            else:
-                logger.warning(f"⚠️ Fichier non trouvé: {pdf_file}")
+        from langchain.schema import Document
+        knowledge = MiningSafetyKnowledge.load(json_file)
+        for content, metadata in knowledge.to_documents():
+            documents.append(Document(page_content=content, metadata=metadata))
         
-        # Charger le JSON avec une approche plus simple
-        json_file = "data/mining_safety_database.json"
-        if os.path.exists(json_file):
-            try:
-                import json
-                with open(json_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                
-                # Convertir chaque élément JSON en document
-                from langchain.schema import Document
-                for item in data:
-                    if isinstance(item, dict):
-                        content = json.dumps(item, ensure_ascii=False)
-                        doc = Document(
-                            page_content=content,
-                            metadata={"source": json_file, "type": "json"}
-                        )
-                        documents.append(doc)
-                
-                logger.info(f"✅ JSON chargé: {json_file} ({len(data)} éléments)")
-            except Exception as e:
-                logger.warning(f"⚠️ Erreur chargement JSON: {e}")
-        else:
-            logger.warning(f"⚠️ Fichier JSON non trouvé: {json_file}")
-
-        if not documents:
-            raise Exception("Aucun document trouvé à indexer")
+        logger.info(f"✅ JSON chargé: {json_file} ({len(documents)} éléments)")
+    except Exception as e:
+        logger.warning(f"⚠️ Erreur chargement JSON: {e}")
+    return documents
 
-        logger.info(f"📊 {len(documents)} documents chargés")
+def _load_file(path):
+    """Charger un fichier source selon son extension"""
+    if path.lower().endswith(".json"):
+        return _load_json(path)
+    return _load_pdf(path)
 
-        # Diviser les documents
-        logger.info("✂️ Division des documents en chunks...")
-        splitter = CharacterTextSplitter(
-            chunk_size=1000, 
-            chunk_overlap=200,
-            separator="\n"
-        )
-        docs = splitter.split_documents(documents)
-        logger.info(f"✅ {len(docs)} chunks créés")
+def _embedding_backend():
+    """Backend d'embeddings, tel qu'enregistré dans les paramètres de l'index"""
+    if Config.EMBEDDING_BACKEND == "onnx":
+        return backend_name(Config.ONNX_QUANTIZED)
+    return "torch"
 
-        # Créer la base vectorielle
-        logger.info("🔢 Création des embeddings...")
+def create_embeddings():
+    """Créer le modèle d'embeddings (``Config.EMBEDDING_BACKEND``), enveloppé par le cache persistant"""
+    embeddings = None
+    if Config.EMBEDDING_BACKEND == "onnx":
+        try:
+            embeddings = OnnxEmbeddings(
+                Config.ONNX_MODEL_DIR,
+                quantized=Config.ONNX_QUANTIZED,
+                threads=Config.ONNX_THREADS,
+                max_length=Config.ONNX_MAX_LENGTH
+            )
+        except (ImportError, OSError) as e:
+            logger.warning(f"⚠️ Backend ONNX indisponible, retour à torch: {e}")
+            Config.EMBEDDING_BACKEND = "torch"
+    if embeddings is None:
+        from langchain.embeddings import HuggingFaceEmbeddings
         embeddings = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-MiniLM-L6-v2",
+            model_name=Config.EMBEDDING_MODEL,
             model_kwargs={'device': 'cpu'},
             encode_kwargs={'normalize_embeddings': True}
         )
-        
-        logger.info("💾 Création de la base vectorielle...")
-        vectordb = Chroma.from_documents(
-            documents=docs, 
-            embedding=embeddings, 
-            persist_directory="db"
+    # Vecteurs en cache propres à chaque backend (le modèle torch garde ses clés d'origine)
+    backend = _embedding_backend()
+    return CachedEmbeddings(
+        embeddings,
+        model_name=Config.EMBEDDING_MODEL if backend == "torch" else f"{Config.EMBEDDING_MODEL}#{backend}",
+        cache_dir=Config.EMBEDDING_CACHE_DIR,
+        max_memory_items=Config.EMBEDDING_CACHE_MEMORY_ITEMS
+    )
+
+def get_embeddings():
+    """Modèle d'embeddings partagé par le processus"""
+    return registry.get("embeddings")
+
+def _index_settings():
+    """Paramètres qui, s'ils changent, imposent une reconstruction complète"""
+    return {
+        "embedding_model": Config.EMBEDDING_MODEL,
+        "embedding_backend": _embedding_backend(),
+        "chunk_size": Config.CHUNK_SIZE,
+        "chunk_overlap": Config.CHUNK_OVERLAP,
+        "chunker": Config.CHUNKER,
+        "vector_store": Config.VECTOR_STORE,
+        "sharding": Config.SHARD_KEYWORDS if Config.SHARDING_ENABLED else False,
+        "json_format": "items",
+    }
+
+def create_splitter():
+    """Découpage des documents selon ``Config.CHUNKER``"""
+    if Config.CHUNKER == "structured":
+        return StructuredSplitter(
+            chunk_size=Config.CHUNK_SIZE,
+            chunk_overlap=Config.CHUNK_OVERLAP,
+            min_chunk_size=Config.MIN_CHUNK_SIZE
+        )
+    from langchain.text_splitter import CharacterTextSplitter
+    return CharacterTextSplitter(
+        chunk_size=Config.CHUNK_SIZE, 
+        chunk_overlap=Config.CHUNK_OVERLAP,
+        separator="\n"
+    )
+
+def _rebuild_lexical_index(vectordb, lexical_index):
+    """Reconstruire l'index BM25 à partir des chunks déjà stockés dans Chroma (sans ré-embedding)"""
+    logger.info("🔤 Reconstruction de l'index BM25 depuis la base vectorielle...")
+    data = vectordb.get(include=["documents", "metadatas"])
+    lexical_index.clear()
+    for cid, text, metadata in zip(data["ids"], data["documents"], data["metadatas"]):
+        lexical_index.add(cid, text, metadata or {})
+
+def _bm25_path(db_dir):
+    return os.path.join(db_dir, os.path.basename(Config.BM25_INDEX_PATH)) if db_dir else Config.BM25_INDEX_PATH
+
+def _shard_of(metadata):
+    return assign_shard(metadata, Config.SHARD_KEYWORDS, Config.DATA_DIR)
+
+def _open_vectorstore(embeddings, db_dir=None):
+    """Ouvrir la base vectorielle choisie par ``Config.VECTOR_STORE`` (dans ``db_dir``, l'index actif par défaut).
+
+    Avec ``Config.SHARDING_ENABLED``, une collection par domaine (cf. ``shards``).
+    """
+    db_dir = db_dir or Config.DB_DIR
+    if Config.SHARDING_ENABLED:
+        from shards import ShardedVectorStore
+        return ShardedVectorStore(
+            db_dir,
+            embeddings,
+            lambda name: _open_shard(embeddings, db_dir, name),
+            assign=_shard_of,
+            workers=Config.SHARD_SEARCH_WORKERS
         )
+    return _open_shard(embeddings, db_dir)
+
+def _open_shard(embeddings, db_dir, name=None):
+    """Base vectorielle d'une collection (``name``), ou la base unique si ``name`` est None"""
+    if Config.VECTOR_STORE == "quantized":
+        from quantized_store import QuantizedVectorStore
+        return QuantizedVectorStore(
+            os.path.join(db_dir, "quantized", name) if name else os.path.join(db_dir, "quantized"),
+            embeddings,
+            rescore=Config.QUANTIZED_RESCORE,
+            rescore_candidates=Config.QUANTIZED_RESCORE_CANDIDATES,
+            keep_float=Config.QUANTIZED_KEEP_FLOAT
+        )
+    from langchain.vectorstores import Chroma
+    if name:
+        return Chroma(collection_name=f"hse-{name}", persist_directory=db_dir, embedding_function=embeddings)
+    return Chroma(persist_directory=db_dir, embedding_function=embeddings)
+
+def _drop_unsharded_store(embeddings, db_dir):
+    """Supprimer la base unique laissée par un index construit sans partitionnement"""
+    if Config.VECTOR_STORE == "quantized":
+        # Les collections sont des sous-répertoires de quantized/: seuls les fichiers de la base unique partent
+        directory = os.path.join(db_dir, "quantized")
+        meta_path = os.path.join(directory, "meta.json")
+        if not os.path.exists(meta_path):
+            return
+        for name in os.listdir(directory):
+            if name.startswith("gen-"):
+                shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+        os.remove(meta_path)
+    else:
+        # Chroma: collection par défaut du répertoire (les collections partitionnées sont « hse-<nom> »)
+        vectordb = _open_shard(embeddings, db_dir)
+        count = _document_count(vectordb)
+        vectordb.delete_collection()
+        if not count:
+            return
+    logger.info("🧹 Ancienne base non partitionnée supprimée")
+
+def _document_count(vectordb):
+    if hasattr(vectordb, "_collection"):
+        return vectordb._collection.count()
+    return vectordb.count()
+
+def _reuse_after_backend_change(manifest, vectordb, embeddings, db_dir):
+    """Conserver l'index existant si seul le backend d'embeddings a changé et que les classements sont préservés.
+
+    Un index sans backend enregistré a été construit avec torch. Renvoie le
+    manifeste à utiliser: celui de l'index existant (avec les nouveaux
+    paramètres), ou ``manifest`` inchangé pour une réindexation complète.
+    """
+    previous = dict(manifest.previous_settings)
+    previous.setdefault("embedding_backend", "torch")
+    current = manifest.settings
+    if {k: v for k, v in previous.items() if k != "embedding_backend"} != \
+            {k: v for k, v in current.items() if k != "embedding_backend"}:
+        return manifest
+    if previous["embedding_backend"] != current["embedding_backend"] and _document_count(vectordb) > 0:
+        report = check_parity(
+            embeddings, vectordb,
+            sample=Config.EMBEDDING_PARITY_SAMPLE,
+            k=Config.EMBEDDING_PARITY_K,
+            min_overlap=Config.EMBEDDING_PARITY_MIN_OVERLAP
+        )
+        logger.info(
+            f"🔬 Parité {previous['embedding_backend']} → {current['embedding_backend']}: "
+            f"top-{report['k']} {report['overlap_at_k']:.0%}, cosinus moyen {report['cosine_mean']:.3f}"
+        )
+        if not report["ok"]:
+            logger.warning("⚠️ Classements modifiés par le nouveau backend, réindexation complète")
+            return manifest
+    reused = IndexManifest.load(db_dir, manifest.previous_settings)
+    reused.settings = current
+    reused.save()
+    logger.info(f"✅ Index existant conservé (backend {current['embedding_backend']})")
+    return reused
+
+def index_sources():
+    """Fichiers à indexer: tout ``Config.DATA_DIR``, plus la base JSON si elle est ailleurs"""
+    sources = discover_sources(Config.DATA_DIR)
+    if os.path.exists(Config.KNOWLEDGE_BASE_FILE) and os.path.normpath(Config.KNOWLEDGE_BASE_FILE) not in map(os.path.normpath, sources):
+        sources.append(Config.KNOWLEDGE_BASE_FILE)
+    return sources
+
+def load_vectorstore(embeddings=None, incremental=True, lexical_index=None, stats=None, db_dir=None):
+    """Charger et indexer les documents.
+
+    En mode incrémental, seuls les fichiers nouveaux, modifiés ou supprimés
+    depuis la dernière indexation (cf. ``indexing.IndexManifest``) sont traités.
+    L'index BM25 (``lexical_index``, partagé par défaut) est tenu à jour en même temps.
+    Si ``stats`` est fourni, il reçoit les statistiques de synchronisation.
+    ``db_dir`` désigne l'index à mettre à jour (l'index actif par défaut).
+    """
+    try:
+        logger.info("📂 Chargement des documents...")
+        bm25_path = _bm25_path(db_dir)
+        db_dir = db_dir or Config.DB_DIR
+        sources = index_sources()
+        logger.info(f"📚 {len(sources)} fichiers trouvés dans {Config.DATA_DIR}")
+
+        if not sources:
+            raise Exception("Aucun document trouvé à indexer")
+
+        if embeddings is None:
+            embeddings = get_embeddings()
+        if lexical_index is None:
+            lexical_index = registry.get("lexical_index")
+
+        manifest = IndexManifest.load(db_dir, _index_settings())
+        vectordb = _open_vectorstore(embeddings, db_dir)
+        if incremental and manifest.previous_settings is not None:
+            manifest = _reuse_after_backend_change(manifest, vectordb, embeddings, db_dir)
+
+        if not incremental or not manifest.exists:
+            # Base construite sans manifeste (ou reconstruction forcée): on repart de zéro
+            if _document_count(vectordb) > 0:
+                logger.info("♻️ Réinitialisation de la base vectorielle...")
+                vectordb.delete_collection()
+                vectordb = _open_vectorstore(embeddings, db_dir)
+            if Config.SHARDING_ENABLED:
+                _drop_unsharded_store(embeddings, db_dir)
+            manifest.files = {}
+            lexical_index.clear()
+        elif len(lexical_index) != len(manifest.all_chunk_ids()):
+            # Index BM25 absent ou désynchronisé (mise à jour interrompue)
+            _rebuild_lexical_index(vectordb, lexical_index)
+            lexical_index.save(bm25_path)
+
+        splitter = create_splitter()
+
+        logger.info("💾 Synchronisation de la base vectorielle...")
+        sync_stats = sync_vectorstore(
+            vectordb, manifest, sources, _load_file, splitter,
+            batch_size=Config.EMBED_BATCH_SIZE,
+            workers=Config.INGEST_WORKERS,
+            pages_per_task=Config.INGEST_PAGES_PER_TASK,
+            lexical_index=lexical_index,
+            assign_shard=_shard_of if Config.SHARDING_ENABLED else None
+        )
+        if stats is not None:
+            stats.update(sync_stats)
+        if sync_stats["added_chunks"] or sync_stats["removed_chunks"] or not os.path.exists(bm25_path):
+            lexical_index.save(bm25_path)
         vectordb.persist()
-        logger.info("✅ Base vectorielle créée et sauvegardée")
+        logger.info("✅ Base vectorielle à jour et sauvegardée")
         return vectordb
         
     except Exception as e:
         logger.error(f"❌ Erreur lors du chargement: {e}")
         raise
 
-def get_chain():
-    """Créer la chaîne RAG"""
+def _next_index_dir():
+    """Répertoire de la prochaine génération d'index (``gen-N``)"""
+    os.makedirs(Config.INDEX_GENERATIONS_DIR, exist_ok=True)
+    numbers = [int(name[4:]) for name in os.listdir(Config.INDEX_GENERATIONS_DIR)
+               if name.startswith("gen-") and name[4:].isdigit()]
+    return os.path.join(Config.INDEX_GENERATIONS_DIR, f"gen-{max(numbers, default=0) + 1}")
+
+def _activate_index_dir(db_dir):
+    """Faire de ``db_dir`` l'index actif du processus et des prochains démarrages"""
+    pointer = os.path.join(Config.DB_ROOT, ACTIVE_INDEX_FILE)
+    tmp_path = f"{pointer}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(db_dir)
+    os.replace(tmp_path, pointer)
+    Config.DB_DIR = db_dir
+    Config.BM25_INDEX_PATH = _bm25_path(db_dir)
+
+def _prune_index_generations(keep):
+    """Supprimer les anciennes générations, sauf celles de ``keep`` (active et précédente)"""
+    if not os.path.isdir(Config.INDEX_GENERATIONS_DIR):
+        return
+    keep = {os.path.normpath(path) for path in keep}
+    for name in os.listdir(Config.INDEX_GENERATIONS_DIR):
+        path = os.path.join(Config.INDEX_GENERATIONS_DIR, name)
+        if os.path.normpath(path) not in keep:
+            shutil.rmtree(path, ignore_errors=True)
+
+def create_vectorstore(embeddings):
+    """Ouvrir la base vectorielle à jour, avec reconstruction complète en cas d'échec"""
+    try:
+        return load_vectorstore(embeddings)
+    except Exception as e:
+        logger.warning(f"Erreur de mise à jour incrémentale: {e}")
+        logger.info("Reconstruction complète de la base vectorielle...")
+        return load_vectorstore(embeddings, incremental=False)
+
+def create_reranker():
+    """Créer le cross-encoder de reclassement et charger son modèle"""
+    reranker = CrossEncoderReranker(
+        Config.RERANK_MODEL,
+        batch_size=Config.RERANK_BATCH_SIZE,
+        budget_ms=Config.RERANK_BUDGET_MS,
+        max_length=Config.RERANK_MAX_LENGTH
+    )
+    reranker.model  # charger le modèle dès maintenant (préchargement)
+    return reranker
+
+def get_vectorstore():
+    """Base vectorielle partagée par le processus"""
+    return registry.get("vectordb")
+
+# Template de prompt
+PROMPT_TEMPLATE = """Tu es un assistant spécialisé en sécurité HSE pour le domaine minier OCP.
+
+Tu dois ABSOLUMENT utiliser les informations du contexte fourni pour répondre aux questions.
+Ne dis JAMAIS "je ne dispose pas d'informations" ou "je n'ai pas assez d'informations".
+
+Utilise TOUJOURS le contexte disponible pour construire une réponse pertinente, même si l'information n'est pas complète.
+Si le contexte ne mentionne pas exactement ce qui est demandé, extrais les informations les plus proches et adapte ta réponse.
+
+CONTEXTE DISPONIBLE:
+{context}
+
+QUESTION: {question}
+
+RÉPONSE (en te basant sur le contexte ci-dessus):"""
+
+# Ajouté à une réponse dont le flux s'est interrompu
+INTERRUPTED_NOTICE = "\n\n⚠️ Réponse interrompue."
+
+def get_prompt():
+    """Template de prompt du RAG"""
+    from langchain.prompts import PromptTemplate
+    return PromptTemplate(
+        template=PROMPT_TEMPLATE,
+        input_variables=["context", "question"]
+    )
+
+def get_llm(api_key):
+    """Client LangChain du modèle Groq, pour ``get_chain`` (``RAGSystem`` génère via ``create_llm_client``)"""
+    from langchain.chat_models import ChatOpenAI
+    return ChatOpenAI(
+        openai_api_key=api_key,
+        base_url=Config.GROQ_BASE_URL,
+        model=Config.GROQ_MODEL,
+        temperature=Config.TEMPERATURE,
+        max_tokens=Config.MAX_TOKENS,
+        timeout=Config.LLM_READ_TIMEOUT,
+        max_retries=Config.LLM_MAX_RETRIES
+    )
+
+def create_llm_client(api_key):
+    """Client LLM résilient utilisé pour la génération (streaming)"""
+    return ResilientLLMClient(
+        base_url=Config.GROQ_BASE_URL,
+        api_key=api_key,
+        model=Config.GROQ_MODEL,
+        temperature=Config.TEMPERATURE,
+        max_tokens=Config.MAX_TOKENS,
+        connect_timeout=Config.LLM_CONNECT_TIMEOUT,
+        read_timeout=Config.LLM_READ_TIMEOUT,
+        deadline=Config.LLM_DEADLINE,
+        max_connections=Config.LLM_MAX_CONNECTIONS,
+        max_retries=Config.LLM_MAX_RETRIES,
+        backoff_base=Config.LLM_BACKOFF_BASE,
+        backoff_max=Config.LLM_BACKOFF_MAX,
+        hedge=Config.LLM_HEDGE_ENABLED,
+        hedge_after_ms=Config.LLM_HEDGE_AFTER_MS,
+        hedge_quantile=Config.LLM_HEDGE_QUANTILE,
+        breaker=CircuitBreaker(Config.LLM_BREAKER_THRESHOLD, Config.LLM_BREAKER_RESET),
+    )
+
+def get_chain(embeddings=None):
+    """Créer une chaîne RAG LangChain autonome (``RAGSystem`` n'en a pas besoin)"""
+    from langchain.chains import RetrievalQA
     try:
         logger.info("🔗 Création de la chaîne RAG...")
         
@@ -107,27 +433,12 @@ def get_chain():
             raise Exception("GROQ_API_KEY manquante")
         logger.info("✅ Clé API vérifiée")
         
-        # Charger ou créer la base vectorielle
+        # Charger la base vectorielle et l'indexer de façon incrémentale
         logger.info("🗃️ Chargement de la base vectorielle...")
-        try:
-            embeddings = HuggingFaceEmbeddings(
-                model_name="sentence-transformers/all-MiniLM-L6-v2",
-                model_kwargs={'device': 'cpu'},
-                encode_kwargs={'normalize_embeddings': True}
-            )
-            
-            # Vérifier si la base existe
-            if os.path.exists("db") and os.listdir("db"):
-                vectordb = Chroma(persist_directory="db", embedding_function=embeddings)
-                logger.info("📊 Base vectorielle existante chargée")
-            else:
-                logger.info("Création d'une nouvelle base vectorielle...")
-                vectordb = load_vectorstore()
-                
-        except Exception as e:
-            logger.warning(f"Erreur de chargement de la base existante: {e}")
-            logger.info("Création d'une nouvelle base vectorielle...")
-            vectordb = load_vectorstore()
+        if embeddings is None:
+            vectordb = get_vectorstore()
+        else:
+            vectordb = create_vectorstore(embeddings)
         
         logger.info("🔍 Création du retriever...")
         retriever = vectordb.as_retriever(
@@ -137,37 +448,12 @@ def get_chain():
         
         # Créer le LLM
         logger.info("🤖 Création du modèle de langage...")
-        llm = ChatOpenAI(
-            openai_api_key=api_key,
-            base_url="https://api.groq.com/openai/v1",
-            model="llama-3.1-8b-instant",
-            temperature=0.1,
-            max_tokens=1000,
-            timeout=60
-        )
+        llm = get_llm(api_key)
         logger.info("✅ Modèle de langage créé")
         
         # Template de prompt
         logger.info("📝 Création du template de prompt...")
-        prompt_template = """Tu es un assistant spécialisé en sécurité HSE pour le domaine minier OCP.
-
-Tu dois ABSOLUMENT utiliser les informations du contexte fourni pour répondre aux questions.
-Ne dis JAMAIS "je ne dispose pas d'informations" ou "je n'ai pas assez d'informations".
-
-Utilise TOUJOURS le contexte disponible pour construire une réponse pertinente, même si l'information n'est pas complète.
-Si le contexte ne mentionne pas exactement ce qui est demandé, extrais les informations les plus proches et adapte ta réponse.
-
-CONTEXTE DISPONIBLE:
-{context}
-
-QUESTION: {question}
-
-RÉPONSE (en te basant sur le contexte ci-dessus):"""
-        
-        PROMPT = PromptTemplate(
-            template=prompt_template,
-            input_variables=["context", "question"]
-        )
+        PROMPT = get_prompt()
         
         # Créer la chaîne
         logger.info("⛓️ Assemblage de la chaîne finale...")
@@ -188,16 +474,66 @@ RÉPONSE (en te basant sur le contexte ci-dessus):"""
         logger.error(f"Détails de l'erreur: {traceback.format_exc()}")
         raise
 
+# Ressources partagées, créées à la première utilisation
+registry.register("embeddings", create_embeddings)
+registry.register("vectordb", lambda: create_vectorstore(get_embeddings()))
+registry.register("llm_client", lambda: create_llm_client(os.getenv("GROQ_API_KEY")))
+registry.register("lexical_index", lambda: BM25Index.load(Config.BM25_INDEX_PATH))
+registry.register("reranker", create_reranker)
+registry.register("knowledge", lambda: MiningSafetyKnowledge.load(Config.KNOWLEDGE_BASE_FILE)
+                  if os.path.exists(Config.KNOWLEDGE_BASE_FILE) else None)
+
 # Classe RAGSystem pour compatibilité
 class RAGSystem:
     def __init__(self):
-        self.chain = None
+        self.embeddings = None
+        self.retriever = None
+        self.llm_client = None
+        self.prompt = None
+        self.lexical_index = None
+        self.knowledge = None
+        self.reranker = None
+        self.router = None
+        self.watcher = None
+        self.profile_requests = 0  # prochaines requêtes à profiler (cf. ``profile_next_queries``)
+        self.last_profile = None
+        self._reload_lock = threading.Lock()
+        self._init_thread = None
+        self._init_ok = False
+        self._ready = threading.Event()
+        self.answer_cache = None
+        if Config.ANSWER_CACHE_ENABLED:
+            self.answer_cache = SemanticAnswerCache(
+                max_entries=Config.ANSWER_CACHE_MAX_ENTRIES,
+                ttl_seconds=Config.ANSWER_CACHE_TTL,
+                similarity_threshold=Config.ANSWER_CACHE_SIMILARITY
+            )
         self.logger = logging.getLogger(f"{__name__}.RAGSystem")
         
     def initialize(self):
         try:
             self.logger.info("🚀 Début de l'initialisation RAGSystem...")
-            self.chain = get_chain()
+            if not os.getenv("GROQ_API_KEY"):
+                raise Exception("GROQ_API_KEY manquante")
+            self.embeddings = get_embeddings()
+            # Étapes exécutées une à une par query et stream_query (recherche, prompt, client LLM)
+            self.logger.info("🗃️ Chargement de la base vectorielle...")
+            self.retriever = get_vectorstore().as_retriever(search_type="similarity", search_kwargs={"k": 3})
+            self.prompt = get_prompt()
+            if Config.HYBRID_SEARCH_ENABLED:
+                self.lexical_index = registry.get("lexical_index")
+            if Config.SHARDING_ENABLED:
+                self.router = QueryRouter(Config.SHARD_KEYWORDS, always=Config.SHARD_ALWAYS_SEARCH)
+            if Config.STRUCTURED_FAST_PATH:
+                self.knowledge = registry.get("knowledge")
+            if Config.RERANK_ENABLED:
+                try:
+                    self.reranker = registry.get("reranker")
+                except Exception as e:
+                    self.logger.warning(f"⚠️ Reclassement désactivé (cross-encoder indisponible): {e}")
+            self.llm_client = registry.get("llm_client")
+            if Config.WATCH_DATA_DIR and self.watcher is None:
+                self.watcher = self.watch_data_dir()
             self.logger.info("✅ RAGSystem initialisé avec succès")
             return True
         except Exception as e:
@@ -205,43 +541,411 @@ class RAGSystem:
             import traceback
             self.logger.error(f"Traceback complet: {traceback.format_exc()}")
             return False
+
+    def initialize_async(self):
+        """Initialiser en arrière-plan; ``wait_until_ready`` attend la fin"""
+        if self._init_thread is None:
+            def run():
+                self._init_ok = self.initialize()
+                self._ready.set()
+            self._init_thread = threading.Thread(target=run, name="rag-init", daemon=True)
+            self._init_thread.start()
+        return self._init_thread
+
+    @property
+    def is_ready(self):
+        return self._ready.is_set()
+
+    def wait_until_ready(self, timeout=None):
+        """Attendre la fin de l'initialisation; renvoie True si elle a réussi"""
+        if self._init_thread is None:
+            return self.retriever is not None
+        self._ready.wait(timeout)
+        return self._ready.is_set() and self._init_ok
+
+    def reload_index(self):
+        """Réindexer ``Config.DATA_DIR`` sans interrompre le service.
+
+        L'index actif est copié dans une nouvelle génération, mise à jour de
+        façon incrémentale pendant que les requêtes continuent sur l'ancien;
+        la base vectorielle, l'index BM25 et la base structurée sont ensuite
+        remplacés d'un bloc. Renvoie les statistiques de synchronisation.
+        """
+        with self._reload_lock:
+            start = time.perf_counter()
+            active = Config.DB_DIR
+            staging = _next_index_dir()
+            if os.path.isdir(active):
+                shutil.copytree(active, staging, ignore=shutil.ignore_patterns(
+                    os.path.basename(Config.EMBEDDING_CACHE_DIR),
+                    os.path.basename(Config.INDEX_GENERATIONS_DIR),
+                    ACTIVE_INDEX_FILE))
+            stats = {}
+            try:
+                lexical_index = BM25Index.load(_bm25_path(staging))
+                vectordb = load_vectorstore(self.embeddings, lexical_index=lexical_index, stats=stats, db_dir=staging)
+            except Exception:
+                shutil.rmtree(staging, ignore_errors=True)
+                raise
+            if not (stats.get("added_files") or stats.get("changed_files") or stats.get("removed_files")):
+                shutil.rmtree(staging, ignore_errors=True)
+                self.logger.info("✅ Aucun changement de contenu, index conservé")
+                return dict(stats, swapped=False)
+
+            knowledge = None
+            if Config.STRUCTURED_FAST_PATH and os.path.exists(Config.KNOWLEDGE_BASE_FILE):
+                knowledge = MiningSafetyKnowledge.load(Config.KNOWLEDGE_BASE_FILE)
+            self._swap_index(vectordb, lexical_index, knowledge)
+            _activate_index_dir(staging)
+            _prune_index_generations(keep=[staging, active])
+            stats["seconds"] = time.perf_counter() - start
+            self.logger.info(f"🔁 Index rechargé à chaud en {stats['seconds']:.1f}s ({staging})")
+            return dict(stats, swapped=True)
+
+    def _swap_index(self, vectordb, lexical_index, knowledge):
+        """Remplacer les index utilisés par les requêtes (les requêtes en cours terminent sur l'ancien)"""
+        retriever = vectordb.as_retriever(search_kwargs=dict(self.retriever.search_kwargs))
+        self.retriever = retriever
+        registry.replace("vectordb", vectordb)
+        registry.replace("lexical_index", lexical_index)
+        if self.lexical_index is not None:
+            self.lexical_index = lexical_index
+        if self.knowledge is not None or knowledge is not None:
+            registry.replace("knowledge", knowledge)
+            if Config.STRUCTURED_FAST_PATH:
+                self.knowledge = knowledge
+
+    def watch_data_dir(self, interval=None):
+        """Réindexer en arrière-plan quand les fichiers de ``Config.DATA_DIR`` changent"""
+        from watcher import DataDirWatcher
+        watcher = DataDirWatcher(Config.DATA_DIR, lambda sources: self.reload_index(),
+                                 interval=interval or Config.WATCH_INTERVAL)
+        self.logger.info(f"👀 Surveillance de {Config.DATA_DIR} (toutes les {watcher.interval}s)")
+        return watcher.start()
+
+    def _index_version(self):
+        """Version de l'index: change à chaque réécriture du manifeste"""
+        try:
+            stat = os.stat(os.path.join(Config.DB_DIR, MANIFEST_FILENAME))
+            return (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+
+    def _cached_answer(self, question, query_vector=None, trace=None):
+        """Chercher la question dans le cache de réponses.
+
+        Renvoie ``(réponse en cache ou None, embedding de la question ou None)``.
+        """
+        if self.answer_cache is None:
+            return None, query_vector
+        trace = trace or Trace()
+        start = time.perf_counter()
+        with trace.span("cache"):
+            self.answer_cache.set_index_version(self._index_version())
+            cached = self.answer_cache.get_exact(question)
+        if cached is None:
+            if query_vector is None:
+                with trace.span("embed"):
+                    query_vector = self.embeddings.embed_query(question)
+            with trace.span("cache"):
+                cached = self.answer_cache.get_similar(query_vector)
+        if cached is not None:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.logger.info(f"⚡ Réponse servie depuis le cache ({cached['cached']}, {elapsed_ms:.1f} ms)")
+        return cached, query_vector
+
+    def _structured_answer(self, question):
+        """Réponse directe depuis la base structurée (listes, contacts), sans LLM"""
+        if self.knowledge is None:
+            return None
+        start = time.perf_counter()
+        result = self.knowledge.answer(question)
+        if result is not None:
+            elapsed_us = (time.perf_counter() - start) * 1e6
+            self.logger.info(f"🗂️ Réponse structurée ({result['structured']}, {elapsed_us:.0f} µs)")
+        return result
+
+    def _retrieve(self, question, query_vector=None, trace=None, vector_docs=None):
+        """Documents pertinents, à partir de l'embedding de la question s'il est déjà calculé.
+
+        Avec le reclassement, ``Config.RERANK_CANDIDATES`` candidats sont
+        réévalués par le cross-encoder et seuls les ``k`` meilleurs sont gardés.
+        ``vector_docs`` fournit les résultats de la recherche vectorielle déjà
+        calculés (recherche matricielle de ``batch_eval``).
+        """
+        trace = trace or Trace()
+        k = self.retriever.search_kwargs.get("k", 4)
+        fetch_k = max(k, Config.RERANK_CANDIDATES) if self.reranker is not None else k
+        if query_vector is None and vector_docs is None:
+            with trace.span("embed"):
+                query_vector = self.embeddings.embed_query(question)
+        with trace.span("retrieve"):
+            shards = self._route(question, trace)
+            if self.lexical_index is not None:
+                candidates = self._hybrid_search(question, query_vector, fetch_k, vector_docs, shards)
+            elif vector_docs is not None:
+                candidates = vector_docs[:fetch_k]
+            else:
+                candidates = self._vector_search(query_vector, fetch_k, shards)
+        if self.reranker is None:
+            return candidates[:k]
+        with trace.span("rerank"):
+            return self.reranker.rerank(question, candidates, k)
+
+    def _route(self, question, trace):
+        """Collections à interroger pour ``question`` (None: toutes, ou index non partitionné)"""
+        shards = getattr(self.retriever.vectorstore, "shards", None)
+        if self.router is None or shards is None:
+            return None
+        routed = self.router.route(question, shards)
+        trace.count("shards_searched", len(routed if routed is not None else shards))
+        if routed is not None:
+            self.logger.info(f"🧭 Collections interrogées: {', '.join(routed)}")
+        return routed
+
+    def _vector_search(self, query_vector, k, shards=None):
+        if shards is None:
+            return self.retriever.vectorstore.similarity_search_by_vector(query_vector, k=k)
+        return self.retriever.vectorstore.similarity_search_by_vector(query_vector, k=k, shards=shards)
+
+    def _hybrid_search(self, question, query_vector, k, vector_docs=None, shards=None):
+        """Fusion par rang réciproque des résultats vectoriels et BM25 (pondérations ``Config.HYBRID_*_WEIGHT``)"""
+        from langchain.schema import Document
+        fetch_k = max(k, Config.HYBRID_FETCH_K)
+        if vector_docs is None:
+            vector_docs = self._vector_search(query_vector, fetch_k, shards)
+        vector_docs = vector_docs[:fetch_k]
+        docs_by_id = {chunk_id(doc.metadata.get("source", ""), doc.page_content): doc for doc in vector_docs}
+        vector_ids = list(docs_by_id)
+        where = None
+        if shards is not None:
+            where = lambda metadata: metadata.get("shard", DEFAULT_SHARD) in shards
+        lexical_ids = [doc_id for doc_id, _ in self.lexical_index.search(question, fetch_k, where=where)]
+        for doc_id in lexical_ids:
+            if doc_id not in docs_by_id:
+                text, metadata = self.lexical_index.get(doc_id)
+                docs_by_id[doc_id] = Document(page_content=text, metadata=metadata)
+
+        fused = reciprocal_rank_fusion(
+            [vector_ids, lexical_ids],
+            weights=[Config.HYBRID_VECTOR_WEIGHT, Config.HYBRID_BM25_WEIGHT],
+            k=Config.RRF_K
+        )
+        return [docs_by_id[doc_id] for doc_id, _ in fused[:k]]
+
+    def _pack_context(self, docs, trace):
+        """Contexte fusionné, dédoublonné et borné en tokens: ``(texte, passages retenus)``"""
+        if not Config.CONTEXT_PACKING_ENABLED:
+            return "\n\n".join(doc.page_content for doc in docs), docs
+        packed = pack_context(
+            docs,
+            token_budget=Config.CONTEXT_TOKEN_BUDGET,
+            similarity_threshold=Config.CONTEXT_DEDUP_THRESHOLD,
+            min_overlap=Config.CONTEXT_MIN_OVERLAP
+        )
+        stats = packed.stats
+        if stats["saved_tokens"] > 0:
+            self.logger.info(
+                f"📦 Contexte: {stats['input_tokens']} → {stats['output_tokens']} tokens "
+                f"(-{stats['saved_tokens'] / stats['input_tokens']:.0%}; {stats['merged']} fusions, "
+                f"{stats['duplicates']} doublons, {stats['boilerplate_lines']} lignes d'en-tête, "
+                f"{stats['dropped'] + stats['truncated']} passages coupés ou écartés)"
+            )
+        trace.count("context_tokens_saved", max(0, stats["saved_tokens"]))
+        return packed.text, packed.passages
+
+    def _build_prompt(self, question, context, history=""):
+        """Assembler le prompt « stuff » à partir du contexte (et de l'historique compressé)"""
+        if history:
+            context = f"{context}\n\nHISTORIQUE DE LA CONVERSATION:\n{history}"
+        return self.prompt.format(context=context, question=question)
+
+    @staticmethod
+    def _sources(docs):
+        return [doc.metadata.get("source", "Inconnu") for doc in docs]
+
+    def _finish(self, response, trace):
+        """Clore la trace d'une requête, l'exporter et joindre les durées à la réponse"""
+        trace.finish()
+        metrics.record_trace(trace)
+        self.logger.info("⏱️ " + ", ".join(f"{stage}={ms:.0f}ms" for stage, ms in trace.spans.items()))
+        result = dict(response, timings=trace.as_dict(), latency_ms=trace.spans["total"])
+        if "llm_ttft" in trace.spans:
+            result["ttft_ms"] = trace.spans["ttft"]
+        return result
+
+    def _run(self, question, query_vector=None, conversation=None, vector_docs=None):
+        """Pipeline commun à ``query`` et ``stream_query``: événements ``token`` puis ``done``"""
+        trace = Trace()
+        try:
+            # En conversation, une relance est recherchée sous forme de question autonome
+            turn = conversation.prepare(question) if conversation is not None else None
+            search_question = question
+            if turn is not None and turn.follow_up:
+                search_question = turn.query
+                query_vector = None
+                self.logger.info(f"💬 Relance reformulée: {search_question}")
+
+            with trace.span("structured"):
+                structured = self._structured_answer(search_question)
+            if structured is not None:
+                if turn is not None:
+                    conversation.record(turn, structured["answer"], None)
+                yield ("token", structured["answer"])
+                yield ("done", self._finish(structured, trace))
+                return
+
+            # L'historique entre dans le prompt: une réponse en conversation ne vaut que pour ce fil,
+            # elle n'est donc ni cherchée ni enregistrée dans le cache (indexé sur la seule question)
+            history = conversation.history_text() if conversation is not None else ""
+            cached = None
+            if not history:
+                cached, query_vector = self._cached_answer(search_question, query_vector, trace)
+            if cached is not None:
+                if turn is not None:
+                    conversation.record(turn, cached["answer"], None)
+                yield ("token", cached["answer"])
+                yield ("done", self._finish(cached, trace))
+                return
+
+            if turn is not None and turn.reuse_docs:
+                # Même sujet qu'au tour précédent: ni embedding ni recherche
+                docs = turn.reuse_docs
+                trace.count("retrieval_reused", 1)
+                self.logger.info("♻️ Documents du tour précédent réutilisés")
+            else:
+                docs = self._retrieve(search_question, query_vector, trace,
+                                      vector_docs if search_question == question else None)
+            retrieved = docs
+            with trace.span("prompt"):
+                context, docs = self._pack_context(docs, trace)
+                prompt = self._build_prompt(question, context, history)
+            trace.count("prompt_tokens", estimate_tokens(prompt))
+
+            parts = []
+            fallback = interrupted = False
+            llm_start = time.perf_counter()
+            try:
+                for text in self.llm_client.stream(prompt):
+                    if not parts:
+                        trace.add("llm_ttft", (time.perf_counter() - llm_start) * 1000)
+                        trace.mark("ttft")
+                        self.logger.info(f"⏱️ Premier token après {trace.spans['ttft']:.0f} ms")
+                    parts.append(text)
+                    yield ("token", text)
+            except LLMInterruptedError as e:
+                # Réponse tronquée: affichée avec un avertissement, mais ni mise en cache ni considérée complète
+                self.logger.warning(f"⚠️ Réponse LLM interrompue ({e})")
+                interrupted = True
+                trace.count("llm_interrupted", 1)
+                parts.append(INTERRUPTED_NOTICE)
+                yield ("token", INTERRUPTED_NOTICE)
+            except LLMUnavailableError as e:
+                if not Config.LLM_FALLBACK_ENABLED:
+                    raise
+                # LLM indisponible: extraits des passages retrouvés plutôt qu'une erreur
+                self.logger.warning(f"⚠️ LLM indisponible ({e}), réponse extractive")
+                fallback = True
+                trace.count("llm_fallbacks", 1)
+                parts = [extractive_answer(question, docs)]
+                yield ("token", parts[0])
+            trace.add("llm_total", (time.perf_counter() - llm_start) * 1000)
+
+            answer = "".join(parts)
+            trace.count("completion_tokens", estimate_tokens(answer))
+            response = {"answer": answer, "sources": self._sources(docs)}
+            if fallback:
+                response["fallback"] = True
+            elif interrupted:
+                response["interrupted"] = True
+            elif self.answer_cache is not None and not history and answer.strip():
+                self.answer_cache.put(search_question, response, query_vector)
+            if turn is not None:
+                conversation.record(turn, answer, retrieved)
+            registry.mark_first_answer()
+            yield ("done", self._finish(response, trace))
+        except Exception as e:
+            self.logger.error(f"Erreur lors de la requête: {e}")
+            yield ("done", {"error": str(e)})
     
-    def query(self, question):
-        if not self.chain:
+    def query(self, question, query_vector=None, conversation=None, vector_docs=None):
+        """Répondre à une question.
+
+        ``query_vector`` permet de fournir l'embedding de la question déjà
+        calculé (par exemple par le micro-batching de ``query_engine``).
+        ``conversation`` (cf. ``conversation.Conversation``) active le mode
+        conversationnel: relances reformulées et historique compressé.
+        ``vector_docs`` remplace la recherche vectorielle par des résultats
+        déjà calculés (cf. ``batch_eval``).
+        """
+        if self.retriever is None:
             return {"error": "Système non initialisé"}
         
+        result = None
+        for kind, payload in self._profiled(self._run(question, query_vector, conversation, vector_docs)):
+            if kind == "done":
+                result = payload
+        return result
+
+    def stream_query(self, question, conversation=None, query_vector=None):
+        """Générer la réponse au fil de l'eau.
+
+        Produit des tuples ``("token", texte)`` à mesure que le LLM répond, puis
+        un dernier tuple ``("done", résultat)`` où ``résultat`` a la même forme
+        que celui de ``query`` (avec les durées ``ttft_ms`` et ``latency_ms``).
+        """
+        if self.retriever is None:
+            yield ("done", {"error": "Système non initialisé"})
+            return
+
+        yield from self._profiled(self._run(question, query_vector, conversation))
+
+    def profile_next_queries(self, count=1):
+        """Profiler les ``count`` prochaines requêtes (piles écrites dans ``Config.PROFILE_DIR``)"""
+        self.profile_requests += count
+
+    def _profiled(self, events):
+        """Échantillonner la pile pendant la requête; écrire le profil s'il a été demandé ou si elle est lente"""
+        requested = self.profile_requests > 0
+        if requested:
+            self.profile_requests -= 1
+        elif Config.PROFILE_SLOW_QUERY_MS is None:
+            yield from events
+            return
+        profiler = SamplingProfiler(interval=Config.PROFILE_INTERVAL_MS / 1000).start()
         try:
-            result = self.chain({"query": question})
-            return {
-                "answer": result["result"],
-                "sources": [doc.metadata.get("source", "Inconnu") 
-                           for doc in result.get("source_documents", [])]
-            }
-        except Exception as e:
-            self.logger.error(f"Erreur lors de la requête: {e}")
-            return {"error": str(e)}
+            for kind, payload in events:
+                if kind == "done":
+                    profiler.stop()
+                    latency_ms = payload.get("latency_ms", 0)
+                    if requested or latency_ms >= Config.PROFILE_SLOW_QUERY_MS:
+                        self.last_profile = {
+                            "path": profiler.dump(Config.PROFILE_DIR, max_files=Config.PROFILE_MAX_FILES),
+                            "latency_ms": round(latency_ms, 1),
+                            "samples": profiler.samples,
+                            "hotspots": profiler.hotspots(5),
+                        }
+                        self.logger.info(f"🔥 Profil de requête ({latency_ms:.0f} ms): {self.last_profile['path']}")
+                yield kind, payload
+        finally:
+            profiler.stop()
 
 # Fonction de diagnostic de la base vectorielle
 def diagnose_vectorstore():
     """Diagnostiquer le contenu de la base vectorielle"""
     try:
-        import os
-        from langchain.embeddings import HuggingFaceEmbeddings
-        from langchain.vectorstores import Chroma
-        
         if os.path.exists("db"):
-            embeddings = HuggingFaceEmbeddings(
-                model_name="sentence-transformers/all-MiniLM-L6-v2",
-                model_kwargs={'device': 'cpu'},
-                encode_kwargs={'normalize_embeddings': True}
-            )
-            
-            vectordb = Chroma(persist_directory="db", embedding_function=embeddings)
+            vectordb = get_vectorstore()
             
             # Test de recherche
             test_results = vectordb.similarity_search("réglementation HSE", k=5)
             
             print("=== DIAGNOSTIC VECTORSTORE ===")
+            index = index_report(vectordb, registry.get("lexical_index"))
+            print(f"Index: {index['dir']} ({index['disk_mb']} Mo, {index['chunks']} chunks, "
+                  f"{index['bm25_chunks']} chunks BM25)")
+            if index.get("shards"):
+                print(f"Collections: {', '.join(index['shards'])}")
             print(f"Nombre de documents trouvés: {len(test_results)}")
             
             for i, doc in enumerate(test_results):
@@ -283,11 +987,9 @@ def test_system_with_diagnosis():
     print("🔍 DIAGNOSTIC DU SYSTÈME")
     
     # 1. Vérifier les fichiers
-    files_to_check = [
-        "data/HSE_AAOURIDA.pdf",
-        "data/STEULER-HSE-Management.pdf", 
-        "data/mining_safety_database.json"
-    ]
+    files_to_check = index_sources()
+    if not files_to_check:
+        print(f"❌ Aucun fichier PDF ou JSON dans {Config.DATA_DIR}")
     
     for file_path in files_to_check:
         if os.path.exists(file_path):
@@ -322,6 +1024,10 @@ def test_system_with_diagnosis():
                 else:
                     print(f"❌ Erreur: {result['error']}")
             
+            # 4. Mémoire, index, caches et client LLM
+            import json
+            print("\n=== RAPPORT DE SANTÉ ===")
+            print(json.dumps(health_report(rag), indent=2, ensure_ascii=False, default=str))
             return True
         else:
             print("❌ Échec de l'initialisation")
@@ -0,0 +1,85 @@
+"""Reclassement des passages candidats par un cross-encoder, sous budget de latence.
+
+La recherche vectorielle (ou hybride) sur-sélectionne une trentaine de
+candidats; un petit cross-encoder CPU les réévalue par lots contre la
+question et seuls les meilleurs sont envoyés au LLM. Le budget de latence est
+vérifié avant chaque lot: les candidats non évalués gardent l'ordre de la
+recherche, et si aucun lot n'a pu être évalué, l'ordre vectoriel est conservé
+tel quel. L'estimation de la durée d'un lot est alors divisée par deux: un lot
+lent isolé (démarrage à froid, pause du ramasse-miettes) ne désactive le
+reclassement que pour quelques requêtes.
+"""
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class CrossEncoderReranker:
+    """Cross-encoder ``sentence-transformers`` chargé à la première utilisation"""
+
+    def __init__(self, model_name, batch_size=8, budget_ms=250.0, max_length=256, model=None):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.budget_ms = budget_ms
+        self.max_length = max_length
+        self._model = model
+        self._lock = threading.Lock()
+        # Durée estimée d'un lot (moyenne glissante), pour ne pas dépasser le budget
+        self._batch_ms = None
+        self.calls = 0
+        self.fallbacks = 0
+        self.partial = 0
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from sentence_transformers import CrossEncoder
+                    logger.info(f"🧮 Chargement du cross-encoder {self.model_name}...")
+                    self._model = CrossEncoder(self.model_name, max_length=self.max_length, device="cpu")
+        return self._model
+
+    def _score(self, question, docs):
+        pairs = [(question, doc.page_content) for doc in docs]
+        return [float(score) for score in self.model.predict(pairs, batch_size=len(pairs), show_progress_bar=False)]
+
+    def rerank(self, question, docs, top_n):
+        """Les ``top_n`` meilleurs documents de ``docs`` (classés par la recherche) pour ``question``"""
+        self.calls += 1
+        if len(docs) <= 1:
+            return list(docs[:top_n])
+
+        start = time.perf_counter()
+        scores = []
+        for i in range(0, len(docs), self.batch_size):
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if self._batch_ms is not None and elapsed_ms + self._batch_ms > self.budget_ms:
+                break
+            batch_start = time.perf_counter()
+            scores.extend(self._score(question, docs[i:i + self.batch_size]))
+            batch_ms = (time.perf_counter() - batch_start) * 1000
+            self._batch_ms = batch_ms if self._batch_ms is None else 0.8 * self._batch_ms + 0.2 * batch_ms
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if not scores:
+            self.fallbacks += 1
+            # Sans lot évalué, l'estimation ne serait jamais corrigée: elle décroît jusqu'au prochain essai
+            self._batch_ms /= 2
+            logger.warning(f"⏳ Budget de reclassement ({self.budget_ms:.0f} ms) insuffisant, ordre vectoriel conservé")
+            return list(docs[:top_n])
+        if len(scores) < len(docs):
+            self.partial += 1
+            logger.info(f"⏳ Reclassement partiel: {len(scores)}/{len(docs)} candidats en {elapsed_ms:.0f} ms")
+        else:
+            logger.info(f"🧮 {len(docs)} candidats reclassés en {elapsed_ms:.0f} ms")
+
+        ranked = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)
+        ranked += range(len(scores), len(docs))
+        return [docs[i] for i in ranked[:top_n]]
+
+    def stats(self):
+        return {"calls": self.calls, "fallbacks": self.fallbacks, "partial": self.partial,
+                "batch_ms": round(self._batch_ms, 2) if self._batch_ms is not None else None}
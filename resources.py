@@ -0,0 +1,70 @@
+"""Registre des ressources lourdes partagées par le processus.
+
+Le modèle d'embeddings, la base vectorielle et le client LLM sont créés à la
+première demande, une seule fois par processus, puis partagés par tous les
+appelants (Streamlit, diagnostic, tests). Le préchargement en arrière-plan
+(``RAGSystem.initialize_async``) permet d'afficher l'interface pendant le
+chargement du modèle.
+"""
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Référence de démarrage: ce module est importé avant toute bibliothèque lourde
+PROCESS_START = time.perf_counter()
+
+
+class ResourceRegistry:
+    """Fabriques paresseuses, thread-safe, de ressources partagées"""
+
+    def __init__(self):
+        self._factories = {}
+        self._resources = {}
+        self._locks = {}
+        self._registry_lock = threading.Lock()
+        self.load_times = {}
+        self.first_answer_seconds = None
+
+    def register(self, name, factory):
+        """Déclarer la fabrique d'une ressource (sans la créer)"""
+        with self._registry_lock:
+            self._factories[name] = factory
+            self._locks.setdefault(name, threading.Lock())
+
+    def get(self, name):
+        """Ressource ``name``, créée au premier appel"""
+        resource = self._resources.get(name)
+        if resource is not None:
+            return resource
+        with self._locks[name]:
+            # Un autre thread a pu la créer pendant l'attente du verrou
+            if name not in self._resources:
+                start = time.perf_counter()
+                self._resources[name] = self._factories[name]()
+                self.load_times[name] = time.perf_counter() - start
+                logger.info(f"📦 Ressource « {name} » chargée en {self.load_times[name]:.2f}s")
+            return self._resources[name]
+
+    def is_loaded(self, name):
+        return name in self._resources
+
+    def replace(self, name, resource):
+        """Remplacer une ressource déjà créée (ex: index reconstruit à chaud)"""
+        with self._locks[name]:
+            self._resources[name] = resource
+
+    def reset(self, name):
+        """Oublier une ressource: elle sera recréée au prochain ``get``"""
+        with self._locks[name]:
+            self._resources.pop(name, None)
+
+    def mark_first_answer(self):
+        """Mesurer le délai entre le démarrage du processus et la première réponse servie"""
+        if self.first_answer_seconds is None:
+            self.first_answer_seconds = time.perf_counter() - PROCESS_START
+            logger.info(f"🏁 Première réponse servie {self.first_answer_seconds:.2f}s après le démarrage du processus")
+
+
+registry = ResourceRegistry()
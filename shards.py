@@ -0,0 +1,246 @@
+"""Index partitionné en collections (« shards ») et routage des questions.
+
+À l'indexation, chaque chunk est rangé dans une collection nommée selon sa
+source (``assign_shard``): la base JSON dans ``structured``, les fichiers d'un
+sous-répertoire de ``Config.DATA_DIR`` dans la collection de leur site
+(``site-<nom>``), les autres selon les mots-clés de leur nom de fichier
+(``Config.SHARD_KEYWORDS``), sinon ``general``. Le nom de la collection est
+enregistré dans les métadonnées (``shard``), donc aussi dans l'index BM25.
+
+``QueryRouter`` choisit les collections utiles à une question par les mêmes
+mots-clés; ``ShardedVectorStore`` n'interroge qu'elles, en parallèle, et
+fusionne leurs résultats par similarité. Sans mot-clé reconnu, toutes les
+collections sont interrogées.
+"""
+import json
+import logging
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from lexical_index import strip_accents, tokenize
+
+logger = logging.getLogger(__name__)
+
+SHARDS_FILE = "shards.json"
+DEFAULT_SHARD = "general"
+STRUCTURED_SHARD = "structured"
+SITE_PREFIX = "site-"
+
+_SLUG_RE = re.compile(r"[^a-z0-9]+")
+
+
+def slugify(name):
+    """Nom de collection valide (minuscules, chiffres et tirets)"""
+    return _SLUG_RE.sub("-", strip_accents(name).lower()).strip("-") or DEFAULT_SHARD
+
+
+def _keyword_tokens(keywords):
+    return {shard: {token for word in words for token in tokenize(word)} for shard, words in keywords.items()}
+
+
+def assign_shard(metadata, keywords, data_dir=None):
+    """Collection d'un chunk d'après sa source: type, site (sous-répertoire) puis nom de fichier"""
+    if metadata.get("type") == "json":
+        return STRUCTURED_SHARD
+    source = metadata.get("source", "")
+    if data_dir and source:
+        relative = os.path.relpath(os.path.normpath(source), os.path.normpath(data_dir))
+        parts = relative.split(os.sep)
+        if len(parts) > 1 and parts[0] != os.pardir:
+            return SITE_PREFIX + slugify(parts[0])
+    name_tokens = set(tokenize(os.path.splitext(os.path.basename(source))[0].replace("_", " ")))
+    for shard, tokens in _keyword_tokens(keywords).items():
+        if shard != STRUCTURED_SHARD and name_tokens & tokens:
+            return shard
+    return DEFAULT_SHARD
+
+
+def _scored_search(store, vector, k):
+    """``(document, similarité)`` d'une collection, la plus grande similarité d'abord"""
+    if hasattr(store, "similarity_search_by_vector_with_score"):
+        return store.similarity_search_by_vector_with_score(vector, k)
+    # Chroma: distance L2 au carré entre vecteurs normalisés
+    return [(doc, 1.0 - distance / 2.0)
+            for doc, distance in store.similarity_search_by_vector_with_relevance_scores(vector, k=k)]
+
+
+class _ShardedStore:
+    """Plusieurs collections derrière l'interface d'une seule base vectorielle.
+
+    ``open_shard(nom)`` ouvre (ou crée) la base d'une collection; la liste des
+    collections existantes est conservée dans ``shards.json``. Les ajouts sont
+    répartis selon ``metadata["shard"]`` (ou ``assign(metadata)``), les
+    suppressions envoyées à toutes les collections.
+
+    Exposée sous le nom ``ShardedVectorStore``, sous-classe de ``VectorStore``
+    de LangChain créée au premier accès: importer ``shards`` ne charge pas
+    LangChain.
+    """
+
+    def __init__(self, directory, embedding_function, open_shard, assign=None, workers=4):
+        self.directory = directory
+        self._embedding_function = embedding_function
+        self.open_shard = open_shard
+        self.assign = assign or (lambda metadata: DEFAULT_SHARD)
+        self.workers = workers
+        self._stores = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        for name in self._load_names():
+            self._stores[name] = open_shard(name)
+
+    @property
+    def embeddings(self):
+        return self._embedding_function
+
+    @property
+    def shards(self):
+        return sorted(self._stores)
+
+    def _names_path(self):
+        return os.path.join(self.directory, SHARDS_FILE)
+
+    def _load_names(self):
+        try:
+            with open(self._names_path(), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return []
+
+    def _save_names(self):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = self._names_path() + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.shards, f)
+        os.replace(tmp_path, self._names_path())
+
+    def _store(self, name):
+        with self._lock:
+            if name not in self._stores:
+                self._stores[name] = self.open_shard(name)
+                self._save_names()
+                logger.info(f"🧩 Nouvelle collection: {name}")
+            return self._stores[name]
+
+    # --- Écriture -------------------------------------------------------------
+
+    def add_texts(self, texts, metadatas=None, ids=None, **kwargs):
+        texts = list(texts)
+        metadatas = list(metadatas) if metadatas is not None else [{} for _ in texts]
+        ids = list(ids) if ids is not None else [None] * len(texts)
+        groups = {}
+        for text, metadata, doc_id in zip(texts, metadatas, ids):
+            metadata = dict(metadata or {})
+            metadata.setdefault("shard", self.assign(metadata))
+            group = groups.setdefault(metadata["shard"], ([], [], []))
+            group[0].append(text)
+            group[1].append(metadata)
+            group[2].append(doc_id)
+        added = []
+        for name, (group_texts, group_metadatas, group_ids) in groups.items():
+            store_ids = group_ids if None not in group_ids else None
+            added.extend(self._store(name).add_texts(group_texts, metadatas=group_metadatas, ids=store_ids))
+        return added
+
+    def delete(self, ids=None, **kwargs):
+        if ids:
+            for store in list(self._stores.values()):
+                store.delete(ids=ids)
+        return True
+
+    def delete_collection(self):
+        with self._lock:
+            for store in self._stores.values():
+                store.delete_collection()
+            self._stores = {}
+            self._save_names()
+
+    def persist(self):
+        for store in list(self._stores.values()):
+            if hasattr(store, "persist"):
+                store.persist()
+
+    # --- Lecture --------------------------------------------------------------
+
+    def count(self):
+        return sum(store._collection.count() if hasattr(store, "_collection") else store.count()
+                   for store in list(self._stores.values()))
+
+    def get(self, include=None):
+        """Contenu de toutes les collections, au format de ``Chroma.get``"""
+        include = include or ["documents", "metadatas"]
+        result = {"ids": [], **{key: [] for key in include}}
+        for store in list(self._stores.values()):
+            data = store.get(include=include)
+            result["ids"].extend(data["ids"])
+            for key in include:
+                values = data.get(key)
+                result[key].extend(list(values) if values is not None else [None] * len(data["ids"]))
+        return result
+
+    def _map(self, function, stores):
+        if len(stores) <= 1 or self.workers <= 1:
+            return [function(store) for store in stores]
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="shard-search")
+        return list(self._executor.map(function, stores))
+
+    def similarity_search_by_vector_with_score(self, embedding, k=4, shards=None):
+        """Recherche parallèle dans ``shards`` (toutes les collections par défaut), fusion par similarité"""
+        names = self.shards if shards is None else [name for name in shards if name in self._stores]
+        stores = [self._stores[name] for name in names]
+        results = [hit for hits in self._map(lambda store: _scored_search(store, embedding, k), stores)
+                   for hit in hits]
+        results.sort(key=lambda hit: hit[1], reverse=True)
+        return results[:k]
+
+    def similarity_search_by_vector(self, embedding, k=4, shards=None, **kwargs):
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k, shards)]
+
+    def similarity_search_with_score(self, query, k=4, shards=None, **kwargs):
+        return self.similarity_search_by_vector_with_score(self._embedding_function.embed_query(query), k, shards)
+
+    def similarity_search(self, query, k=4, shards=None, **kwargs):
+        return self.similarity_search_by_vector(self._embedding_function.embed_query(query), k, shards)
+
+    def _select_relevance_score_fn(self):
+        return lambda score: (score + 1.0) / 2.0
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, ids=None, **kwargs):
+        raise NotImplementedError("Utiliser ShardedVectorStore(directory, embedding, open_shard)")
+
+
+def __getattr__(name):
+    if name == "ShardedVectorStore":
+        try:
+            from langchain.vectorstores.base import VectorStore
+        except ImportError:  # langchain >= 0.1
+            from langchain_core.vectorstores import VectorStore
+        cls = type("ShardedVectorStore", (_ShardedStore, VectorStore), {"__module__": __name__})
+        globals()["ShardedVectorStore"] = cls
+        return cls
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class QueryRouter:
+    """Collections à interroger pour une question, par mots-clés"""
+
+    def __init__(self, keywords, always=(DEFAULT_SHARD,)):
+        self.keywords = _keyword_tokens(keywords)
+        self.always = list(always)
+
+    def route(self, question, available):
+        """Collections de ``available`` utiles à ``question``; None pour toutes"""
+        tokens = set(tokenize(question))
+        matched = {shard for shard, words in self.keywords.items() if tokens & words}
+        for shard in available:
+            # Collection d'un site: nommée dans la question
+            if shard.startswith(SITE_PREFIX) and tokens & set(tokenize(shard[len(SITE_PREFIX):].replace("-", " "))):
+                matched.add(shard)
+        selected = [shard for shard in available if shard in matched]
+        if not selected:
+            return None
+        return selected + [shard for shard in self.always if shard in available and shard not in selected]
@@ -0,0 +1,196 @@
+"""Serveur LLM factice compatible avec l'API OpenAI (``/v1/chat/completions``).
+
+Remplace Groq pour les benchmarks et les tests hors ligne: la réponse est
+extraite du contexte du prompt, avec une latence configurable avant le premier
+token et entre les tokens, en mode normal ou en streaming (SSE).
+
+Des pannes peuvent être injectées pour tester le client résilient
+(``llm_client.py``): taux d'erreur aléatoire, ou scénario requête par requête
+(``script=[{"status": 503}, {"latency_ms": 3000}, {"interrupt_after": 2}, {}]``;
+``interrupt_after`` coupe le flux par un événement tronqué après ce nombre de tokens).
+
+    python stub_llm.py --port 8765 --latency-ms 200 --token-delay-ms 5
+    python stub_llm.py --error-rate 0.3 --error-status 429
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def extractive_answer(prompt, max_words=60):
+    """Réponse déterministe: les premiers mots du contexte du prompt"""
+    context = prompt
+    if "CONTEXTE DISPONIBLE:" in prompt:
+        context = prompt.split("CONTEXTE DISPONIBLE:", 1)[1].split("QUESTION:", 1)[0]
+    words = context.split()[:max_words]
+    return " ".join(words) if words else "Aucun contexte fourni."
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": self.server.model, "object": "model"}]})
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        behaviour = self.server.next_behaviour()
+        status = behaviour.get("status", 200)
+        if status >= 400:
+            time.sleep(behaviour.get("latency_ms", 0) / 1000)
+            body = json.dumps({"error": {"message": f"erreur simulée {status}"}}).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            if "retry_after" in behaviour:
+                self.send_header("Retry-After", str(behaviour["retry_after"]))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        prompt = "\n".join(message.get("content", "") for message in request.get("messages", []))
+        answer = extractive_answer(prompt)
+        tokens = [word + " " for word in answer.split()]
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        model = request.get("model", self.server.model)
+
+        time.sleep(behaviour.get("latency_ms", self.server.latency_ms) / 1000)
+        if not request.get("stream"):
+            time.sleep(self.server.token_delay_ms * len(tokens) / 1000)
+            self._send_json(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": answer},
+                             "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(tokens),
+                          "total_tokens": len(prompt) // 4 + len(tokens)},
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        try:
+            deltas = [{"role": "assistant", "content": ""}] + [{"content": token} for token in tokens]
+            for i, delta in enumerate(deltas):
+                if i > 1:
+                    time.sleep(self.server.token_delay_ms / 1000)
+                if i - 1 == behaviour.get("interrupt_after"):
+                    self.wfile.write(b'data: {"id": "tronqu\n\n')
+                    self.wfile.flush()
+                    self.close_connection = True
+                    return
+                self._send_event({"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                                  "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]})
+            self._send_event({"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                              "model": model, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+            self.close_connection = True
+        except (BrokenPipeError, ConnectionResetError):
+            # Client parti (requête dupliquée abandonnée, annulation)
+            self.close_connection = True
+
+    def _send_event(self, payload):
+        self.wfile.write(f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+
+class _StubHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def next_behaviour(self):
+        """Comportement de la prochaine requête: scénario, puis erreurs aléatoires"""
+        with self.lock:
+            index = self.requests
+            self.requests += 1
+        if index < len(self.script):
+            return self.script[index]
+        if self.error_rate and random.random() < self.error_rate:
+            return {"status": self.error_status}
+        return {}
+
+
+class StubLLMServer:
+    """Serveur factice lancé dans un thread (utilisable comme gestionnaire de contexte)"""
+
+    def __init__(self, host="127.0.0.1", port=0, latency_ms=0, token_delay_ms=0, model="stub-llm",
+                 script=None, error_rate=0.0, error_status=503):
+        self.httpd = _StubHTTPServer((host, port), _Handler)
+        self.httpd.latency_ms = latency_ms
+        self.httpd.token_delay_ms = token_delay_ms
+        self.httpd.model = model
+        self.httpd.script = list(script or [])
+        self.httpd.error_rate = error_rate
+        self.httpd.error_status = error_status
+        self.httpd.requests = 0
+        self.httpd.lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    @property
+    def requests(self):
+        return self.httpd.requests
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="stub-llm", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serveur LLM factice compatible OpenAI")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0, help="délai avant le premier token")
+    parser.add_argument("--token-delay-ms", type=float, default=0, help="délai entre deux tokens")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="proportion de requêtes en erreur")
+    parser.add_argument("--error-status", type=int, default=503, help="code HTTP des erreurs simulées")
+    args = parser.parse_args()
+
+    server = StubLLMServer(args.host, args.port, args.latency_ms, args.token_delay_ms,
+                           error_rate=args.error_rate, error_status=args.error_status)
+    print(f"🤖 LLM factice à l'écoute sur {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
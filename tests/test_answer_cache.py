@@ -0,0 +1,55 @@
+import unittest
+
+from answer_cache import SemanticAnswerCache, normalize_question
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestSemanticAnswerCache(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = SemanticAnswerCache(max_entries=2, ttl_seconds=60, similarity_threshold=0.9, clock=self.clock)
+        self.result = {"answer": "Casque et gilet", "sources": ["data/STEULER-HSE-Management.pdf"]}
+
+    def test_exact_match_ignores_case_and_punctuation(self):
+        self.assertEqual(normalize_question("  Quels EPI ?"), "quels epi")
+        self.cache.put("Quels sont les EPI obligatoires ?", self.result)
+        hit = self.cache.get_exact("quels sont les epi obligatoires")
+        self.assertEqual(hit["sources"], self.result["sources"])
+        self.assertEqual(hit["cached"], "exact")
+
+    def test_semantic_match_above_threshold(self):
+        self.cache.put("EPI obligatoires", self.result, [1.0, 0.0, 0.0])
+        self.assertIsNotNone(self.cache.get_similar([0.95, 0.1, 0.0]))
+        self.assertIsNone(self.cache.get_similar([0.0, 1.0, 0.0]))
+        stats = self.cache.stats()
+        self.assertEqual((stats["semantic_hits"], stats["misses"]), (1, 1))
+
+    def test_ttl_and_lru_eviction(self):
+        self.cache.put("a", self.result)
+        self.cache.put("b", self.result)
+        self.cache.get_exact("a")
+        self.cache.put("c", self.result)
+        self.assertIsNone(self.cache.get_exact("b"))
+        self.assertIsNotNone(self.cache.get_exact("a"))
+
+        self.clock.now = 61
+        self.assertIsNone(self.cache.get_exact("a"))
+
+    def test_index_change_invalidates(self):
+        self.cache.set_index_version(1)
+        self.cache.put("a", self.result)
+        self.cache.set_index_version(1)
+        self.assertEqual(len(self.cache), 1)
+        self.cache.set_index_version(2)
+        self.assertEqual(len(self.cache), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
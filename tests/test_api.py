@@ -0,0 +1,115 @@
+import json
+import unittest
+from types import SimpleNamespace
+
+from aiohttp.test_utils import TestClient, TestServer
+
+from api import ENGINE_KEY, create_app
+from config import Config
+
+
+async def _done():
+    return {"answer": "OK"}
+
+
+class Embeddings:
+    def __init__(self):
+        self.batches = []
+
+    def embed_documents(self, texts):
+        self.batches.append(list(texts))
+        return [[float(len(text))] for text in texts]
+
+
+class FakeRAG:
+    def __init__(self, ready=True):
+        self.embeddings = Embeddings()
+        self.ready = ready
+        self._init_thread = object() if not ready else None
+        self.is_ready = ready
+
+    def wait_until_ready(self, timeout=None):
+        return self.ready
+
+    def query(self, question, query_vector=None):
+        return {"answer": question.upper(), "sources": ["data/guide.pdf"], "vector": query_vector}
+
+    def stream_query(self, question, conversation=None, query_vector=None):
+        for word in question.split():
+            yield ("token", word.upper() + " ")
+        yield ("done", self.query(question, query_vector))
+
+
+class TestAPI(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.rag = FakeRAG()
+        self.client = TestClient(TestServer(create_app(self.rag)))
+        await self.client.start_server()
+
+    async def asyncTearDown(self):
+        await self.client.close()
+
+    async def test_query(self):
+        response = await self.client.post("/query", json={"question": "port du casque"})
+        self.assertEqual(response.status, 200)
+        body = await response.json()
+        self.assertEqual(body["answer"], "PORT DU CASQUE")
+        self.assertEqual(body["vector"], [14.0])
+
+        response = await self.client.post("/query", json={})
+        self.assertEqual(response.status, 400)
+
+    async def test_invalid_body_and_timeout_are_rejected(self):
+        for body in (["casque"], "casque", {"question": "casque", "timeout": -1},
+                     {"question": "casque", "timeout": "10"}, {"question": "casque", "timeout": True}):
+            response = await self.client.post("/query", json=body)
+            self.assertEqual(response.status, 400, body)
+        response = await self.client.post("/query/batch", json=["casque"])
+        self.assertEqual(response.status, 400)
+
+    async def test_timeout_is_capped(self):
+        timeouts = []
+        engine = self.client.server.app[ENGINE_KEY]
+        engine["engine"] = SimpleNamespace(query=lambda question, timeout: timeouts.append(timeout) or _done(),
+                                           close=lambda: None)
+        await self.client.post("/query", json={"question": "casque", "timeout": 10 ** 6})
+        await self.client.post("/query", json={"question": "casque", "timeout": 2.5})
+        self.assertEqual(timeouts, [Config.API_MAX_TIMEOUT, 2.5])
+
+    async def test_stream_sends_token_and_done_events(self):
+        response = await self.client.post("/query/stream", json={"question": "port du casque"})
+        self.assertEqual(response.headers["Content-Type"], "text/event-stream")
+        events = [block.split("\n") for block in (await response.text()).strip().split("\n\n")]
+        kinds = [lines[0][len("event: "):] for lines in events]
+        self.assertEqual(kinds, ["token", "token", "token", "done"])
+        self.assertEqual(json.loads(events[0][1][len("data: "):]), {"text": "PORT "})
+        self.assertEqual(json.loads(events[-1][1][len("data: "):])["answer"], "PORT DU CASQUE")
+
+    async def test_batch_embeds_questions_together(self):
+        questions = ["casque", "gilet", "bottes"]
+        response = await self.client.post("/query/batch", json={"questions": questions})
+        results = (await response.json())["results"]
+        self.assertEqual([r["answer"] for r in results], ["CASQUE", "GILET", "BOTTES"])
+        self.assertEqual(self.rag.embeddings.batches, [questions])
+
+    async def test_health_and_metrics(self):
+        await self.client.post("/query", json={"question": "casque"})
+        response = await self.client.get("/health")
+        self.assertEqual(response.status, 200)
+        self.assertEqual((await response.json())["status"], "ok")
+        response = await self.client.get("/metrics")
+        self.assertIn("rag_engine_in_flight 0", await response.text())
+
+
+class TestAPIStarting(unittest.IsolatedAsyncioTestCase):
+    async def test_requests_wait_for_initialization(self):
+        async with TestClient(TestServer(create_app(FakeRAG(ready=False)))) as client:
+            response = await client.get("/health")
+            self.assertEqual(response.status, 503)
+            self.assertEqual((await response.json())["status"], "starting")
+            response = await client.post("/query", json={"question": "casque"})
+            self.assertEqual(response.status, 503)
+
+
+if __name__ == "__main__":
+    unittest.main()
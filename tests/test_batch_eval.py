@@ -0,0 +1,157 @@
+import json
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import numpy as np
+
+from batch_eval import DocumentMatrix, RateLimiter, completed_ids, load_questions, question_id, run_batch
+
+TEXTS = ["port du casque", "stockage des explosifs", "bassin de décantation"]
+VECTORS = [[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]]
+
+
+class Embeddings:
+    def __init__(self):
+        self.calls = []
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        return [VECTORS[TEXTS.index(text)] if text in TEXTS else [0.2, 1.0, 0.0] for text in texts]
+
+
+class VectorStore:
+    def get(self, include=None):
+        return {"ids": ["1", "2", "3"], "documents": TEXTS, "metadatas": [{"source": t} for t in TEXTS],
+                "embeddings": VECTORS}
+
+
+class ShardedVectorStore(VectorStore):
+    shards = ["explosifs", "general"]
+
+    def get(self, include=None):
+        data = super().get(include)
+        data["metadatas"][1]["shard"] = "explosifs"
+        return data
+
+
+class LLMClient:
+    def __init__(self):
+        self.prompts = []
+
+    def stream(self, prompt):
+        self.prompts.append(prompt)
+        yield prompt
+
+
+class FakeRAG:
+    def __init__(self, fallback=(), interrupted=(), structured=()):
+        self.embeddings = Embeddings()
+        self.retriever = SimpleNamespace(vectorstore=VectorStore(), search_kwargs={"k": 1})
+        self.lexical_index = None
+        self.reranker = None
+        self.llm_client = LLMClient()
+        self.fallback = set(fallback)
+        self.interrupted = set(interrupted)
+        self.structured = set(structured)
+        self.calls = []
+
+    def query(self, question, query_vector=None, vector_docs=None):
+        self.calls.append(question)
+        if question in self.structured:
+            return {"answer": question, "sources": [], "structured": "zones"}
+        answer = "".join(self.llm_client.stream(vector_docs[0].page_content))
+        result = {"answer": answer, "sources": [vector_docs[0].metadata["source"]]}
+        if question in self.fallback:
+            result["fallback"] = True
+        if question in self.interrupted:
+            result["interrupted"] = True
+        return result
+
+
+class TestBatchEval(unittest.TestCase):
+    def test_load_csv_and_jsonl(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = os.path.join(tmp, "q.csv")
+            with open(csv_path, "w", encoding="utf-8") as f:
+                f.write("id,question\nA,port du casque\n,stockage des explosifs\n,\n")
+            jsonl_path = os.path.join(tmp, "q.jsonl")
+            with open(jsonl_path, "w", encoding="utf-8") as f:
+                f.write(json.dumps({"question": "bassin de décantation"}) + "\n\n")
+            self.assertEqual(load_questions(csv_path), [
+                {"id": "A", "question": "port du casque"},
+                {"id": question_id("stockage des explosifs"), "question": "stockage des explosifs"}])
+            self.assertEqual(load_questions(jsonl_path)[0]["id"], question_id("Bassin  de décantation"))
+
+    def test_matrix_search_matches_exact_ranking(self):
+        rng = np.random.default_rng(0)
+        chunks, queries = rng.normal(size=(300, 16)), rng.normal(size=(20, 16))
+        matrix = DocumentMatrix(chunks, [str(i) for i in range(300)], [{}] * 300)
+        for query, hits in zip(queries, matrix.search(queries, 5)):
+            exact = (chunks / np.linalg.norm(chunks, axis=1, keepdims=True)) @ (query / np.linalg.norm(query))
+            self.assertEqual([i for i, _ in hits], list(np.argsort(-exact)[:5]))
+        self.assertEqual(DocumentMatrix([], [], []).search(queries[:2], 5), [[], []])
+
+    def test_run_writes_results_and_resumes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, "answers.jsonl")
+            items = [{"id": str(i), "question": text} for i, text in enumerate(TEXTS)]
+            rag = FakeRAG(fallback={"bassin de décantation"}, interrupted={"port du casque"})
+            summary = run_batch(rag, items, output, concurrency=2, requests_per_minute=0)
+            self.assertEqual(rag.embeddings.calls, [TEXTS])
+            self.assertEqual((summary["answered"], summary["fallbacks"], summary["interrupted"]), (3, 1, 1))
+            with open(output, encoding="utf-8") as f:
+                records = {r["id"]: r for r in map(json.loads, f)}
+            self.assertEqual(records["1"]["answer"], "stockage des explosifs")
+            self.assertIn("elapsed_ms", records["1"])
+            self.assertEqual(completed_ids(output), {"1"})
+
+            # Reprise: seules les réponses de repli et interrompues sont refaites
+            with open(output, "a", encoding="utf-8") as f:
+                f.write('{"id": "tronqu')
+            rag = FakeRAG()
+            summary = run_batch(rag, items, output, requests_per_minute=0)
+            self.assertEqual(sorted(rag.calls), ["bassin de décantation", "port du casque"])
+            self.assertEqual(summary["skipped"], 1)
+            self.assertEqual(completed_ids(output), {"0", "1", "2"})
+
+    def test_matrix_search_follows_router(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, "answers.jsonl")
+            rag = FakeRAG()
+            rag.retriever.vectorstore = ShardedVectorStore()
+            rag.router = SimpleNamespace(route=lambda question, shards: ["general"] if "casque" in question else None)
+            items = [{"id": "0", "question": "stockage des explosifs et casque"},
+                     {"id": "1", "question": "stockage des explosifs"}]
+            run_batch(rag, items, output, requests_per_minute=0)
+            with open(output, encoding="utf-8") as f:
+                records = {r["id"]: r for r in map(json.loads, f)}
+            # Collection « explosifs » écartée par le routage: meilleur chunk de « general »
+            self.assertEqual(records["0"]["answer"], "port du casque")
+            self.assertEqual(records["1"]["answer"], "stockage des explosifs")
+
+    def test_only_llm_calls_are_rate_limited(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            rag = FakeRAG(structured={"port du casque", "bassin de décantation"})
+            client = rag.llm_client
+            items = [{"id": str(i), "question": text} for i, text in enumerate(TEXTS)]
+            with mock.patch.object(RateLimiter, "acquire", return_value=0.0) as acquire:
+                run_batch(rag, items, os.path.join(tmp, "answers.jsonl"), requests_per_minute=60)
+            self.assertEqual(acquire.call_count, 1)
+            self.assertEqual(client.prompts, ["stockage des explosifs"])
+            self.assertIs(rag.llm_client, client)
+
+    def test_rate_limiter_spaces_and_slows_down(self):
+        limiter = RateLimiter(requests_per_minute=6000)
+        self.assertEqual(limiter.acquire(), 0)
+        self.assertGreater(limiter.acquire(), 0)
+        limiter.throttled()
+        self.assertEqual(limiter.slowdown, 2.0)
+        limiter.succeeded()
+        self.assertLess(limiter.slowdown, 2.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import json
+import unittest
+import urllib.request
+from types import SimpleNamespace
+
+from benchmark import compare_to_baseline, is_relevant, recall_at_k, reciprocal_rank, relevance_ranks
+from stub_llm import StubLLMServer
+
+KB = "data/mining_safety_database.json"
+
+
+def doc(text, **metadata):
+    return SimpleNamespace(page_content=text, metadata=metadata)
+
+
+class TestRetrievalMetrics(unittest.TestCase):
+    def test_relevance_matches_metadata_and_terms(self):
+        self.assertTrue(is_relevant({"source": KB, "item": "Chute de hauteur"}, "", {"source": KB, "item": "Chute de hauteur"}))
+        self.assertFalse(is_relevant({"source": KB, "item": "Incendie"}, "", {"source": KB, "item": "Chute de hauteur"}))
+        expected = {"source": "data/guide.pdf", "contains": ["évaluation des risques"]}
+        self.assertTrue(is_relevant({"source": "data/guide.pdf"}, "L'EVALUATION des risques est annuelle", expected))
+        self.assertFalse(is_relevant({"source": "data/guide.pdf"}, "Formation annuelle", expected))
+
+    def test_recall_and_mrr(self):
+        docs = [doc("a", source=KB, item="Incendie"), doc("b", source=KB, item="Chute de hauteur")]
+        ranks = relevance_ranks(docs, [{"source": KB, "item": "Chute de hauteur"}, {"source": KB, "item": "Noyade"}])
+        self.assertEqual(ranks, [2, None])
+        self.assertEqual(recall_at_k(ranks, 1), 0.0)
+        self.assertEqual(recall_at_k(ranks, 2), 0.5)
+        self.assertEqual(reciprocal_rank(ranks), 0.5)
+
+    def test_compare_to_baseline(self):
+        baseline = {"retrieval": {"recall_at_k": 0.9, "mrr": 0.8},
+                    "latency": {"search_ms": {"p95": 10.0}}, "ingestion": {"pages_per_s": 100.0}}
+        ok = {"retrieval": {"recall_at_k": 0.89, "mrr": 0.85},
+              "latency": {"search_ms": {"p95": 12.0}}, "ingestion": {"pages_per_s": 90.0}}
+        self.assertEqual(compare_to_baseline(ok, baseline), [])
+        bad = {"retrieval": {"recall_at_k": 0.8, "mrr": 0.8},
+               "latency": {"search_ms": {"p95": 20.0}}, "ingestion": {"pages_per_s": 50.0}}
+        regressions = compare_to_baseline(bad, baseline)
+        self.assertEqual(len(regressions), 3)
+        self.assertTrue(regressions[0].startswith("retrieval.recall_at_k"))
+
+
+class TestStubLLM(unittest.TestCase):
+    def _post(self, url, payload):
+        request = urllib.request.Request(f"{url}/chat/completions", data=json.dumps(payload).encode("utf-8"),
+                                         headers={"Content-Type": "application/json"})
+        return urllib.request.urlopen(request, timeout=5)
+
+    def test_completion_and_stream(self):
+        prompt = "CONTEXTE DISPONIBLE:\nPorter le casque.\n\nQUESTION: EPI ?"
+        messages = [{"role": "user", "content": prompt}]
+        with StubLLMServer() as server:
+            with self._post(server.url, {"model": "stub", "messages": messages}) as response:
+                body = json.load(response)
+            self.assertEqual(body["choices"][0]["message"]["content"], "Porter le casque.")
+
+            with self._post(server.url, {"model": "stub", "messages": messages, "stream": True}) as response:
+                events = [line[6:] for line in response.read().decode("utf-8").splitlines() if line.startswith("data: ")]
+            self.assertEqual(events[-1], "[DONE]")
+            text = "".join(json.loads(event)["choices"][0]["delta"].get("content", "") for event in events[:-1])
+            self.assertEqual(text.strip(), "Porter le casque.")
+            self.assertEqual(server.requests, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
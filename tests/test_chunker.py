@@ -0,0 +1,77 @@
+import unittest
+from types import SimpleNamespace
+
+from chunker import StructuredSplitter, heading_level, split_sentences
+
+SOURCE = "data/manuel-hse.pdf"
+
+
+def page(number, text):
+    return SimpleNamespace(page_content=text, metadata={"source": SOURCE, "page": number})
+
+
+PAGES = [
+    page(0, """MANUEL HSE DU SITE
+1 Équipements de protection
+Le port du casque est obligatoire sur l'ensemble du site. Les lunettes sont exigées
+lors du meulage, cf. art. 12 du règlement intérieur.
+1.1 Harnais
+Le harnais est vérifié avant chaque utilisation.
+1"""),
+    page(1, """MANUEL HSE DU SITE
+Les points d'ancrage sont contrôlés chaque an-
+née par un organisme agréé et
+inscrits au registre.
+2 Procédure d'urgence
+1. Donner l'alerte au poste de garde.
+2. Évacuer la zone vers le point de rassemblement.
+2"""),
+]
+
+
+class TestStructuredSplitter(unittest.TestCase):
+    def test_headings(self):
+        self.assertEqual(heading_level("1.1 Harnais"), 2)
+        self.assertEqual(heading_level("Article 12 - Accès au site"), 3)
+        self.assertEqual(heading_level("CONSIGNES GÉNÉRALES"), 1)
+        self.assertIsNone(heading_level("2024 Rapport annuel d'activité"))
+        self.assertIsNone(heading_level("Le casque est obligatoire."))
+
+    def test_sentences_respect_abbreviations(self):
+        sentences = split_sentences("Voir art. 12 du règlement. Le port du casque est obligatoire. N° 3 inclus.")
+        self.assertEqual(sentences, ["Voir art. 12 du règlement.", "Le port du casque est obligatoire.", "N° 3 inclus."])
+
+    def test_sections_pages_and_title(self):
+        chunks = StructuredSplitter(chunk_size=400, chunk_overlap=0, min_chunk_size=50).split_documents(PAGES)
+        self.assertEqual([c.metadata["section_path"] for c in chunks], [
+            "1 Équipements de protection",
+            "1 Équipements de protection > 1.1 Harnais",
+            "2 Procédure d'urgence",
+        ])
+        first, second, third = chunks
+        self.assertEqual(first.metadata["title"], "MANUEL HSE DU SITE")
+        self.assertIn("meulage, cf. art. 12 du règlement intérieur.", first.page_content)
+        # Phrase coupée en fin de page et césure recollées, en-tête répété et numéros de page retirés
+        self.assertEqual((second.metadata["page"], second.metadata["page_end"]), (0, 1))
+        self.assertIn("chaque année par un organisme agréé et inscrits au registre.", second.page_content)
+        self.assertNotIn("MANUEL HSE", second.page_content + third.page_content)
+        self.assertEqual(third.metadata["page"], 1)
+        self.assertTrue(third.page_content.startswith("2 Procédure d'urgence\n1. Donner l'alerte"))
+
+    def test_chunks_stay_within_size_with_sentence_overlap(self):
+        text = "\n".join(f"Consigne numéro {i} à respecter sur le front de taille." for i in range(40))
+        splitter = StructuredSplitter(chunk_size=300, chunk_overlap=120, min_chunk_size=50)
+        chunks = splitter.split_documents([page(0, text)])
+        self.assertTrue(all(len(chunk.page_content) <= 300 for chunk in chunks))
+        for previous, current in zip(chunks, chunks[1:]):
+            self.assertIn(current.page_content.splitlines()[0], previous.page_content.splitlines()[1:])
+
+    def test_documents_without_page_are_split_independently(self):
+        doc = SimpleNamespace(page_content="Incident: Chute de hauteur", metadata={"source": "kb.json"})
+        chunks = StructuredSplitter().split_documents([doc])
+        self.assertEqual([c.page_content for c in chunks], ["Incident: Chute de hauteur"])
+        self.assertEqual(chunks[0].metadata, {"source": "kb.json"})
+
+
+if __name__ == "__main__":
+    unittest.main()
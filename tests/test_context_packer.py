@@ -0,0 +1,65 @@
+import unittest
+from types import SimpleNamespace
+
+from context_packer import merge_texts, pack_context
+
+PDF = "data/guide.pdf"
+
+
+def doc(text, source=PDF, **metadata):
+    return SimpleNamespace(page_content=text, metadata={"source": source, **metadata})
+
+
+class TestContextPacker(unittest.TestCase):
+    def test_merge_overlapping_chunks(self):
+        a = "Porter le casque en permanence.\nVérifier le harnais avant chaque montée."
+        b = "Vérifier le harnais avant chaque montée.\nSignaler toute anomalie au chef de poste."
+        self.assertEqual(merge_texts(a, b), a + "\nSignaler toute anomalie au chef de poste.")
+        self.assertEqual(merge_texts(b, a), a + "\nSignaler toute anomalie au chef de poste.")
+        self.assertIsNone(merge_texts("casque obligatoire", "gilet obligatoire"))
+
+    def test_merges_only_within_same_source(self):
+        a = doc("Porter le casque en permanence.\nVérifier le harnais avant chaque montée.")
+        b = doc("Vérifier le harnais avant chaque montée.\nSignaler toute anomalie.")
+        c = doc("Vérifier le harnais avant chaque montée.\nAutre document.", source="data/autre.pdf")
+        packed = pack_context([a, c, b])
+        self.assertEqual(packed.stats["merged"], 1)
+        self.assertEqual(len(packed.passages), 2)
+        self.assertIn("Signaler toute anomalie.", packed.passages[0].text)
+        self.assertEqual(packed.passages[1].metadata["source"], "data/autre.pdf")
+
+    def test_boilerplate_and_near_duplicates(self):
+        header = "STEULER HSE Management - Manuel"
+        body = "les travailleurs doivent porter des lunettes de protection lors du meulage des pièces métalliques"
+        packed = pack_context([
+            doc(f"{header}\nIntroduction au système de management.", page=1),
+            doc(f"{header}\nLa politique sécurité est revue chaque année.", page=2),
+            doc(body, page=3),
+            doc(body + " en atelier", page=4),
+        ])
+        self.assertEqual(packed.stats["boilerplate_lines"], 1)
+        self.assertEqual(packed.stats["duplicates"], 1)
+        self.assertEqual(packed.text.count(header), 1)
+
+    def test_json_field_headers_are_kept(self):
+        source = "data/mining_safety_database.json"
+        packed = pack_context([
+            doc("Incident: Éboulement\nConsignes en cas d'incident:\n- Évacuer la galerie", source=source, type="json"),
+            doc("Incident: Coup de grisou\nConsignes en cas d'incident:\n- Couper l'alimentation électrique",
+                source=source, type="json"),
+        ])
+        self.assertEqual(packed.stats["boilerplate_lines"], 0)
+        self.assertEqual(packed.text.count("Consignes en cas d'incident:"), 2)
+
+    def test_respects_token_budget(self):
+        long_text = " ".join(f"Phrase numéro {i} sur la sécurité." for i in range(200))
+        packed = pack_context([doc("Consigne courte et importante.", page=1), doc(long_text, page=2)],
+                              token_budget=200)
+        self.assertLessEqual(packed.stats["output_tokens"], 200)
+        self.assertEqual(packed.stats["truncated"], 1)
+        self.assertTrue(packed.passages[1].text.endswith("[…]"))
+        self.assertGreater(packed.stats["saved_tokens"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+
+from conversation import Conversation
+from monitoring import estimate_tokens
+
+
+class TestConversation(unittest.TestCase):
+    def setUp(self):
+        self.conversation = Conversation(recent_turns=2, summary_tokens=60)
+
+    def _turn(self, question, answer="Réponse.", docs=("doc",)):
+        turn = self.conversation.prepare(question)
+        self.conversation.record(turn, answer, list(docs))
+        return turn
+
+    def test_first_question_is_standalone(self):
+        turn = self.conversation.prepare("Quels EPI porter sur le front de taille ?")
+        self.assertFalse(turn.follow_up)
+        self.assertEqual(turn.query, "Quels EPI porter sur le front de taille ?")
+        self.assertEqual(self.conversation.history_text(), "")
+
+    def test_follow_up_is_condensed_with_anchor(self):
+        self._turn("Quels EPI porter sur le front de taille ?")
+        turn = self._turn("Et pour les explosifs ?")
+        self.assertTrue(turn.follow_up)
+        self.assertEqual(turn.query, "Quels EPI porter sur le front de taille ? Et pour les explosifs ?")
+        self.assertIsNone(turn.reuse_docs)  # nouveau terme: nouvelle recherche
+        # Une seconde relance se rattache toujours à la question de fond
+        turn = self.conversation.prepare("et le bruit ?")
+        self.assertEqual(turn.query, "Quels EPI porter sur le front de taille ? et le bruit ?")
+        self.assertFalse(self.conversation.prepare("Comment déclarer un accident du travail au chef de poste ?").follow_up)
+
+    def test_short_new_question_is_standalone(self):
+        self._turn("Quels EPI porter sur le front de taille ?")
+        self.assertFalse(self.conversation.prepare("Qu'est-ce que le grisou ?").follow_up)
+        self.assertTrue(self.conversation.prepare("Le front de taille ?").follow_up)
+        self.assertTrue(self.conversation.prepare("Plus de détails ?").follow_up)
+
+    def test_clarification_reuses_previous_documents(self):
+        self._turn("Procédure en cas d'incendie sur un convoyeur", docs=["d1", "d2"])
+        turn = self.conversation.prepare("Peux-tu détailler ?")
+        self.assertTrue(turn.follow_up)
+        self.assertEqual(turn.reuse_docs, ["d1", "d2"])
+
+    def test_history_is_bounded(self):
+        for i in range(10):
+            self._turn(f"Question de fond numéro {i} sur la ventilation des galeries",
+                       answer=f"Première phrase {i}. " + "Détail très long. " * 100)
+        self.assertEqual(len(self.conversation.recent), 2)
+        self.assertLessEqual(sum(estimate_tokens(line) for line in self.conversation.summary), 60)
+        self.assertIn("Première phrase 7.", self.conversation.history_text())
+        self.assertLess(estimate_tokens(self.conversation.history_text()), 60 + 2 * (150 + 60) + 20)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from diagnostics import (MemoryTracker, SamplingProfiler, SessionTracker, component_of, model_bytes,
+                         process_memory)
+
+
+def busy_loop(stop):
+    while not stop.is_set():
+        sum(i * i for i in range(1000))
+
+
+class FakeTensor:
+    def __init__(self, n, size):
+        self.n, self.size = n, size
+
+    def numel(self):
+        return self.n
+
+    def element_size(self):
+        return self.size
+
+
+class TestMemory(unittest.TestCase):
+    def test_component_attribution(self):
+        self.assertEqual(component_of("/venv/lib/site-packages/chromadb/api/client.py"), "chroma")
+        self.assertEqual(component_of("/venv/lib/site-packages/sentence_transformers/models.py"),
+                         "sentence-transformers")
+        self.assertEqual(component_of(os.path.abspath("rag_bot.py")), "application")
+        self.assertEqual(component_of("/usr/lib/python3.11/json/decoder.py"), "autres")
+
+    def test_snapshot_reports_growth(self):
+        tracker = MemoryTracker()
+        self.assertEqual(tracker.snapshot(), {"tracing": False})
+        tracker.start()
+        try:
+            tracker.snapshot()
+            retained = [bytearray(1024) for _ in range(2000)]
+            report = tracker.snapshot()
+        finally:
+            tracker.stop()
+        self.assertTrue(report["tracing"])
+        self.assertGreater(report["growth_mb"]["application"], 1.5)
+        self.assertEqual(len(retained), 2000)
+
+    def test_growth_baselines_are_independent(self):
+        tracker = MemoryTracker()
+        tracker.start()
+        try:
+            tracker.snapshot(baseline="a")
+            retained = [bytearray(1024) for _ in range(2000)]
+            self.assertNotIn("growth_mb", tracker.snapshot(baseline="b"))
+            report = tracker.snapshot(baseline="a")
+        finally:
+            tracker.stop()
+        self.assertGreater(report["growth_mb"]["application"], 1.5)
+        self.assertEqual(len(retained), 2000)
+
+    def test_model_size(self):
+        model = SimpleNamespace(client=SimpleNamespace(parameters=lambda: [FakeTensor(1000, 4), FakeTensor(10, 4)]))
+        self.assertEqual(model_bytes(model), 4040)
+        with tempfile.NamedTemporaryFile(suffix=".onnx") as f:
+            f.write(b"x" * 123)
+            f.flush()
+            self.assertEqual(model_bytes(SimpleNamespace(model_path=f.name)), 123)
+        self.assertIsNone(model_bytes(object()))
+
+    def test_process_memory(self):
+        memory = process_memory()
+        self.assertGreater(memory["peak_rss_mb"], 0)
+        self.assertGreaterEqual(memory["threads"], 1)
+
+
+class TestSessionTracker(unittest.TestCase):
+    def test_trim_keeps_greeting_and_latest(self):
+        tracker = SessionTracker(max_messages=5)
+        messages = [{"role": "assistant", "content": "Bonjour"}]
+        messages += [{"role": "user" if i % 2 == 0 else "assistant", "content": str(i)} for i in range(10)]
+        self.assertEqual(tracker.trim(messages), 6)
+        self.assertEqual([m["content"] for m in messages], ["Bonjour", "6", "7", "8", "9"])
+        self.assertEqual(tracker.trim(messages), 0)
+
+    def test_idle_sessions_expire(self):
+        now = [0.0]
+        tracker = SessionTracker(idle_seconds=60, clock=lambda: now[0])
+        tracker.touch("a", [{"content": "x" * 2048}])
+        tracker.touch("b", [{"content": "y"}, {"content": "z"}])
+        stats = tracker.stats()
+        self.assertEqual((stats["active_sessions"], stats["messages"], stats["largest_session_messages"]), (2, 3, 2))
+        now[0] = 100.0
+        tracker.touch("b", [])
+        self.assertEqual(tracker.stats()["active_sessions"], 1)
+
+
+class TestSamplingProfiler(unittest.TestCase):
+    def test_samples_target_thread_and_dumps(self):
+        stop = threading.Event()
+        worker = threading.Thread(target=busy_loop, args=(stop,))
+        worker.start()
+        profiler = SamplingProfiler(worker.ident, interval=0.001).start()
+        time.sleep(0.2)
+        profiler.stop()
+        stop.set()
+        worker.join()
+
+        self.assertGreater(profiler.samples, 10)
+        self.assertTrue(all("busy_loop" in stack for stack in profiler.stacks))
+        self.assertIn("<genexpr>", profiler.hotspots(1)[0][0])
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = [profiler.dump(tmp, max_files=2) for _ in range(3)]
+            self.assertEqual(sorted(os.listdir(tmp)), sorted(os.path.basename(p) for p in paths[1:]))
+            with open(paths[-1], encoding="utf-8") as f:
+                stack, count = f.readline().rsplit(" ", 1)
+            self.assertIn("busy_loop (test_diagnostics.py:", stack)
+            self.assertGreater(int(count), 0)
+
+    def test_requested_query_is_profiled(self):
+        from rag_bot import RAGSystem
+
+        def events():
+            time.sleep(0.05)
+            yield ("token", "ok")
+            yield ("done", {"answer": "ok", "latency_ms": 50.0})
+
+        rag = RAGSystem()
+        with tempfile.TemporaryDirectory() as tmp, mock.patch("rag_bot.Config.PROFILE_DIR", tmp):
+            self.assertEqual(list(rag._profiled(events())), [("token", "ok"), ("done", {"answer": "ok", "latency_ms": 50.0})])
+            self.assertIsNone(rag.last_profile)
+            rag.profile_next_queries()
+            list(rag._profiled(events()))
+            self.assertEqual(rag.profile_requests, 0)
+            self.assertTrue(os.path.exists(rag.last_profile["path"]))
+            self.assertGreater(rag.last_profile["samples"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
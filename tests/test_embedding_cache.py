@@ -0,0 +1,92 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from embedding_cache import CachedEmbeddings, EmbeddingStore
+
+
+class CountingEmbeddings:
+    def __init__(self):
+        self.calls = 0
+
+    def embed_documents(self, texts):
+        self.calls += len(texts)
+        return [[float(len(text)), 1.0, 0.5] for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+class TestCachedEmbeddings(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_repeated_texts_skip_model(self):
+        model = CountingEmbeddings()
+        cache = CachedEmbeddings(model, "mini", self.tmp.name)
+        first = cache.embed_documents(["casque", "gilet", "casque"])
+        self.assertEqual(model.calls, 2)
+        self.assertEqual(first[0], first[2])
+
+        cache.embed_documents(["gilet  ", "casque"])
+        self.assertEqual(model.calls, 2)
+        self.assertEqual(cache.stats()["misses"], 2)
+
+    def test_vectors_persist_across_instances(self):
+        model = CountingEmbeddings()
+        CachedEmbeddings(model, "mini", self.tmp.name).embed_documents(["harnais", "extincteur"])
+
+        reopened = CachedEmbeddings(model, "mini", self.tmp.name, max_memory_items=1)
+        vectors = reopened.embed_documents(["extincteur", "harnais"])
+        self.assertEqual(model.calls, 2)
+        self.assertEqual(vectors[0], [10.0, 1.0, 0.5])
+        self.assertEqual(reopened.stats()["disk_items"], 2)
+
+    def test_model_name_and_kind_are_part_of_key(self):
+        model = CountingEmbeddings()
+        CachedEmbeddings(model, "mini", self.tmp.name).embed_documents(["casque"])
+        CachedEmbeddings(model, "other", self.tmp.name).embed_documents(["casque"])
+        self.assertEqual(model.calls, 2)
+
+        cache = CachedEmbeddings(model, "mini", self.tmp.name)
+        cache.embed_query("casque")
+        cache.embed_query("casque")
+        self.assertEqual(model.calls, 3)
+
+
+class TestEmbeddingStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_interrupted_write_is_repaired(self):
+        store = EmbeddingStore(self.tmp.name)
+        store.put_many(["a", "b"], np.eye(3)[:2])
+        # Écriture interrompue entre les vecteurs et les clés: un vecteur orphelin et une clé incomplète
+        with open(store.vectors_path, "ab") as f:
+            f.write(np.full((1, 3), 9.0, dtype=np.float32).tobytes() + b"\0\0")
+        with open(store.keys_path, "a", encoding="ascii") as f:
+            f.write("c")
+
+        reopened = EmbeddingStore(self.tmp.name)
+        self.assertEqual(len(reopened), 2)
+        self.assertEqual(os.path.getsize(reopened.vectors_path), 2 * 3 * 4)
+        reopened.put_many(["d", "e"], np.eye(3)[1:] * 2)
+        np.testing.assert_array_equal(reopened.get("a"), [1, 0, 0])
+        np.testing.assert_array_equal(reopened.get("d"), [0, 2, 0])
+        np.testing.assert_array_equal(reopened.get("e"), [0, 0, 2])
+
+        again = EmbeddingStore(self.tmp.name)
+        np.testing.assert_array_equal(again.get("e"), [0, 0, 2])
+        self.assertNotIn("c", again)
+
+
+if __name__ == "__main__":
+    unittest.main()
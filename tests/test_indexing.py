@@ -0,0 +1,170 @@
+import os
+import tempfile
+import time
+import unittest
+from types import SimpleNamespace
+
+from pypdf import PdfWriter
+
+from indexing import IndexManifest, PageExtractor, chunk_id, sync_vectorstore
+
+
+class FakeVectorStore:
+    def __init__(self):
+        self.docs = {}
+        self.added = 0
+        self.duplicates = 0
+        self.batches = []
+
+    def add_documents(self, docs, ids):
+        self.duplicates += sum(cid in self.docs for cid in ids)
+        self.added += len(docs)
+        self.batches.append(len(docs))
+        self.docs.update(zip(ids, docs))
+
+    def delete(self, ids):
+        for cid in ids:
+            self.docs.pop(cid, None)
+
+
+class LineSplitter:
+    def split_documents(self, docs):
+        return [SimpleNamespace(page_content=line, metadata=dict(doc.metadata))
+                for doc in docs for line in doc.page_content.splitlines() if line]
+
+
+def load_file(path):
+    with open(path, encoding="utf-8") as f:
+        return [SimpleNamespace(page_content=f.read(), metadata={"source": path})]
+
+
+class TestIncrementalIndexing(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_dir = os.path.join(self.tmp.name, "db")
+        self.a = self._write("a.txt", "casque\ngilet\n")
+        self.b = self._write("b.txt", "explosifs\n")
+        self.vectordb = FakeVectorStore()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _write(self, name, content):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+        return path
+
+    def _sync(self, sources, **kwargs):
+        manifest = IndexManifest.load(self.db_dir, {"chunk_size": 1000})
+        return sync_vectorstore(self.vectordb, manifest, sources, load_file, LineSplitter(), **kwargs)
+
+    def test_initial_build_then_noop(self):
+        stats = self._sync([self.a, self.b])
+        self.assertEqual(stats["added_chunks"], 3)
+        self.assertEqual(len(self.vectordb.docs), 3)
+
+        stats = self._sync([self.a, self.b])
+        self.assertEqual(stats["added_chunks"], 0)
+        self.assertEqual(stats["unchanged_files"], 2)
+        self.assertLess(stats["seconds"], 0.5)
+
+    def test_changed_file_only_embeds_new_chunks(self):
+        self._sync([self.a, self.b])
+        time.sleep(0.01)
+        self._write("a.txt", "casque\nharnais\n")
+        os.utime(self.a, (time.time() + 5, time.time() + 5))
+
+        stats = self._sync([self.a, self.b])
+        self.assertEqual(stats["changed_files"], 1)
+        self.assertEqual(stats["added_chunks"], 1)
+        self.assertEqual(stats["removed_chunks"], 1)
+        self.assertIn(chunk_id(self.a, "harnais"), self.vectordb.docs)
+        self.assertNotIn(chunk_id(self.a, "gilet"), self.vectordb.docs)
+
+    def test_removed_file_is_deleted(self):
+        self._sync([self.a, self.b])
+        stats = self._sync([self.a])
+        self.assertEqual(stats["removed_files"], 1)
+        self.assertNotIn(chunk_id(self.b, "explosifs"), self.vectordb.docs)
+
+    def test_chunks_are_written_in_bounded_batches(self):
+        self._write("a.txt", "".join(f"ligne {i}\n" for i in range(10)))
+        stats = self._sync([self.a, self.b], batch_size=4)
+        self.assertEqual(self.vectordb.batches, [4, 4, 2, 1])
+        self.assertEqual(stats["pages"], 2)
+
+    def test_interrupted_file_is_not_duplicated(self):
+        self._write("a.txt", "".join(f"ligne {i}\n" for i in range(6)))
+
+        class Interrupted(LineSplitter):
+            def split_documents(self, docs):
+                chunks = super().split_documents(docs)
+                return chunks[:3] + [None]  # arrêt du processus après trois chunks
+
+        manifest = IndexManifest.load(self.db_dir, {"chunk_size": 1000})
+        with self.assertRaises(AttributeError):
+            sync_vectorstore(self.vectordb, manifest, [self.a], load_file, Interrupted(), batch_size=2)
+        self.assertEqual(len(self.vectordb.docs), 2)
+
+        stats = self._sync([self.a], batch_size=2)
+        self.assertEqual(stats["added_chunks"], 6)
+        self.assertEqual(len(self.vectordb.docs), 6)
+        self.assertEqual(self.vectordb.duplicates, 0)
+
+    def test_settings_change_forces_rebuild(self):
+        self._sync([self.a])
+        manifest = IndexManifest.load(self.db_dir, {"chunk_size": 500})
+        self.assertFalse(manifest.exists)
+        self.assertEqual(manifest.files, {})
+
+
+class TestPageExtractor(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.sources = []
+        for name, n_pages in [("a.pdf", 5), ("b.pdf", 2), ("c.pdf", 3)]:
+            writer = PdfWriter()
+            for _ in range(n_pages):
+                writer.add_blank_page(width=200, height=200)
+            path = os.path.join(self.tmp.name, name)
+            with open(path, "wb") as f:
+                writer.write(f)
+            self.sources.append(path)
+        self.sources.append(os.path.join(self.tmp.name, "notes.txt"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_parallel_extraction_is_ordered_and_prefetches_one_file(self):
+        notes = [SimpleNamespace(page_content="notes", metadata={"source": self.sources[-1]})]
+        with PageExtractor(lambda path: notes, workers=2, pages_per_task=2) as extractor:
+            submitted, submit = [], extractor._submit
+            extractor._submit = lambda source: submitted.append(source) or submit(source)
+            files = extractor.iter_files(self.sources)
+
+            source, pages = next(files)
+            self.assertEqual(submitted, self.sources[:2])
+            self.assertEqual([(doc.metadata["source"], doc.metadata["page"]) for doc in pages],
+                             [(source, i) for i in range(5)])
+            self.assertEqual([(source, len(list(pages))) for source, pages in files],
+                             [(self.sources[1], 2), (self.sources[2], 3), (self.sources[3], 1)])
+            self.assertEqual(submitted, self.sources)
+
+    def test_in_flight_ranges_are_capped(self):
+        with PageExtractor(None, workers=2, pages_per_task=1) as extractor:
+            files = extractor.iter_files(self.sources[:2])
+            source, pages = next(files)
+            self.assertEqual(extractor._in_flight, 4)
+            self.assertEqual([len(tasks.futures) for tasks in extractor._files], [4, 0])
+
+            in_flight = []
+            for _ in pages:
+                in_flight.append(extractor._in_flight)
+            self.assertLessEqual(max(in_flight), 4)
+            self.assertEqual([(source, len(list(pages))) for source, pages in files], [(self.sources[1], 2)])
+            self.assertEqual(extractor._in_flight, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
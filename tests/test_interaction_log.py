@@ -0,0 +1,92 @@
+import gzip
+import json
+import os
+import tempfile
+import threading
+import unittest
+from datetime import datetime
+
+from interaction_log import InteractionLog, aggregate, normalize_question, read_interactions, segments
+
+
+def interaction(question, day=17, hour=9, cached=None, total_ms=100.0):
+    record = {"timestamp": datetime(2026, 10, day, hour).isoformat(), "question": question, "answer": "...",
+              "sources": [], "timings": {"total_ms": total_ms}}
+    if cached:
+        record["cached"] = cached
+    return record
+
+
+class TestInteractionLog(unittest.TestCase):
+    def test_batched_writes_rotate_to_gzip_segments(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            log = InteractionLog(tmp, segment_bytes=2000, flush_interval=0.05)
+            for i in range(50):
+                self.assertTrue(log.log(interaction(f"question {i}", hour=i % 24)))
+            log.flush()
+            log.close()
+            stats = log.stats()
+            self.assertEqual((stats["written"], stats["dropped"]), (50, 0))
+            self.assertGreater(stats["segments"], 0)
+            compressed = [p for p in segments(tmp) if p.endswith(".gz")]
+            self.assertEqual(len(compressed), stats["segments"])
+            with gzip.open(compressed[0], "rt", encoding="utf-8") as f:
+                self.assertEqual(json.loads(f.readline())["question"], "question 0")
+            self.assertEqual([r["question"] for r in read_interactions(tmp)], [f"question {i}" for i in range(50)])
+
+            # Au redémarrage, le segment courant laissé par l'arrêt est compressé
+            reopened = InteractionLog(tmp)
+            reopened.close()
+            self.assertFalse(os.path.exists(os.path.join(tmp, "current.jsonl")))
+            self.assertEqual(len(list(read_interactions(tmp))), 50)
+
+    def test_overload_drops_instead_of_blocking(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            log = InteractionLog(tmp, max_queue=1, flush_interval=0.05)
+            release, writing = threading.Event(), threading.Event()
+            write = log._write
+
+            def slow_write(batch):
+                writing.set()
+                release.wait(5)
+                write(batch)
+            log._write = slow_write
+            self.assertTrue(log.log(interaction("en cours d'écriture")))
+            writing.wait(5)
+            self.assertTrue(log.log(interaction("en file")))
+            self.assertFalse(log.log(interaction("en trop")))
+            release.set()
+            log.flush()
+            log.close()
+            self.assertEqual((log.stats()["written"], log.stats()["dropped"]), (2, 1))
+
+    def test_read_filters_by_period(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            log = InteractionLog(tmp, segment_bytes=1, flush_interval=0.05)
+            for day in (15, 16, 17):
+                log.log(interaction(f"jour {day}", day=day))
+                log.flush()
+            log.close()
+            since, until = datetime(2026, 10, 16), datetime(2026, 10, 17)
+            self.assertEqual(len(segments(tmp)), 3)
+            # Le segment du 17 commence après la période: il n'est pas ouvert
+            self.assertEqual(len(segments(tmp, since, until)), 2)
+            self.assertEqual([r["question"] for r in read_interactions(tmp, since, until)], ["jour 16"])
+
+
+class TestAggregate(unittest.TestCase):
+    def test_top_questions_and_cache_candidates(self):
+        records = ([interaction("Quels EPI en galerie ?")] * 3 + [interaction("quels epi en galerie")]
+                   + [interaction("Consignes incendie ?", cached="exact", total_ms=5.0)] * 4
+                   + [interaction("Risque de chute ?", day=16)])
+        summary = aggregate(records, top_n=5, min_cache_count=3)
+        self.assertEqual(summary["interactions"], 9)
+        self.assertEqual(summary["per_day"], {"2026-10-16": 1, "2026-10-17": 8})
+        self.assertEqual(summary["top_questions"][0]["count"], 4)
+        self.assertEqual(summary["top_questions"][0]["question"], "Quels EPI en galerie ?")
+        self.assertEqual([c["question"] for c in summary["cache_candidates"]], ["Quels EPI en galerie ?"])
+        self.assertEqual(normalize_question("Équipements : quels EPI ?"), "equipements quels epi")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+
+from knowledge_base import Incident, MiningSafetyKnowledge
+
+DATA = {
+    "incidents": ["Chute de hauteur", "Accident de tir de mine (dynamitage)"],
+    "zones": ["Front de taille", "Aire de stockage explosifs", "Station de concassage primaire"],
+    "consignes_generales": ["Respecter les horaires de tir et les zones d'évacuation"],
+    "reponses_incidents": {
+        "Accident de tir de mine (dynamitage)": {
+            "description": "Incident lors des opérations de dynamitage",
+            "signes_visibles": ["Projection de débris"],
+            "consignes": ["Évacuer la zone de tir"],
+        },
+    },
+    "contacts_urgence": {"Infirmerie": "2015", "Pompiers internes": "2018"},
+}
+
+
+class TestMiningSafetyKnowledge(unittest.TestCase):
+    def setUp(self):
+        self.kb = MiningSafetyKnowledge.from_dict(DATA, source="data/mining_safety_database.json")
+
+    def test_tables_are_typed(self):
+        incident = self.kb.tables["incidents"][1]
+        self.assertIsInstance(incident, Incident)
+        self.assertEqual(incident.consignes, ("Évacuer la zone de tir",))
+        self.assertEqual(len(self.kb.tables["zones"]), 3)
+
+    def test_list_zones(self):
+        result = self.kb.answer("Liste les zones")
+        self.assertEqual(result["structured"], "zones")
+        self.assertIn("Station de concassage primaire", result["answer"])
+        self.assertEqual(result["sources"], ["data/mining_safety_database.json"])
+
+    def test_filtered_listing_uses_prefixes_and_synonyms(self):
+        answer = self.kb.answer("Quels incidents impliquent des explosifs ?")["answer"]
+        self.assertIn("dynamitage", answer)
+        self.assertNotIn("Chute de hauteur", answer)
+
+    def test_contact_lookup(self):
+        answer = self.kb.answer("Quel est le numéro de l'infirmerie ?")["answer"]
+        self.assertIn("2015", answer)
+        self.assertNotIn("2018", answer)
+
+    def test_open_questions_go_to_rag(self):
+        self.assertIsNone(self.kb.answer("Quels sont les équipements de protection obligatoires ?"))
+        self.assertIsNone(self.kb.answer("Que faire en cas d'accident dans la mine ?"))
+
+    def test_instructions_for_another_category_go_to_rag(self):
+        self.assertIsNone(self.kb.answer("Quelles sont les consignes pour l'incident électrocution ?"))
+        self.assertIsNone(self.kb.answer("Quelles sont les procédures dans les zones de tir ?"))
+        self.assertEqual(self.kb.answer("Liste les consignes")["structured"], "consignes")
+
+    def test_topic_questions_go_to_rag(self):
+        self.assertIsNone(self.kb.answer("Quelles sont les règles pour les explosifs ?"))
+        self.assertIsNone(self.kb.answer("Peut-on appeler le 15 ?"))
+        self.assertIsNone(self.kb.answer("Quelles zones sont concernées par la poussière ?"))
+        self.assertIsNone(self.kb.answer("Quels incidents ont des projections de débris ?"))
+        self.assertEqual(self.kb.answer("Quels sont les numéros d'urgence ?")["structured"], "contacts")
+
+    def test_every_item_is_a_chunk(self):
+        chunks = self.kb.to_documents()
+        self.assertEqual(len(chunks), 2 + 3 + 1 + 2)
+        text, metadata = chunks[1]
+        self.assertIn("Évacuer la zone de tir", text)
+        self.assertEqual(metadata["category"], "incidents")
+
+
+if __name__ == "__main__":
+    unittest.main()
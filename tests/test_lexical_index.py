@@ -0,0 +1,60 @@
+import os
+import tempfile
+import time
+import unittest
+
+from lexical_index import BM25Index, reciprocal_rank_fusion, tokenize
+
+
+class TestBM25Index(unittest.TestCase):
+    def setUp(self):
+        self.index = BM25Index()
+        self.index.add("c1", "Station de concassage primaire: arrêt d'urgence obligatoire", {"source": "json"})
+        self.index.add("c2", "Port du casque et des chaussures de sécurité", {"source": "pdf", "page": 3})
+        self.index.add("c3", "Aire de stockage des explosifs, accès réglementé", {"source": "json"})
+
+    def test_tokenize_strips_accents_and_stopwords(self):
+        self.assertEqual(tokenize("Sécurité des Explosifs"), ["securite", "explosif"])
+
+    def test_exact_terms_rank_first(self):
+        hits = self.index.search("station de concassage primaire", k=2)
+        self.assertEqual(hits[0][0], "c1")
+        self.assertEqual(self.index.search("explosif")[0][0], "c3")
+        self.assertEqual(self.index.search("inconnu"), [])
+
+    def test_metadata_filter(self):
+        hits = self.index.search("concassage casque", where=lambda metadata: metadata["source"] == "pdf")
+        self.assertEqual([doc_id for doc_id, _ in hits], ["c2"])
+
+    def test_remove_and_persist(self):
+        self.index.remove("c3")
+        self.assertEqual(self.index.search("explosifs"), [])
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bm25_index.json")
+            self.index.save(path)
+            loaded = BM25Index.load(path)
+        self.assertEqual(len(loaded), 2)
+        self.assertEqual(loaded.get("c2")[1], {"source": "pdf", "page": 3})
+        self.assertEqual(loaded.search("casque")[0][0], "c2")
+
+    def test_lookup_is_sub_millisecond(self):
+        for i in range(2000):
+            self.index.add(f"x{i}", f"procédure numéro {i} pour la zone {i % 50} et le convoyeur")
+        start = time.perf_counter()
+        for _ in range(100):
+            self.index.search("concassage primaire", k=10)
+        self.assertLess((time.perf_counter() - start) / 100, 0.001)
+
+
+class TestReciprocalRankFusion(unittest.TestCase):
+    def test_documents_in_both_lists_win(self):
+        fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "d"]])
+        self.assertEqual(fused[0][0], "c")
+
+    def test_weights(self):
+        fused = reciprocal_rank_fusion([["a"], ["b"]], weights=[1.0, 2.0])
+        self.assertEqual([doc_id for doc_id, _ in fused], ["b", "a"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,152 @@
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from llm_client import (CircuitBreaker, CircuitOpenError, LLMInterruptedError, LLMUnavailableError, ResilientLLMClient,
+                        extractive_answer)
+from stub_llm import StubLLMServer
+
+PROMPT = "CONTEXTE DISPONIBLE:\nPorter le casque.\n\nQUESTION: EPI ?"
+
+
+def client(server, **options):
+    options = dict({"backoff_base": 0.01, "backoff_max": 0.05, "hedge": False}, **options)
+    return ResilientLLMClient(server.url, "test", "stub", **options)
+
+
+class TestResilientLLMClient(unittest.TestCase):
+    def test_stream_completion(self):
+        with StubLLMServer() as server:
+            llm = client(server)
+            self.assertEqual(llm.complete(PROMPT).strip(), "Porter le casque.")
+            self.assertEqual(llm.complete(PROMPT).strip(), "Porter le casque.")
+            self.assertEqual(llm.stats()["attempts"], 2)
+            self.assertEqual(llm.stats()["breaker"], "closed")
+
+    def test_retries_on_429_and_5xx(self):
+        script = [{"status": 429, "retry_after": 0}, {"status": 503}]
+        with StubLLMServer(script=script) as server:
+            llm = client(server)
+            self.assertEqual(llm.complete(PROMPT).strip(), "Porter le casque.")
+            self.assertEqual(server.requests, 3)
+            self.assertEqual(llm.stats()["retries"], 2)
+
+    def test_gives_up_after_retries_and_on_client_errors(self):
+        with StubLLMServer(script=[{"status": 500}] * 3) as server:
+            with self.assertRaises(LLMUnavailableError):
+                client(server, max_retries=2).complete(PROMPT)
+            self.assertEqual(server.requests, 3)
+        with StubLLMServer(script=[{"status": 401}]) as server:
+            with self.assertRaises(LLMUnavailableError):
+                client(server).complete(PROMPT)
+            self.assertEqual(server.requests, 1)
+
+    def test_hedged_request_wins_over_slow_one(self):
+        with StubLLMServer(script=[{"latency_ms": 2000}]) as server:
+            llm = client(server, hedge=True, hedge_after_ms=100)
+            start = time.monotonic()
+            self.assertEqual(llm.complete(PROMPT).strip(), "Porter le casque.")
+            self.assertLess(time.monotonic() - start, 1.5)
+            self.assertEqual(llm.stats()["hedges"], 1)
+            self.assertEqual(llm.stats()["hedge_wins"], 1)
+
+    def test_hedge_delay_follows_p95(self):
+        with StubLLMServer() as server:
+            llm = client(server, hedge_after_ms=2000, hedge_min_samples=20)
+            self.assertEqual(llm.hedge_delay(), 2.0)
+            llm._ttft.extend([0.1] * 19 + [0.5])
+            self.assertEqual(llm.hedge_delay(), 0.5)
+
+    def test_circuit_opens_and_recovers(self):
+        with StubLLMServer(script=[{"status": 503}] * 2) as server:
+            breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.2)
+            llm = client(server, max_retries=0, breaker=breaker)
+            for _ in range(2):
+                with self.assertRaises(LLMUnavailableError):
+                    llm.complete(PROMPT)
+            self.assertEqual(breaker.state, "open")
+            with self.assertRaises(CircuitOpenError):
+                llm.complete(PROMPT)
+            self.assertEqual(server.requests, 2)
+            time.sleep(0.25)
+            self.assertEqual(breaker.state, "half-open")
+            self.assertEqual(llm.complete(PROMPT).strip(), "Porter le casque.")
+            self.assertEqual(breaker.state, "closed")
+
+    def test_interrupted_stream_raises_after_first_tokens(self):
+        with StubLLMServer(script=[{"interrupt_after": 2}]) as server:
+            llm = client(server)
+            tokens = []
+            with self.assertRaises(LLMInterruptedError):
+                for token in llm.stream(PROMPT):
+                    tokens.append(token)
+            self.assertEqual(tokens, ["Porter ", "le "])
+            self.assertEqual(server.requests, 1)
+
+    def test_deadline(self):
+        with StubLLMServer(latency_ms=1000) as server:
+            with self.assertRaises(LLMUnavailableError):
+                client(server, deadline=0.2).complete(PROMPT)
+
+
+class TestExtractiveAnswer(unittest.TestCase):
+    def test_selects_sentences_sharing_question_terms(self):
+        passages = [
+            SimpleNamespace(page_content="Le site est ouvert la nuit. Le port du casque est obligatoire en galerie.",
+                            metadata={"source": "data/guide.pdf"}),
+            SimpleNamespace(page_content="Les visiteurs signent le registre.", metadata={"source": "data/regles.pdf"}),
+        ]
+        answer = extractive_answer("Le casque est-il obligatoire ?", passages, max_sentences=1)
+        self.assertIn("Le port du casque est obligatoire en galerie.", answer)
+        self.assertIn("data/guide.pdf", answer)
+        self.assertNotIn("registre", answer)
+        self.assertIn("indisponible", extractive_answer("casque", []))
+
+
+class TestInterruptedAnswer(unittest.TestCase):
+    def setUp(self):
+        from rag_bot import RAGSystem
+        doc = SimpleNamespace(page_content="Porter le casque.", metadata={"source": "data/guide.pdf"})
+        self.rag = RAGSystem()
+        self.rag.embeddings = SimpleNamespace(embed_query=lambda text: [1.0, 0.0])
+        self.rag.retriever = SimpleNamespace(search_kwargs={"k": 1}, vectorstore=SimpleNamespace(
+            similarity_search_by_vector=lambda vector, k: [doc]))
+        self.rag.prompt = SimpleNamespace(
+            format=lambda context, question: f"CONTEXTE DISPONIBLE:\n{context}\n\nQUESTION: {question}")
+        patch = mock.patch("rag_bot.metrics.export_path", None)  # pas de fichier de métriques
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def test_truncated_answer_is_flagged_and_not_cached(self):
+        with StubLLMServer(script=[{"interrupt_after": 1}]) as server:
+            self.rag.llm_client = client(server)
+            result = self.rag.query("Faut-il un casque ?")
+            self.assertTrue(result["interrupted"])
+            self.assertTrue(result["answer"].startswith("Porter "))
+            self.assertIn("interrompue", result["answer"])
+            self.assertEqual(self.rag.answer_cache.stats()["entries"], 0)
+
+            result = self.rag.query("Faut-il un casque ?")
+            self.assertNotIn("interrupted", result)
+            self.assertEqual(result["answer"].strip(), "Porter le casque.")
+            self.assertEqual(server.requests, 2)
+            self.assertEqual(self.rag.query("Faut-il un casque ?")["answer"], result["answer"])
+            self.assertEqual(server.requests, 2)
+
+    def test_conversation_answers_bypass_cache(self):
+        from conversation import Conversation
+        conversation = Conversation()
+        with StubLLMServer() as server:
+            self.rag.llm_client = client(server)
+            self.rag.query("Faut-il un casque ?", conversation=conversation)
+            self.assertEqual(self.rag.answer_cache.stats()["entries"], 1)
+
+            # Historique non vide: la réponse dépend du fil, le cache est ignoré
+            self.rag.query("Faut-il un casque ?", conversation=conversation)
+            self.assertEqual(server.requests, 2)
+            self.assertEqual(self.rag.answer_cache.stats()["entries"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import os
+import tempfile
+import unittest
+
+from monitoring import LatencyTracker, Trace, estimate_tokens
+
+
+class TestTrace(unittest.TestCase):
+    def test_spans_accumulate_and_total(self):
+        trace = Trace()
+        trace.add("embed", 2.0)
+        trace.add("embed", 3.0)
+        with trace.span("retrieve"):
+            pass
+        trace.count("prompt_tokens", estimate_tokens("x" * 40))
+        timings = trace.finish().as_dict()
+        self.assertEqual(timings["embed_ms"], 5.0)
+        self.assertIn("retrieve_ms", timings)
+        self.assertGreaterEqual(timings["total_ms"], timings["retrieve_ms"])
+        self.assertEqual(timings["prompt_tokens"], 10)
+
+
+class TestLatencyTracker(unittest.TestCase):
+    def test_percentiles_over_window(self):
+        tracker = LatencyTracker(window=100)
+        for ms in range(1, 201):
+            tracker.record("llm_total", float(ms))
+        stage = tracker.summary()["stages"]["llm_total"]
+        self.assertEqual(stage["count"], 200)
+        self.assertAlmostEqual(stage["p50"], 151, delta=1)
+        self.assertAlmostEqual(stage["p99"], 199, delta=1)
+
+    def test_prometheus_export(self):
+        tracker = LatencyTracker()
+        trace = Trace()
+        trace.add("retrieve", 12.5)
+        trace.count("completion_tokens", 7)
+        tracker.record_trace(trace.finish())
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "metrics.prom")
+            tracker.export(path)
+            with open(path, encoding="utf-8") as f:
+                text = f.read()
+        self.assertIn('chatbot_stage_latency_ms{stage="retrieve",quantile="0.95"} 12.500', text)
+        self.assertIn('chatbot_stage_latency_ms_count{stage="total"} 1', text)
+        self.assertIn("chatbot_completion_tokens_total 7", text)
+
+
+if __name__ == "__main__":
+    unittest.main()
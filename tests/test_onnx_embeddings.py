@@ -0,0 +1,150 @@
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import numpy as np
+from tokenizers import Tokenizer, models, pre_tokenizers
+
+import rag_bot
+from indexing import MANIFEST_FILENAME, IndexManifest
+from onnx_embeddings import TOKENIZER_FILE, OnnxEmbeddings, check_parity
+
+VOCAB = {"[PAD]": 0, "[UNK]": 1, "port": 2, "du": 3, "casque": 4, "gilet": 5}
+
+
+class FakeSession:
+    """Graphe factice: l'état caché d'un token est la ligne de sa table d'embeddings"""
+
+    def __init__(self, input_names=("input_ids", "attention_mask")):
+        self.table = np.random.default_rng(0).standard_normal((len(VOCAB), 8)).astype(np.float32)
+        self.table[0] = 100.0  # le remplissage ne doit pas compter dans la moyenne
+        self.input_names = input_names
+        self.feeds = []
+
+    def get_inputs(self):
+        return [SimpleNamespace(name=name) for name in self.input_names]
+
+    def run(self, output_names, feed):
+        self.feeds.append(sorted(feed))
+        return [self.table[feed["input_ids"]]]
+
+
+class VectorDB:
+    def __init__(self, vectors, texts):
+        self.vectors, self.texts = vectors, texts
+
+    def get(self, include=None):
+        return {"ids": [str(i) for i in range(len(self.texts))], "embeddings": self.vectors,
+                "documents": self.texts, "metadatas": [{} for _ in self.texts]}
+
+
+class TableEmbeddings:
+    def __init__(self, vectors_by_text):
+        self.vectors_by_text = vectors_by_text
+
+    def embed_documents(self, texts):
+        return [self.vectors_by_text[text] for text in texts]
+
+
+class TestOnnxEmbeddings(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        tokenizer = Tokenizer(models.WordLevel(vocab=VOCAB, unk_token="[UNK]"))
+        tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+        tokenizer.save(os.path.join(self.tmp.name, TOKENIZER_FILE))
+        self.session = FakeSession()
+        self.embeddings = OnnxEmbeddings(self.tmp.name, session=self.session, batch_size=2)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _expected(self, words):
+        vector = self.session.table[[VOCAB[word] for word in words]].mean(axis=0)
+        return vector / np.linalg.norm(vector)
+
+    def test_mean_pooling_ignores_padding(self):
+        vectors = self.embeddings.embed_documents(["port du casque", "gilet", "casque gilet"])
+        np.testing.assert_allclose(vectors[0], self._expected(["port", "du", "casque"]), rtol=1e-5)
+        np.testing.assert_allclose(vectors[1], self._expected(["gilet"]), rtol=1e-5)
+        np.testing.assert_allclose(vectors[2], self._expected(["casque", "gilet"]), rtol=1e-5)
+        np.testing.assert_allclose(self.embeddings.embed_query("gilet"), vectors[1], rtol=1e-5)
+
+    def test_only_graph_inputs_are_fed(self):
+        self.embeddings.embed_query("casque")
+        self.assertEqual(self.session.feeds, [["attention_mask", "input_ids"]])
+
+    def test_missing_model_is_reported(self):
+        with self.assertRaises(FileNotFoundError):
+            OnnxEmbeddings(self.tmp.name)
+
+
+class TestParity(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        self.texts = [f"chunk {i}" for i in range(50)]
+        self.vectors = rng.standard_normal((50, 16)).astype(np.float32)
+        self.db = VectorDB(self.vectors, self.texts)
+
+    def test_close_vectors_keep_rankings(self):
+        noise = np.random.default_rng(2).standard_normal(self.vectors.shape) * 0.01
+        embeddings = TableEmbeddings(dict(zip(self.texts, (self.vectors + noise).tolist())))
+        report = check_parity(embeddings, self.db, sample=20, k=5)
+        self.assertTrue(report["ok"])
+        self.assertEqual(report["sample"], 20)
+        self.assertEqual(report["top1_agreement"], 1.0)
+        self.assertGreater(report["cosine_min"], 0.99)
+
+    def test_different_model_fails(self):
+        other = np.random.default_rng(3).standard_normal(self.vectors.shape)
+        report = check_parity(TableEmbeddings(dict(zip(self.texts, other.tolist()))), self.db, sample=20, k=5)
+        self.assertFalse(report["ok"])
+
+
+class TestBackendChange(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.settings = {"embedding_model": "minilm", "chunk_size": 1000}
+        old = IndexManifest(os.path.join(self.tmp.name, MANIFEST_FILENAME), self.settings)
+        old.record("data/guide.pdf", {"sha256": "abc"}, ["c1", "c2"])
+        old.save()
+        self.db = SimpleNamespace(count=lambda: 2)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _reuse(self, settings, report):
+        manifest = IndexManifest.load(self.tmp.name, settings)
+        self.assertFalse(manifest.exists)
+        with mock.patch.object(rag_bot, "check_parity", return_value=report) as parity:
+            manifest = rag_bot._reuse_after_backend_change(manifest, self.db, None, self.tmp.name)
+        return manifest, parity
+
+    def test_index_kept_when_rankings_match(self):
+        settings = dict(self.settings, embedding_backend="onnx-int8")
+        manifest, parity = self._reuse(settings, {"ok": True, "k": 10, "overlap_at_k": 0.97, "cosine_mean": 0.99})
+        parity.assert_called_once()
+        self.assertTrue(manifest.exists)
+        self.assertEqual(manifest.chunk_ids("data/guide.pdf"), ["c1", "c2"])
+        self.assertTrue(IndexManifest.load(self.tmp.name, settings).exists)
+
+    def test_rebuild_when_rankings_change(self):
+        settings = dict(self.settings, embedding_backend="onnx-int8")
+        manifest, _ = self._reuse(settings, {"ok": False, "k": 10, "overlap_at_k": 0.5, "cosine_mean": 0.7})
+        self.assertFalse(manifest.exists)
+        self.assertEqual(manifest.files, {})
+
+    def test_unrecorded_backend_is_torch(self):
+        manifest, parity = self._reuse(dict(self.settings, embedding_backend="torch"), None)
+        parity.assert_not_called()
+        self.assertTrue(manifest.exists)
+
+    def test_other_settings_still_force_rebuild(self):
+        manifest, parity = self._reuse(dict(self.settings, chunk_size=500, embedding_backend="onnx-int8"), None)
+        parity.assert_not_called()
+        self.assertFalse(manifest.exists)
+
+
+if __name__ == "__main__":
+    unittest.main()
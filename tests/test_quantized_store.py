@@ -0,0 +1,113 @@
+import os
+import tempfile
+import unittest
+import zlib
+
+import numpy as np
+
+from quantized_store import Int8VectorIndex, QuantizedVectorStore, quantize
+
+
+class HashEmbeddings:
+    """Embeddings déterministes: sac de mots projeté aléatoirement (graine fixe)"""
+
+    def __init__(self, dim=64):
+        self.dim = dim
+
+    def _embed(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in text.lower().split():
+            vector += np.random.default_rng(zlib.crc32(word.encode("utf-8"))).standard_normal(self.dim)
+        return vector.tolist()
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+class TestInt8VectorIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.rng = np.random.default_rng(0)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _index(self, **kwargs):
+        return Int8VectorIndex(os.path.join(self.tmp.name, "q"), **kwargs)
+
+    def test_quantization_error_is_small(self):
+        vectors = self.rng.standard_normal((100, 384)).astype(np.float32)
+        codes, scales, normalized = quantize(vectors)
+        self.assertEqual(codes.dtype, np.int8)
+        error = np.abs(codes * scales[:, None] - normalized).max()
+        self.assertLess(error, scales.max())
+
+    def test_recall_against_exact_search(self):
+        vectors = self.rng.standard_normal((2000, 128)).astype(np.float32)
+        index = self._index()
+        index.add([str(i) for i in range(2000)], vectors, ["t"] * 2000, [{}] * 2000)
+        normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        hits = 0
+        for query in self.rng.standard_normal((20, 128)).astype(np.float32):
+            exact = set(np.argsort(-(normalized @ query))[:5])
+            hits += len(exact & {row for row, _ in index.search(query, 5, rescore_candidates=50)})
+            approx = {row for row, _ in index.search(query, 5)}
+            self.assertGreaterEqual(len(exact & approx), 3)
+        self.assertEqual(hits, 100)
+        self.assertLessEqual(index.resident_bytes() * 3, normalized.nbytes)
+
+    def test_delete_replace_reopen_and_compact(self):
+        index = self._index()
+        vectors = np.eye(4, dtype=np.float32)
+        index.add(["a", "b", "c"], vectors[:3], ["A", "B", "C"], [{"n": 0}, {"n": 1}, {"n": 2}])
+        index.delete(["b"])
+        index.add(["c"], vectors[3:], ["C2"], [{"n": 3}])
+
+        reopened = self._index()
+        self.assertEqual(len(reopened), 2)
+        self.assertNotIn("b", reopened)
+        row, _ = reopened.search(vectors[3], 1)[0]
+        self.assertEqual(reopened.document(row), ("c", "C2", {"n": 3}))
+
+        reopened.compact()
+        compacted = self._index()
+        self.assertEqual(compacted.generation, 1)
+        self.assertEqual([compacted.document(r)[0] for r in compacted.rows()], ["a", "c"])
+        self.assertFalse(os.path.exists(os.path.join(self.tmp.name, "q", "gen-0")))
+
+    def test_interrupted_write_is_truncated(self):
+        index = self._index()
+        index.add(["a"], np.ones((1, 8), dtype=np.float32), ["A"], [{}])
+        # Vecteur écrit sans son identifiant (interruption)
+        with open(os.path.join(index._gen_dir, "vectors.i8"), "ab") as f:
+            f.write(b"\x01" * 8)
+        reopened = self._index()
+        self.assertEqual(len(reopened), 1)
+        reopened.add(["b"], -np.ones((1, 8), dtype=np.float32), ["B"], [{}])
+        row, _ = reopened.search(-np.ones(8), 1)[0]
+        self.assertEqual(reopened.document(row)[0], "b")
+
+
+class TestQuantizedVectorStore(unittest.TestCase):
+    def test_vectorstore_interface(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = QuantizedVectorStore(os.path.join(tmp, "q"), HashEmbeddings())
+            store.add_texts(["port du casque obligatoire", "stockage des explosifs", "bassin de décantation"],
+                            metadatas=[{"source": "a"}, {"source": "b"}, {"source": "c"}], ids=["1", "2", "3"])
+            docs = store.similarity_search("explosifs stockage", k=1)
+            self.assertEqual(docs[0].metadata["source"], "b")
+            store.delete(ids=["2"])
+            self.assertEqual(store.get()["ids"], ["1", "3"])
+            self.assertEqual(store.count(), 2)
+            embeddings = store.get(include=["embeddings"])["embeddings"]
+            self.assertEqual(embeddings.shape, (2, store.index.dim))
+            np.testing.assert_allclose(np.linalg.norm(embeddings, axis=1), 1.0, rtol=1e-5)
+            retriever = store.as_retriever(search_kwargs={"k": 2})
+            self.assertIs(retriever.vectorstore, store)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import asyncio
+import time
+import unittest
+
+from query_engine import AsyncQueryEngine
+
+
+class BatchCountingEmbeddings:
+    def __init__(self):
+        self.batches = []
+
+    def embed_documents(self, texts):
+        self.batches.append(list(texts))
+        return [[float(len(text))] for text in texts]
+
+
+class SlowRAG:
+    def __init__(self, delay=0.0):
+        self.embeddings = BatchCountingEmbeddings()
+        self.delay = delay
+
+    def query(self, question, query_vector=None):
+        time.sleep(self.delay)
+        return {"answer": question.upper(), "sources": [], "vector": query_vector}
+
+
+class TestAsyncQueryEngine(unittest.TestCase):
+    def test_concurrent_queries_share_one_embedding_batch(self):
+        rag = SlowRAG()
+        engine = AsyncQueryEngine(rag, max_workers=4, batch_window_ms=20)
+        questions = [f"question {i}" for i in range(10)]
+        results = asyncio.run(engine.query_many(questions))
+        engine.close()
+
+        self.assertEqual([r["answer"] for r in results], [q.upper() for q in questions])
+        self.assertEqual(len(rag.embeddings.batches), 1)
+        self.assertEqual(results[3]["vector"], [float(len(questions[3]))])
+
+    def test_backpressure_rejects_excess_requests(self):
+        engine = AsyncQueryEngine(SlowRAG(delay=0.05), max_workers=2, max_pending=2)
+        results = asyncio.run(engine.query_many(["a", "b", "c", "d"]))
+        engine.close()
+
+        self.assertEqual(sum(1 for r in results if r.get("overloaded")), 2)
+        self.assertEqual(engine.stats()["rejected"], 2)
+
+    def test_timeout_returns_error(self):
+        engine = AsyncQueryEngine(SlowRAG(delay=0.3), max_workers=1)
+        result = asyncio.run(engine.query("lent", timeout=0.05))
+        engine.close()
+        self.assertIn("error", result)
+        self.assertEqual(engine.timeouts, 1)
+
+    def test_submit_from_sync_code(self):
+        engine = AsyncQueryEngine(SlowRAG(), max_workers=2)
+        try:
+            self.assertEqual(engine.submit("epi").result(timeout=5)["answer"], "EPI")
+        finally:
+            engine.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
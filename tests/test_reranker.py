@@ -0,0 +1,65 @@
+import time
+import unittest
+from types import SimpleNamespace
+
+from reranker import CrossEncoderReranker
+
+
+class KeywordModel:
+    """Score = nombre d'occurrences du mot « casque », avec un délai par lot"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.batches = []
+
+    def predict(self, pairs, batch_size=32, show_progress_bar=False):
+        time.sleep(self.delay)
+        self.batches.append(len(pairs))
+        return [text.count("casque") for _, text in pairs]
+
+
+def docs(*texts):
+    return [SimpleNamespace(page_content=text, metadata={}) for text in texts]
+
+
+class TestCrossEncoderReranker(unittest.TestCase):
+    def test_reorders_by_score_in_batches(self):
+        model = KeywordModel()
+        reranker = CrossEncoderReranker("fake", batch_size=2, budget_ms=1000, model=model)
+        candidates = docs("gilet", "casque", "casque casque", "bottes", "harnais")
+        ranked = reranker.rerank("EPI ?", candidates, 2)
+        self.assertEqual([d.page_content for d in ranked], ["casque casque", "casque"])
+        self.assertEqual(model.batches, [2, 2, 1])
+
+    def test_budget_keeps_search_order_for_unscored(self):
+        model = KeywordModel(delay=0.02)
+        reranker = CrossEncoderReranker("fake", batch_size=2, budget_ms=30, model=model)
+        candidates = docs("gilet", "casque", "bottes", "casque casque casque", "harnais", "casque")
+        ranked = reranker.rerank("EPI ?", candidates, 4)
+        # Seul le premier lot tient dans le budget: il est reclassé, le reste garde l'ordre
+        self.assertEqual(model.batches, [2])
+        self.assertEqual([d.page_content for d in ranked], ["casque", "gilet", "bottes", "casque casque casque"])
+        self.assertEqual(reranker.stats()["partial"], 1)
+
+    def test_falls_back_to_vector_order(self):
+        model = KeywordModel(delay=0.02)
+        reranker = CrossEncoderReranker("fake", batch_size=2, budget_ms=10, model=model)
+        reranker.rerank("EPI ?", docs("a", "b"), 1)  # premier appel: estimation de la durée d'un lot
+        ranked = reranker.rerank("EPI ?", docs("gilet", "casque", "bottes"), 2)
+        self.assertEqual([d.page_content for d in ranked], ["gilet", "casque"])
+        self.assertEqual(reranker.stats()["fallbacks"], 1)
+
+    def test_recovers_after_one_slow_batch(self):
+        model = KeywordModel(delay=0.2)
+        reranker = CrossEncoderReranker("fake", batch_size=2, budget_ms=50, model=model)
+        reranker.rerank("EPI ?", docs("a", "b"), 1)  # lot lent isolé (démarrage à froid)
+        model.delay = 0.0
+        for _ in range(4):
+            ranked = reranker.rerank("EPI ?", docs("gilet", "casque"), 1)
+        self.assertEqual([d.page_content for d in ranked], ["casque"])
+        self.assertLess(reranker.stats()["fallbacks"], 4)
+        self.assertLess(reranker.stats()["batch_ms"], 50)
+
+
+if __name__ == "__main__":
+    unittest.main()
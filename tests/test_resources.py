@@ -0,0 +1,87 @@
+import threading
+import time
+import unittest
+
+from resources import ResourceRegistry
+
+
+class TestResourceRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = ResourceRegistry()
+        self.calls = 0
+
+    def _slow_factory(self):
+        self.calls += 1
+        time.sleep(0.05)
+        return object()
+
+    def test_concurrent_get_creates_once(self):
+        self.registry.register("model", self._slow_factory)
+        self.assertFalse(self.registry.is_loaded("model"))
+        barrier = threading.Barrier(8)
+        results = []
+
+        def worker():
+            barrier.wait()
+            results.append(self.registry.get("model"))
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(len(results), 8)
+        self.assertTrue(all(result is results[0] for result in results))
+        self.assertTrue(self.registry.is_loaded("model"))
+
+    def test_load_time_is_recorded_once(self):
+        self.registry.register("model", self._slow_factory)
+        self.assertEqual(self.registry.load_times, {})
+        self.registry.get("model")
+        load_time = self.registry.load_times["model"]
+        self.assertGreaterEqual(load_time, 0.04)
+        self.registry.get("model")
+        self.assertEqual(self.registry.load_times["model"], load_time)
+
+    def test_replace_and_reset(self):
+        self.registry.register("index", self._slow_factory)
+        first = self.registry.get("index")
+        fresh = object()
+        self.registry.replace("index", fresh)
+        self.assertIs(self.registry.get("index"), fresh)
+        self.assertEqual(self.calls, 1)
+
+        self.registry.reset("index")
+        self.assertFalse(self.registry.is_loaded("index"))
+        recreated = self.registry.get("index")
+        self.assertEqual(self.calls, 2)
+        self.assertIsNot(recreated, first)
+
+    def test_failed_load_is_retried(self):
+        attempts = []
+
+        def flaky():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise OSError("modèle indisponible")
+            return "modèle"
+
+        self.registry.register("model", flaky)
+        with self.assertRaises(OSError):
+            self.registry.get("model")
+        self.assertFalse(self.registry.is_loaded("model"))
+        self.assertNotIn("model", self.registry.load_times)
+        self.assertEqual(self.registry.get("model"), "modèle")
+
+    def test_first_answer_is_timed_once(self):
+        self.registry.mark_first_answer()
+        first = self.registry.first_answer_seconds
+        self.assertGreater(first, 0)
+        self.registry.mark_first_answer()
+        self.assertEqual(self.registry.first_answer_seconds, first)
+
+
+if __name__ == "__main__":
+    unittest.main()
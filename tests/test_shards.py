@@ -0,0 +1,131 @@
+import os
+import tempfile
+import unittest
+import zlib
+from unittest import mock
+
+import numpy as np
+
+from quantized_store import QuantizedVectorStore
+from shards import QueryRouter, ShardedVectorStore, assign_shard
+
+KEYWORDS = {
+    "regulation": ["décret", "norme"],
+    "mining": ["explosif", "galerie"],
+    "structured": ["incident", "urgence"],
+}
+
+
+class HashEmbeddings:
+    """Embeddings déterministes: sac de mots projeté aléatoirement (graine fixe)"""
+
+    def __init__(self, dim=64):
+        self.dim = dim
+
+    def _embed(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in text.lower().split():
+            vector += np.random.default_rng(zlib.crc32(word.encode("utf-8"))).standard_normal(self.dim)
+        return vector.tolist()
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+class TestAssignShard(unittest.TestCase):
+    def test_type_site_then_file_name(self):
+        self.assertEqual(assign_shard({"source": "data/base.json", "type": "json"}, KEYWORDS, "data"), "structured")
+        self.assertEqual(assign_shard({"source": os.path.join("data", "Site Khouribga", "plan.pdf")}, KEYWORDS, "data"),
+                         "site-site-khouribga")
+        self.assertEqual(assign_shard({"source": "data/Décret_2-14.pdf"}, KEYWORDS, "data"), "regulation")
+        self.assertEqual(assign_shard({"source": "data/stockage-explosifs.pdf"}, KEYWORDS, "data"), "mining")
+        self.assertEqual(assign_shard({"source": "data/STEULER-HSE-Management.pdf"}, KEYWORDS, "data"), "general")
+        # Le mot-clé « incident » ne range pas un PDF dans la base structurée
+        self.assertEqual(assign_shard({"source": "data/incidents.pdf"}, KEYWORDS, "data"), "general")
+
+
+class TestQueryRouter(unittest.TestCase):
+    def setUp(self):
+        self.router = QueryRouter(KEYWORDS, always=["general"])
+        self.available = ["general", "mining", "regulation", "site-benguerir", "structured"]
+
+    def test_keywords_select_shards_plus_general(self):
+        self.assertEqual(self.router.route("Stockage des explosifs ?", self.available), ["mining", "general"])
+        self.assertEqual(self.router.route("Que dit le décret sur les galeries ?", self.available),
+                         ["mining", "regulation", "general"])
+        self.assertEqual(self.router.route("Consignes à Benguerir", self.available), ["site-benguerir", "general"])
+
+    def test_no_keyword_searches_everything(self):
+        self.assertIsNone(self.router.route("Port du casque", self.available))
+        self.assertIsNone(self.router.route("explosifs", ["general"]))
+
+
+class TestShardedVectorStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.embeddings = HashEmbeddings()
+        self.texts = ["stockage des explosifs en galerie", "port du casque obligatoire",
+                      "norme de ventilation des galeries", "incident au convoyeur"]
+        self.metadatas = [{"source": "mine.pdf", "shard": "mining"}, {"source": "guide.pdf"},
+                          {"source": "norme.pdf", "shard": "regulation"}, {"source": "base.json", "shard": "structured"}]
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _store(self):
+        return ShardedVectorStore(
+            self.tmp.name, self.embeddings,
+            lambda name: QuantizedVectorStore(os.path.join(self.tmp.name, name), self.embeddings),
+            assign=lambda metadata: "general")
+
+    def test_documents_are_split_by_shard_and_reopened(self):
+        store = self._store()
+        store.add_texts(self.texts, self.metadatas, ids=["a", "b", "c", "d"])
+        self.assertEqual(store.shards, ["general", "mining", "regulation", "structured"])
+        self.assertEqual(store.count(), 4)
+
+        reopened = self._store()
+        self.assertEqual(reopened.shards, store.shards)
+        data = reopened.get(include=["documents", "metadatas", "embeddings"])
+        self.assertEqual(sorted(data["ids"]), ["a", "b", "c", "d"])
+        self.assertEqual(len(data["embeddings"]), 4)
+        self.assertEqual(dict(zip(data["ids"], data["metadatas"]))["b"]["shard"], "general")
+
+        reopened.delete(ids=["a", "d"])
+        self.assertEqual(reopened.count(), 2)
+
+    def test_search_merges_shards_by_similarity(self):
+        store = self._store()
+        store.add_texts(self.texts, self.metadatas, ids=["a", "b", "c", "d"])
+        flat = QuantizedVectorStore(os.path.join(self.tmp.name, "flat"), self.embeddings)
+        flat.add_texts(self.texts, self.metadatas, ids=["a", "b", "c", "d"])
+        query = self.embeddings.embed_query("galerie explosifs casque")
+
+        self.assertEqual([doc.page_content for doc in store.similarity_search_by_vector(query, k=3)],
+                         [doc.page_content for doc in flat.similarity_search_by_vector(query, k=3)])
+        routed = store.similarity_search_by_vector(query, k=3, shards=["regulation", "general"])
+        self.assertEqual({doc.metadata["shard"] for doc in routed}, {"regulation", "general"})
+
+        store.delete_collection()
+        self.assertEqual(self._store().shards, [])
+
+    def test_unsharded_store_is_dropped(self):
+        import rag_bot
+        from config import Config
+        quantized = os.path.join(self.tmp.name, "quantized")
+        QuantizedVectorStore(quantized, self.embeddings).add_texts(self.texts[:1], ids=["a"])
+        store = ShardedVectorStore(self.tmp.name, self.embeddings,
+                                   lambda name: QuantizedVectorStore(os.path.join(quantized, name), self.embeddings))
+        store.add_texts(self.texts[1:2], [{"shard": "general"}], ids=["b"])
+
+        with mock.patch.object(Config, "VECTOR_STORE", "quantized"):
+            rag_bot._drop_unsharded_store(self.embeddings, self.tmp.name)
+        self.assertEqual(len(QuantizedVectorStore(quantized, self.embeddings)), 0)
+        self.assertEqual(len(QuantizedVectorStore(os.path.join(quantized, "general"), self.embeddings)), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,143 @@
+import os
+import tempfile
+import threading
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import rag_bot
+from config import ACTIVE_INDEX_FILE, Config, active_index_dir
+from indexing import discover_sources
+from watcher import DataDirWatcher
+
+
+def touch(path, text="x"):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+class TestDiscovery(unittest.TestCase):
+    def test_discovers_supported_files_recursively(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            for name in ("La sécurité et la santé.pdf", "base.json", "guides/EPI.PDF", "notes.txt",
+                         ".cache/x.pdf", "~$brouillon.pdf"):
+                touch(os.path.join(tmp, name))
+            self.assertEqual(discover_sources(tmp), [
+                os.path.join(tmp, "La sécurité et la santé.pdf"),
+                os.path.join(tmp, "base.json"),
+                os.path.join(tmp, "guides", "EPI.PDF"),
+            ])
+
+
+class TestDataDirWatcher(unittest.TestCase):
+    def test_waits_for_stable_change_and_retries_on_error(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            touch(os.path.join(tmp, "a.pdf"))
+            calls, fail = [], [True]
+
+            def on_change(sources):
+                calls.append(sources)
+                if fail[0]:
+                    fail[0] = False
+                    raise RuntimeError("échec")
+
+            watcher = DataDirWatcher(tmp, on_change)
+            self.assertFalse(watcher.poll())
+            touch(os.path.join(tmp, "b.pdf"))
+            self.assertFalse(watcher.poll())  # changement vu, pas encore stable
+            self.assertFalse(watcher.poll())  # stable, mais la réindexation échoue
+            self.assertEqual(watcher.stats()["errors"], 1)
+            self.assertFalse(watcher.poll())
+            self.assertTrue(watcher.poll())
+            self.assertEqual(calls[-1], [os.path.join(tmp, "a.pdf"), os.path.join(tmp, "b.pdf")])
+            self.assertFalse(watcher.poll())
+            self.assertEqual(len(calls), 2)
+
+    def test_thread_survives_scan_errors(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            touch(os.path.join(tmp, "a.pdf"))
+            changed = threading.Event()
+            watcher = DataDirWatcher(tmp, lambda sources: changed.set(), interval=0.01)
+            snapshot, failures = watcher.snapshot, [OSError("répertoire indisponible")] * 3
+
+            def flaky_snapshot():
+                if failures:
+                    raise failures.pop()
+                return snapshot()
+
+            watcher.snapshot = flaky_snapshot
+            touch(os.path.join(tmp, "b.pdf"))
+            watcher.start()
+            try:
+                self.assertTrue(changed.wait(5))
+            finally:
+                watcher.stop()
+            self.assertEqual(watcher.stats()["errors"], 3)
+            self.assertIn("indisponible", watcher.stats()["last_error"])
+
+
+class FakeVectorStore:
+    def __init__(self, name):
+        self.name = name
+
+    def as_retriever(self, search_kwargs):
+        return SimpleNamespace(vectorstore=self, search_kwargs=search_kwargs)
+
+
+class TestHotReload(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = os.path.join(self.tmp.name, "db")
+        touch(os.path.join(root, "index_manifest.json"), "{}")
+        touch(os.path.join(root, "embedding_cache", "vectors.bin"))
+        patches = {"DB_ROOT": root, "DB_DIR": root, "BM25_INDEX_PATH": os.path.join(root, "bm25_index.json"),
+                   "INDEX_GENERATIONS_DIR": os.path.join(root, "index-generations"),
+                   "EMBEDDING_CACHE_DIR": os.path.join(root, "embedding_cache"), "STRUCTURED_FAST_PATH": False}
+        self.patches = [mock.patch.object(Config, key, value) for key, value in patches.items()]
+        for patch in self.patches:
+            patch.start()
+        self.rag = rag_bot.RAGSystem()
+        self.rag.retriever = FakeVectorStore("ancien").as_retriever({"k": 3})
+        self.rag.lexical_index = object()
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+        self.tmp.cleanup()
+
+    def reload(self, changed):
+        def fake_load(embeddings, lexical_index, stats, db_dir):
+            self.assertTrue(os.path.exists(os.path.join(db_dir, "index_manifest.json")))
+            self.assertFalse(os.path.exists(os.path.join(db_dir, "embedding_cache")))
+            stats.update(added_files=int(changed), changed_files=0, removed_files=0)
+            return FakeVectorStore(db_dir)
+        with mock.patch.object(rag_bot, "load_vectorstore", side_effect=fake_load):
+            return self.rag.reload_index()
+
+    def test_new_generation_is_swapped_in_and_activated(self):
+        root = Config.DB_ROOT
+        stats = self.reload(changed=True)
+        generation = os.path.join(Config.INDEX_GENERATIONS_DIR, "gen-1")
+        self.assertTrue(stats["swapped"])
+        self.assertEqual(self.rag.retriever.vectorstore.name, generation)
+        self.assertEqual(self.rag.retriever.search_kwargs, {"k": 3})
+        self.assertEqual((Config.DB_DIR, active_index_dir(root)), (generation, generation))
+
+        self.reload(changed=True)
+        self.reload(changed=True)
+        # Seules l'active et la précédente sont conservées
+        self.assertEqual(sorted(os.listdir(Config.INDEX_GENERATIONS_DIR)), ["gen-2", "gen-3"])
+        with open(os.path.join(root, ACTIVE_INDEX_FILE), encoding="utf-8") as f:
+            self.assertTrue(f.read().endswith("gen-3"))
+
+    def test_unchanged_content_keeps_current_index(self):
+        stats = self.reload(changed=False)
+        self.assertFalse(stats["swapped"])
+        self.assertEqual(self.rag.retriever.vectorstore.name, "ancien")
+        self.assertEqual(os.listdir(Config.INDEX_GENERATIONS_DIR), [])
+        self.assertEqual(Config.DB_DIR, Config.DB_ROOT)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+"""Surveillance du répertoire de données pour la réindexation à chaud.
+
+``DataDirWatcher`` compare périodiquement la liste des fichiers indexables de
+``Config.DATA_DIR`` et leurs dates de modification et tailles. Un changement
+n'est pris en compte que lorsque l'état est stable sur deux scrutations
+successives (fichier en cours de copie), puis ``on_change`` est appelé dans
+le thread de surveillance: les requêtes ne sont jamais bloquées.
+"""
+import logging
+import threading
+
+from indexing import discover_sources, source_snapshot
+
+logger = logging.getLogger(__name__)
+
+
+class DataDirWatcher:
+    """Scrutation d'un répertoire; ``on_change(sources)`` quand son contenu a changé"""
+
+    def __init__(self, data_dir, on_change, interval=30.0):
+        self.data_dir = data_dir
+        self.on_change = on_change
+        self.interval = interval
+        self.counters = {"polls": 0, "changes": 0, "errors": 0}
+        self.last_error = None
+        self._indexed = self.snapshot()
+        self._pending = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def snapshot(self):
+        return source_snapshot(discover_sources(self.data_dir))
+
+    def poll(self):
+        """Une scrutation; renvoie True si ``on_change`` a été appelé avec succès"""
+        self.counters["polls"] += 1
+        current = self.snapshot()
+        if current == self._indexed:
+            self._pending = None
+            return False
+        if current != self._pending:
+            # Changement détecté: attendre qu'il soit stable
+            self._pending = current
+            return False
+        logger.info(f"📁 Changement détecté dans {self.data_dir}, réindexation en arrière-plan...")
+        try:
+            self.on_change(sorted(current))
+        except Exception as e:
+            # Nouvel essai à la prochaine scrutation
+            self.counters["errors"] += 1
+            self.last_error = str(e)
+            self._pending = None
+            logger.error(f"❌ Réindexation à chaud impossible: {e}")
+            return False
+        self.counters["changes"] += 1
+        self._indexed = current
+        self._pending = None
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:
+                # Erreur passagère (répertoire indisponible...): la surveillance continue
+                self.counters["errors"] += 1
+                self.last_error = str(e)
+                logger.error(f"❌ Scrutation de {self.data_dir} impossible: {e}")
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="data-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def stats(self):
+        return dict(self.counters, watching=self.data_dir, last_error=self.last_error)